@@ -1,8 +1,8 @@
-from flask import Flask, request, send_file, jsonify, render_template, make_response, g, abort, redirect
+from flask import Flask, request, send_file, jsonify, render_template, make_response, g, abort, redirect, Response, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import joinedload
-from sqlalchemy import text
+from sqlalchemy import text, update
 import main as pdf_generator
 import io
 import secrets
@@ -16,26 +16,55 @@ import time
 import functools
 import logging
 import json
-import requests
 
 # JWT/JWKS for Supabase auth verification
 import jwt
-from jwt import PyJWKClient
 import stripe
+from werkzeug.utils import send_file as werkzeug_send_file
 
 # Import db and models from models.py
 from models import db, Guidebook, Host, Property
 from utils.ai_recommendations import (
     get_ai_recommendations,
+    stream_ai_recommendations,
+    get_multi_ai_recommendations,
     get_ai_food_recommendations,  # backward compatibility
     get_ai_activity_recommendations  # backward compatibility
 )
+from utils.background import debounce
+from utils.pdf_cache import get_cached_pdf_path, store_pdf, purge_guidebook_pdfs, cache_relative_path
 from utils.google_places import (
     google_places_text_search,
-    google_places_details,
     google_places_photo_url,
-    google_distance_matrix,
+    google_geocode,
+    PLACES_PHOTO_TIMEOUT,
 )
+from utils.geo import coords_of, estimate_driving
+from utils.route_cache import get_cached_routes, route_matrix
+from utils.place_catalog import get_or_fetch_place, nearby_places
+from utils.http import get_session
+from utils.places_search import search_places
+from utils.providers import install_stripe_provider
+from utils.rate_limit import admit
+from utils.quota import acquire_quota
+from utils.circuit_breaker import get_breaker, breaker_states, CircuitOpenError
+from utils.deadline import deadline, AI_REQUEST_DEADLINE_SECONDS
+from utils.photo_cache import (
+    width_bucket,
+    photo_etag,
+    get_cached_photo,
+    get_or_fetch_photo,
+    claim_photo_fetch,
+    webp_supported,
+    tee_photo,
+    PhotoTooLarge,
+    PHOTO_MAX_BYTES,
+    PHOTO_STREAM_CHUNK_BYTES,
+)
+from utils.metrics import snapshot as metrics_snapshot, incr
+from utils.cache import TTLCache, MemoryStore
+from utils.keyed_locks import KeyedLocks
+from utils.jwks import JWKSKeyring
 
 # --- Unicode utilities ---
 def _strip_surrogates(s: str) -> str:
@@ -82,7 +111,7 @@ _origins = [o.strip() for o in origins_str.split(',') if o.strip()] if origins_s
 CORS(
     app,
     resources={r"/api/*": {"origins": _origins}},
-    expose_headers=["X-Guidebook-Url"],
+    expose_headers=["X-Guidebook-Url", "X-Recommendations-Partial"],
 )
 
 # Configure the database using the DATABASE_URL from .env
@@ -105,6 +134,7 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
 
 # Stripe configuration
 stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+install_stripe_provider(stripe)
 STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET')
 FRONTEND_ORIGIN = os.environ.get('FRONTEND_ORIGIN', 'http://localhost:3000')
 STRIPE_PORTAL_CONFIGURATION_ID = os.environ.get('STRIPE_PORTAL_CONFIGURATION_ID')  # optional pc_... id
@@ -660,19 +690,39 @@ SUPABASE_JWKS_URL = os.environ.get('SUPABASE_JWKS_URL') or (f"{SUPABASE_URL}/aut
 SUPABASE_JWT_AUD = os.environ.get('SUPABASE_JWT_AUD')  # optional
 SUPABASE_JWT_SECRET = os.environ.get('SUPABASE_JWT_SECRET')  # for HS256 tokens (Supabase default)
 CLN_SECRET = os.environ.get('CLEANUP_SECRET')  # optional secret for maintenance endpoints
-
-_jwks_client = None
-
-def _get_jwks_client():
-    global _jwks_client
-    if _jwks_client is None:
-        if not SUPABASE_JWKS_URL:
-            raise RuntimeError("SUPABASE_JWKS_URL not configured. Set SUPABASE_URL or SUPABASE_JWKS_URL in env.")
-        log.info(f"JWKS URL: {SUPABASE_JWKS_URL}")
-        if SUPABASE_JWT_AUD:
-            log.info(f"Expecting JWT aud={SUPABASE_JWT_AUD}")
-        _jwks_client = PyJWKClient(SUPABASE_JWKS_URL)
-    return _jwks_client
+METRICS_SECRET = os.environ.get('METRICS_SECRET')  # optional secret for the metrics endpoint
+
+# Verified JWT claims are cached per process, keyed by a hash of the token, until
+# the token's exp minus JWT_CACHE_SKEW_SECONDS and for at most
+# JWT_CACHE_MAX_TTL_SECONDS (0 disables the cache). Kept in memory only, never
+# in the shared CACHE_BACKEND store, since the entries are bearer credentials' claims.
+JWT_CACHE_MAX_ENTRIES = int(os.environ.get('JWT_CACHE_MAX_ENTRIES', '4096'))
+JWT_CACHE_SKEW_SECONDS = float(os.environ.get('JWT_CACHE_SKEW_SECONDS', '30'))
+JWT_CACHE_MAX_TTL_SECONDS = float(os.environ.get('JWT_CACHE_MAX_TTL_SECONDS', '300'))
+_verified_jwt_cache = TTLCache('jwt', MemoryStore(JWT_CACHE_MAX_ENTRIES))
+
+def _cache_verified_claims(cache_key: str, claims: dict) -> None:
+    """Remember verified claims until shortly before the token expires (tokens without exp aren't cached)."""
+    exp = claims.get('exp')
+    if not isinstance(exp, (int, float)):
+        return
+    ttl = min(exp - JWT_CACHE_SKEW_SECONDS - time.time(), JWT_CACHE_MAX_TTL_SECONDS)
+    _verified_jwt_cache.set(cache_key, claims, ttl)
+
+# Signing keys for asymmetric tokens are fetched and refreshed on a background
+# thread (see utils/jwks.py); startup waits only briefly for the first fetch
+_jwks = JWKSKeyring(SUPABASE_JWKS_URL) if SUPABASE_JWKS_URL else None
+if _jwks is not None:
+    log.info(f"JWKS URL: {SUPABASE_JWKS_URL}")
+    if SUPABASE_JWT_AUD:
+        log.info(f"Expecting JWT aud={SUPABASE_JWT_AUD}")
+    if not _jwks.load():
+        log.warning("JWKS not loaded yet; still fetching in the background")
+
+def _get_jwks():
+    if _jwks is None:
+        raise RuntimeError("SUPABASE_JWKS_URL not configured. Set SUPABASE_URL or SUPABASE_JWKS_URL in env.")
+    return _jwks
 
 def _verify_bearer_jwt(auth_header: str):
     if not auth_header:
@@ -682,6 +732,12 @@ def _verify_bearer_jwt(auth_header: str):
         log.warning("Authorization header not a Bearer token")
         return None
     token = auth_header.split(' ', 1)[1].strip()
+    # Repeat requests with an already-verified token skip header parsing, the signature check and logging
+    cache_key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    cached = _verified_jwt_cache.get(cache_key)
+    incr("jwt_cache.lookups", outcome="hit" if cached is not None else "miss")
+    if cached is not None:
+        return cached
     try:
         # Inspect header to determine algorithm
         try:
@@ -704,10 +760,11 @@ def _verify_bearer_jwt(auth_header: str):
                 audience=SUPABASE_JWT_AUD if SUPABASE_JWT_AUD else None,
             )
             log.info("JWT (HS256) verified OK for sub=%s", decoded.get('sub'))
+            _cache_verified_claims(cache_key, decoded)
             return decoded
 
-        # RS256: fetch signing key from JWKS
-        signing_key = _get_jwks_client().get_signing_key_from_jwt(token)
+        # RS256: signing key from the JWKS loaded in the background
+        signing_key = _get_jwks().signing_key(token)
         decoded = jwt.decode(
             token,
             signing_key.key,
@@ -715,6 +772,7 @@ def _verify_bearer_jwt(auth_header: str):
             audience=SUPABASE_JWT_AUD if SUPABASE_JWT_AUD else None,
         )
         log.info("JWT (RS256) verified OK for sub=%s", decoded.get('sub'))
+        _cache_verified_claims(cache_key, decoded)
         return decoded
     except Exception as e:
         log.error("JWT verification failed: %s: %s", type(e).__name__, e)
@@ -759,6 +817,69 @@ def require_auth(fn):
         return fn(*args, **kwargs)
     return wrapper
 
+# Number of reverse proxies in front of the app that append to X-Forwarded-For
+RATE_LIMIT_TRUSTED_PROXIES = int(os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', '0'))
+
+def _client_ip() -> str:
+    if RATE_LIMIT_TRUSTED_PROXIES > 0:
+        hops = [h.strip() for h in request.headers.get('X-Forwarded-For', '').split(',') if h.strip()]
+        if len(hops) >= RATE_LIMIT_TRUSTED_PROXIES:
+            return hops[-RATE_LIMIT_TRUSTED_PROXIES]
+    return request.remote_addr or 'unknown'
+
+def _rate_limit_identity() -> str:
+    """Signed-in users are limited per user id, everyone else per client IP."""
+    authz = request.headers.get('Authorization')
+    if authz:
+        claims = _verify_bearer_jwt(authz)
+        if claims and claims.get('sub'):
+            return f"user:{claims['sub']}"
+    return f"ip:{_client_ip()}"
+
+def _admit_request(endpoint_class: str):
+    """Apply per-client token buckets and a concurrency cap shared by the host's workers (see utils/rate_limit.py).
+
+    Rejections are immediate: 429 when the client is over its rate, 503 when
+    the endpoint class is at capacity, both with Retry-After.
+
+    Returns: (rejection_response or None, release)
+    """
+    rejection, release = admit(endpoint_class, _rate_limit_identity())
+    if rejection is None:
+        return None, release
+    status, retry_after = rejection
+    message = "Too many requests" if status == 429 else "Server busy, please retry"
+    resp = jsonify({"error": message})
+    resp.status_code = status
+    resp.headers['Retry-After'] = str(retry_after)
+    return resp, release
+
+def rate_limited(endpoint_class: str):
+    """Rate limit a whole endpoint with _admit_request.
+
+    The concurrency slot is released when the handler returns, or when the body
+    is closed if the response is streamed (the work happens while streaming).
+    Endpoints that can answer from a cache call _admit_request themselves, on a miss.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            rejected, release = _admit_request(endpoint_class)
+            if rejected is not None:
+                return rejected
+            try:
+                resp = make_response(fn(*args, **kwargs))
+            except Exception:
+                release()
+                raise
+            if resp.is_streamed:
+                resp.call_on_close(release)
+            else:
+                release()
+            return resp
+        return wrapper
+    return decorator
+
 # Template registry mapping keys to template files (URL renderer)
 TEMPLATE_REGISTRY = {
     "template_original": "templates_url/template_original.html",
@@ -1090,6 +1211,7 @@ def generate_guidebook_route():
 
     # Find or create Property (update fields if it already exists)
     prop = Property.query.filter_by(name=data['property_name'], user_id=user_id).first()
+    previous_address = prop.address_street if prop else None
     if not prop:
         prop = Property(
             name=data['property_name'],
@@ -1254,6 +1376,9 @@ def generate_guidebook_route():
         pass
 
     db.session.commit()
+    _schedule_distance_refinement(new_guidebook.id)
+    if prop.address_street != previous_address:
+        _schedule_recommendation_prefetch(prop)
 
     # Respond with identifiers and appropriate URL
     payload = {
@@ -1298,6 +1423,98 @@ def list_guidebooks():
     ]
     return jsonify({"ok": True, "items": items})
 
+def _render_snapshot_html(gb):
+    """Render a guidebook's selected template to the HTML stored as its published snapshot.
+    Returns: (html, template_key)
+    """
+    # Reuse the same context and template selection as live renderer, but produce HTML string only
+    template_key = getattr(gb, 'template_key', None) or 'template_original'
+    if template_key not in ALLOWED_TEMPLATE_KEYS:
+        template_key = 'template_original'
+    template_file = TEMPLATE_REGISTRY.get(template_key, TEMPLATE_REGISTRY['template_original'])
+
+    base_tabs = ['welcome','checkin','property','food','activities','rules','checkout']
+    included_tabs = getattr(gb, 'included_tabs', None) or base_tabs
+    included_tabs = [t for t in included_tabs if (t in base_tabs) or (isinstance(t, str) and t.startswith('custom_'))]
+
+    # Sanitize custom tabs meta
+    safe_custom_tabs_meta = None
+    meta = getattr(gb, 'custom_tabs_meta', None)
+    if isinstance(meta, dict):
+        safe_custom_tabs_meta = {}
+        for k, v in meta.items():
+            if isinstance(v, dict):
+                lbl = _strip_surrogates(str(v.get('label'))) if v.get('label') is not None else ''
+                ico = _strip_surrogates(str(v.get('icon'))) if v.get('icon') is not None else ''
+                safe_custom_tabs_meta[k] = {'label': lbl, 'icon': ico}
+
+    PLACEHOLDER_COVER_URL = (
+        "https://hojncqasasvvrhdmwwhv.supabase.co/storage/v1/object/public/my_images/home_placeholder.jpg"
+    )
+
+    ctx = {
+        "schema_version": 1,
+        "id": gb.id,
+        "property_name": (getattr(gb.property, 'name', None) or 'My Guidebook'),
+        "host": {
+            "name": getattr(gb.host, 'name', None),
+            "bio": getattr(gb.host, 'bio', None),
+            "contact": getattr(gb.host, 'contact', None),
+            "photo_url": getattr(gb.host, 'host_image_url', None),
+        },
+        "welcome_message": getattr(gb, 'welcome_info', None),
+        "safety_info": getattr(gb, 'safety_info', {}) or {},
+        "address": {
+            "street": getattr(gb.property, 'address_street', None),
+            "city_state": getattr(gb.property, 'address_city_state', None),
+            "zip": getattr(gb.property, 'address_zip', None),
+        },
+        "wifi_json": getattr(gb, 'wifi_json', None) or {},
+        "check_in_time": gb.check_in_time,
+        "check_out_time": gb.check_out_time,
+        "access_info": gb.access_info,
+        "parking_info": gb.parking_info,
+        "rules": getattr(gb, 'rules_json', None) or [],
+        "things_to_do": gb.things_to_do or [],
+        "places_to_eat": gb.places_to_eat or [],
+        "checkout_info": getattr(gb, 'checkout_info', None) or [],
+        "house_manual": getattr(gb, 'house_manual', None) or [],
+        "included_tabs": included_tabs,
+        "custom_sections": getattr(gb, 'custom_sections', None) or {},
+        "custom_tabs_meta": safe_custom_tabs_meta or (getattr(gb, 'custom_tabs_meta', None) or {}),
+        "cover_image_url": (gb.cover_image_url or PLACEHOLDER_COVER_URL),
+    }
+
+    html = render_template(
+        template_file,
+        ctx=ctx,
+        id=gb.id,
+        host_name=getattr(gb.host, 'name', None),
+        host_bio=getattr(gb.host, 'bio', None),
+        host_contact=getattr(gb.host, 'contact', None),
+        host_photo_url=getattr(gb.host, 'host_image_url', None),
+        property_name=gb.property.name,
+        check_in_time=gb.check_in_time,
+        check_out_time=gb.check_out_time,
+        address_street=gb.property.address_street,
+        address_city_state=gb.property.address_city_state,
+        address_zip=gb.property.address_zip,
+        access_info=gb.access_info,
+        welcome_message=getattr(gb, 'welcome_info', None),
+        parking_info=getattr(gb, 'parking_info', None),
+        rules=getattr(gb, 'rules_json', None) or [],
+        things_to_do=gb.things_to_do,
+        places_to_eat=gb.places_to_eat,
+        checkout_info=getattr(gb, 'checkout_info', None),
+        house_manual=getattr(gb, 'house_manual', None),
+        included_tabs=included_tabs,
+        custom_sections=getattr(gb, 'custom_sections', None),
+        custom_tabs_meta=safe_custom_tabs_meta,
+        cover_image_url=gb.cover_image_url,
+    )
+
+    return html, template_key
+
 @app.route('/api/guidebooks/<guidebook_id>/publish', methods=['POST'])
 @require_auth
 def publish_guidebook(guidebook_id):
@@ -1309,92 +1526,8 @@ def publish_guidebook(guidebook_id):
     if gb.user_id != g.user_id:
         return jsonify({"error": "Not found"}), 404
 
-    # Reuse the same context and template selection as live renderer, but produce HTML string only
     try:
-        template_key = getattr(gb, 'template_key', None) or 'template_original'
-        if template_key not in ALLOWED_TEMPLATE_KEYS:
-            template_key = 'template_original'
-        template_file = TEMPLATE_REGISTRY.get(template_key, TEMPLATE_REGISTRY['template_original'])
-
-        base_tabs = ['welcome','checkin','property','food','activities','rules','checkout']
-        included_tabs = getattr(gb, 'included_tabs', None) or base_tabs
-        included_tabs = [t for t in included_tabs if (t in base_tabs) or (isinstance(t, str) and t.startswith('custom_'))]
-
-        # Sanitize custom tabs meta
-        safe_custom_tabs_meta = None
-        meta = getattr(gb, 'custom_tabs_meta', None)
-        if isinstance(meta, dict):
-            safe_custom_tabs_meta = {}
-            for k, v in meta.items():
-                if isinstance(v, dict):
-                    lbl = _strip_surrogates(str(v.get('label'))) if v.get('label') is not None else ''
-                    ico = _strip_surrogates(str(v.get('icon'))) if v.get('icon') is not None else ''
-                    safe_custom_tabs_meta[k] = {'label': lbl, 'icon': ico}
-
-        PLACEHOLDER_COVER_URL = (
-            "https://hojncqasasvvrhdmwwhv.supabase.co/storage/v1/object/public/my_images/home_placeholder.jpg"
-        )
-
-        ctx = {
-            "schema_version": 1,
-            "id": gb.id,
-            "property_name": (getattr(gb.property, 'name', None) or 'My Guidebook'),
-            "host": {
-                "name": getattr(gb.host, 'name', None),
-                "bio": getattr(gb.host, 'bio', None),
-                "contact": getattr(gb.host, 'contact', None),
-                "photo_url": getattr(gb.host, 'host_image_url', None),
-            },
-            "welcome_message": getattr(gb, 'welcome_info', None),
-            "safety_info": getattr(gb, 'safety_info', {}) or {},
-            "address": {
-                "street": getattr(gb.property, 'address_street', None),
-                "city_state": getattr(gb.property, 'address_city_state', None),
-                "zip": getattr(gb.property, 'address_zip', None),
-            },
-            "wifi_json": getattr(gb, 'wifi_json', None) or {},
-            "check_in_time": gb.check_in_time,
-            "check_out_time": gb.check_out_time,
-            "access_info": gb.access_info,
-            "parking_info": gb.parking_info,
-            "rules": getattr(gb, 'rules_json', None) or [],
-            "things_to_do": gb.things_to_do or [],
-            "places_to_eat": gb.places_to_eat or [],
-            "checkout_info": getattr(gb, 'checkout_info', None) or [],
-            "house_manual": getattr(gb, 'house_manual', None) or [],
-            "included_tabs": included_tabs,
-            "custom_sections": getattr(gb, 'custom_sections', None) or {},
-            "custom_tabs_meta": safe_custom_tabs_meta or (getattr(gb, 'custom_tabs_meta', None) or {}),
-            "cover_image_url": (gb.cover_image_url or PLACEHOLDER_COVER_URL),
-        }
-
-        html = render_template(
-            template_file,
-            ctx=ctx,
-            id=gb.id,
-            host_name=getattr(gb.host, 'name', None),
-            host_bio=getattr(gb.host, 'bio', None),
-            host_contact=getattr(gb.host, 'contact', None),
-            host_photo_url=getattr(gb.host, 'host_image_url', None),
-            property_name=gb.property.name,
-            check_in_time=gb.check_in_time,
-            check_out_time=gb.check_out_time,
-            address_street=gb.property.address_street,
-            address_city_state=gb.property.address_city_state,
-            address_zip=gb.property.address_zip,
-            access_info=gb.access_info,
-            welcome_message=getattr(gb, 'welcome_info', None),
-            parking_info=getattr(gb, 'parking_info', None),
-            rules=getattr(gb, 'rules_json', None) or [],
-            things_to_do=gb.things_to_do,
-            places_to_eat=gb.places_to_eat,
-            checkout_info=getattr(gb, 'checkout_info', None),
-            house_manual=getattr(gb, 'house_manual', None),
-            included_tabs=included_tabs,
-            custom_sections=getattr(gb, 'custom_sections', None),
-            custom_tabs_meta=safe_custom_tabs_meta,
-            cover_image_url=gb.cover_image_url,
-        )
+        html, template_key = _render_snapshot_html(gb)
 
         # Compute ETag and store snapshot
         etag = hashlib.sha256((gb.id + (template_key or '') + str(gb.last_modified_time) + str(len(html))).encode('utf-8')).hexdigest()
@@ -1408,6 +1541,7 @@ def publish_guidebook(guidebook_id):
         except Exception:
             pass
         db.session.commit()
+        _schedule_pdf_pregeneration(gb.id)
         return jsonify({"ok": True, "etag": etag, "published_at": gb.published_at.isoformat()})
     except Exception as e:
         db.session.rollback()
@@ -1473,6 +1607,7 @@ def delete_guidebook(guidebook_id):
     try:
         db.session.delete(gb)
         db.session.commit()
+        purge_guidebook_pdfs(guidebook_id)
         return jsonify({"ok": True}), 200
     except Exception as e:
         db.session.rollback()
@@ -1528,6 +1663,12 @@ def update_guidebook(guidebook_id):
     if isinstance(cov, str) and cov.strip().startswith('data:'):
         data['cover_image_url'] = None
 
+    # Routed times from the stored items still hold unless the property is moving
+    moving = 'address_street' in data and data.get('address_street') != getattr(gb.property, 'address_street', None)
+    for field in DISTANCE_ITEM_FIELDS:
+        if field in data and not moving:
+            data[field] = _keep_refined_distances(data.get(field), getattr(gb, field))
+
     for incoming, model_attr in field_map.items():
         if incoming in data:
             setattr(gb, model_attr, data.get(incoming))
@@ -1585,8 +1726,11 @@ def update_guidebook(guidebook_id):
     addr_street = data.get('address_street')
     addr_city_state = data.get('address_city_state')
     addr_zip = data.get('address_zip')
+    prop = None
+    previous_address = None
     if any(v is not None for v in [prop_name, addr_street, addr_city_state, addr_zip]):
         prop = Property.query.get(gb.property_id) if gb.property_id else None
+        previous_address = prop.address_street if prop else None
         if not prop:
             prop = Property(name=prop_name or None, user_id=g.user_id)
             db.session.add(prop)
@@ -1640,6 +1784,10 @@ def update_guidebook(guidebook_id):
         pass
 
     db.session.commit()
+    _schedule_pdf_pregeneration(gb.id)
+    _schedule_distance_refinement(gb.id)
+    if prop is not None and prop.address_street != previous_address:
+        _schedule_recommendation_prefetch(prop)
 
     return jsonify({"ok": True, "guidebook_id": gb.id})
 
@@ -1676,7 +1824,36 @@ def cleanup_expired():
     db.session.commit()
     return jsonify({"ok": True, "deleted": count})
 
+@app.route('/api/maintenance/metrics', methods=['GET'])
+def get_metrics():
+    """Return this worker process's counters, latency summaries and circuit breaker states. Secure with METRICS_SECRET header."""
+    if not METRICS_SECRET:
+        return jsonify({"error": "METRICS_SECRET not configured"}), 501
+    supplied = request.headers.get('X-Metrics-Secret')
+    if supplied != METRICS_SECRET:
+        return jsonify({"error": "Unauthorized"}), 401
+    data = metrics_snapshot()
+    data['circuit_breakers'] = breaker_states()
+    return jsonify(data)
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    """
+    Liveness plus auth key status for this worker process.
+
+    Always 200 while the process serves requests; "status" is "degraded" when
+    the JWKS has never loaded or hasn't refreshed for two refresh intervals
+    (verification keeps using the last keys fetched).
+    """
+    jwks = _jwks.status() if _jwks is not None else None
+    degraded = jwks is not None and jwks['stale']
+    return jsonify({
+        "status": "degraded" if degraded else "ok",
+        "jwks": jwks if jwks is not None else {"configured": False},
+    })
+
 @app.route('/api/ai-recommendations', methods=['POST'])
+@rate_limited('ai')
 def ai_recommendations_route():
     """
     Generic AI recommendations endpoint.
@@ -1685,14 +1862,22 @@ def ai_recommendations_route():
     POST body:
     {
         "type": "food" | "activities" | "nightlife",
+        # or "types": ["food", "activities"] to get several types from one LLM call;
+        # the response is then an object keyed by type
         "location": "address string",
-        "num_items": 5  # optional, defaults to 5
+        "num_items": 5,  # optional, defaults to 5
+        "refresh": false  # optional, bypass cached results
     }
+
+    The whole request is bounded by AI_REQUEST_DEADLINE_SECONDS. If time runs
+    out, the items enriched so far are returned with the response header
+    `X-Recommendations-Partial: true`.
     """
     data = request.json
-    recommendation_type = data.get('type')
+    recommendation_type = data.get('types') or data.get('type')
     address = data.get('location') or data.get('address')
     num_items = data.get('num_items', 5)
+    refresh = str(data.get('refresh', False)).lower() in ('1', 'true', 'yes')
 
     if not recommendation_type:
         return jsonify({"error": "Please provide a recommendation type (food, activities, nightlife, etc.)"}), 400
@@ -1701,14 +1886,75 @@ def ai_recommendations_route():
         return jsonify({"error": "Please provide a valid location to generate recommendations."}), 400
 
     try:
-        recs = get_ai_recommendations(recommendation_type, address, num_items)
-        return jsonify(recs or [])
+        with deadline(AI_REQUEST_DEADLINE_SECONDS) as budget:
+            if isinstance(recommendation_type, list):
+                result = get_multi_ai_recommendations(
+                    [str(t) for t in recommendation_type], address, num_items, refresh=refresh
+                )
+            else:
+                result = get_ai_recommendations(recommendation_type, address, num_items, refresh=refresh) or []
+        return _recommendations_response(result, budget)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "Could not get recommendations"}), 500
 
+@app.route('/api/ai-recommendations/stream', methods=['POST'])
+@rate_limited('ai')
+def ai_recommendations_stream_route():
+    """
+    Streaming variant of /api/ai-recommendations (same POST body).
+
+    Emits progress and each enriched item as soon as its lookups finish, as
+    newline-delimited JSON, or as Server-Sent Events when the client sends
+    `Accept: text/event-stream`. The final "done" event carries the full list,
+    with "partial": true if AI_REQUEST_DEADLINE_SECONDS ran out first.
+    """
+    data = request.json or {}
+    recommendation_type = data.get('type')
+    address = data.get('location') or data.get('address')
+    num_items = data.get('num_items', 5)
+    refresh = str(data.get('refresh', False)).lower() in ('1', 'true', 'yes')
+
+    if not recommendation_type or not isinstance(recommendation_type, str):
+        return jsonify({"error": "Please provide a single recommendation type (food, activities, nightlife, etc.)"}), 400
+
+    if not address or not str(address).strip():
+        return jsonify({"error": "Please provide a valid location to generate recommendations."}), 400
+
+    try:
+        events = stream_ai_recommendations(recommendation_type, address, num_items, refresh=refresh)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    use_sse = request.accept_mimetypes.best_match(['application/x-ndjson', 'text/event-stream']) == 'text/event-stream'
+
+    def generate():
+        # The deadline is set here rather than in the route: the events are produced while streaming
+        with deadline(AI_REQUEST_DEADLINE_SECONDS):
+            for event in events:
+                payload = json.dumps(event)
+                if use_sse:
+                    yield f"event: {event['event']}\ndata: {payload}\n\n"
+                else:
+                    yield payload + "\n"
+
+    # Keep the app context while streaming (the route cache is read from the database)
+    resp = Response(stream_with_context(generate()), mimetype='text/event-stream' if use_sse else 'application/x-ndjson')
+    resp.headers['Cache-Control'] = 'no-cache'
+    # Ask nginx-style proxies not to buffer the stream
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+def _recommendations_response(result, budget):
+    """JSON response for recommendations, flagged when the request deadline cut them short."""
+    resp = jsonify(result)
+    if budget.partial:
+        resp.headers['X-Recommendations-Partial'] = 'true'
+    return resp
+
 @app.route('/api/ai-food', methods=['POST'])
+@rate_limited('ai')
 def ai_food_route():
     """Legacy endpoint for food recommendations. Use /api/ai-recommendations instead."""
     data = request.json
@@ -1716,10 +1962,12 @@ def ai_food_route():
     num_places_to_eat = data.get('num_places_to_eat', 5)
     if not address or not str(address).strip():
         return jsonify({"error": "Please provide a valid location to generate recommendations."}), 400
-    recs = get_ai_food_recommendations(address, num_places_to_eat)
-    return jsonify(recs or {"error": "Could not get recommendations"})
+    with deadline(AI_REQUEST_DEADLINE_SECONDS) as budget:
+        recs = get_ai_food_recommendations(address, num_places_to_eat)
+    return _recommendations_response(recs or {"error": "Could not get recommendations"}, budget)
 
 @app.route('/api/ai-activities', methods=['POST'])
+@rate_limited('ai')
 def ai_activities_route():
     """Legacy endpoint for activity recommendations. Use /api/ai-recommendations instead."""
     data = request.json
@@ -1727,31 +1975,159 @@ def ai_activities_route():
     num_things_to_do = data.get('num_things_to_do', 5)
     if not address or not str(address).strip():
         return jsonify({"error": "Please provide a valid location to generate recommendations."}), 400
-    recs = get_ai_activity_recommendations(address, num_things_to_do)
-    return jsonify(recs or {"error": "Could not get recommendations"})
+    with deadline(AI_REQUEST_DEADLINE_SECONDS) as budget:
+        recs = get_ai_activity_recommendations(address, num_things_to_do)
+    return _recommendations_response(recs or {"error": "Could not get recommendations"}, budget)
+
+PHOTO_WEBP_ENABLED = os.environ.get('PHOTO_WEBP_ENABLED', '1').strip().lower() not in ('0', 'false', 'no')
+# Overall time allowed for streaming one upstream photo (each read also has its own timeout)
+PHOTO_FETCH_DEADLINE_SECONDS = float(os.environ.get('PHOTO_FETCH_DEADLINE_SECONDS', '30'))
 
 @app.route('/api/place-photo', methods=['GET'])
 def get_place_photo():
-    """Proxy endpoint to serve Google Places photos and bypass CORS restrictions."""
+    """Proxy endpoint to serve Google Places photos and bypass CORS restrictions.
+
+    Photos are cached on disk per (photo_reference, width bucket) and served with
+    a strong ETag and Last-Modified, so repeat views cost no Google fetch. On a
+    miss the upstream body is streamed through in chunks (and into the cache), so
+    memory per photo stays flat. When the client accepts WebP (or passes
+    format=webp) the photo is transcoded. Only misses are rate limited.
+    """
     photo_reference = request.args.get('photo_reference')
     maxwidth = request.args.get('maxwidth', 800)
     
     if not photo_reference:
         return jsonify({"error": "photo_reference required"}), 400
-    
+
+    width = width_bucket(maxwidth)
+    wants_webp = request.args.get('format') == 'webp' or 'image/webp' in request.accept_mimetypes.values()
+    # Only negotiate WebP when it can actually be produced, so keys and ETags never claim it falsely
+    fmt = 'webp' if PHOTO_WEBP_ENABLED and wants_webp and webp_supported() else 'orig'
+    etag = photo_etag(photo_reference, width, fmt)
+
+    def with_photo_headers(resp):
+        resp.headers['Cache-Control'] = 'public, max-age=86400'  # Cache for 24 hours
+        resp.headers['Access-Control-Allow-Origin'] = '*'
+        resp.vary.add('Accept')
+        return resp
+
+    # The image behind a photo_reference never changes, so a matching ETag needs no lookup
+    if request.if_none_match.contains(etag):
+        resp = make_response('', 304)
+        resp.set_etag(etag)
+        return with_photo_headers(resp)
+
+    def open_upstream():
+        photo_url = google_places_photo_url(photo_reference, maxwidth=width)
+        breaker = get_breaker('places_photo')
+        if not breaker.allow():
+            raise CircuitOpenError("places_photo circuit is open")
+        try:
+            acquire_quota('places_photo')
+        except Exception:
+            breaker.abandon()
+            raise
+        try:
+            resp = get_session().get(photo_url, timeout=PLACES_PHOTO_TIMEOUT, stream=True)
+        except Exception:
+            breaker.record_failure()
+            raise
+        # A bad or expired photo_reference (4xx) says nothing about upstream health
+        if resp.status_code >= 500 or resp.status_code == 429:
+            breaker.record_failure()
+        elif resp.status_code >= 400:
+            breaker.abandon()
+        else:
+            breaker.record_success()
+        try:
+            resp.raise_for_status()
+            length = resp.headers.get('Content-Length')
+            if length and length.isdigit() and int(length) > PHOTO_MAX_BYTES:
+                raise PhotoTooLarge(f"photo is {length} bytes")
+        except Exception:
+            resp.close()
+            raise
+        return resp
+
+    def fetch():
+        resp = open_upstream()
+        return _iter_and_close(resp), resp.headers.get('Content-Type', 'image/jpeg')
+
+    cached = get_cached_photo(photo_reference, width, fmt)
+    release = None
+    if cached is None:
+        rejected, release = _admit_request('photo')
+        if rejected is not None:
+            return rejected
     try:
-        photo_url = google_places_photo_url(photo_reference, maxwidth=int(maxwidth))
-        resp = requests.get(photo_url, timeout=10)
-        resp.raise_for_status()
-        
-        # Return image with proper CORS headers
-        image_resp = make_response(resp.content)
-        image_resp.headers['Content-Type'] = resp.headers.get('Content-Type', 'image/jpeg')
-        image_resp.headers['Cache-Control'] = 'public, max-age=86400'  # Cache for 24 hours
-        image_resp.headers['Access-Control-Allow-Origin'] = '*'
-        return image_resp
+        # One request per photo (the leader) streams the upstream body straight
+        # through, teeing it into the cache, instead of buffering the whole image
+        # before the first byte; concurrent requests wait for the cached file.
+        # HEAD sends no body, so it fetches through the cache instead.
+        streamable = cached is None and fmt == 'orig' and request.method != 'HEAD'
+        release_fetch = claim_photo_fetch(photo_reference, width, fmt) if streamable else None
+        if release_fetch is not None:
+            cached = get_cached_photo(photo_reference, width, fmt)
+            if cached is not None:
+                release_fetch()
+            else:
+                try:
+                    upstream = open_upstream()
+                except Exception:
+                    release_fetch()
+                    raise
+                mimetype = upstream.headers.get('Content-Type', 'image/jpeg')
+                body = tee_photo(
+                    photo_reference, width, fmt, _iter_and_close(upstream), mimetype,
+                    deadline=time.monotonic() + PHOTO_FETCH_DEADLINE_SECONDS
+                )
+                # No Content-Length: the deadline or size limit can cut the stream short,
+                # and the (chunked) response must then read as incomplete, not as a whole image
+                image_resp = Response(_release_after(body, release_fetch), mimetype=mimetype)
+                image_resp.set_etag(etag)
+                image_resp.last_modified = datetime.now(timezone.utc)
+                # The upstream fetch continues while the body streams. Closing a body
+                # that never started skips the generators' cleanup, so close the
+                # upstream connection here too.
+                image_resp.call_on_close(upstream.close)
+                image_resp.call_on_close(release_fetch)
+                image_resp.call_on_close(release)
+                release = None
+                return with_photo_headers(image_resp)
+        path, mimetype = cached or get_or_fetch_photo(photo_reference, width, fmt, fetch)
+    except PhotoTooLarge as e:
+        return jsonify({"error": f"Photo too large: {str(e)}"}), 502
+    except CircuitOpenError as e:
+        resp = jsonify({"error": f"Photo service unavailable: {str(e)}"})
+        resp.headers['Retry-After'] = '30'
+        return resp, 503
     except Exception as e:
         return jsonify({"error": f"Failed to fetch photo: {str(e)}"}), 500
+    finally:
+        if release is not None:
+            release()
+
+    if fmt == 'webp' and mimetype != 'image/webp':
+        # This photo couldn't be transcoded; it is the original, so validate it as one
+        etag = photo_etag(photo_reference, width, 'orig')
+
+    # Return image with proper CORS headers
+    image_resp = send_file(path, mimetype=mimetype, conditional=True, etag=etag, max_age=86400)
+    return with_photo_headers(image_resp)
+
+def _release_after(chunks, release):
+    """Yield chunks, calling release() as soon as they are exhausted or abandoned."""
+    try:
+        yield from chunks
+    finally:
+        release()
+
+def _iter_and_close(resp):
+    """Yield an upstream response body in chunks, releasing the connection when done."""
+    try:
+        yield from resp.iter_content(PHOTO_STREAM_CHUNK_BYTES)
+    finally:
+        resp.close()
 
 @app.route('/api/guidebook/<guidebook_id>/template', methods=['POST'])
 def update_template_key(guidebook_id):
@@ -1814,6 +2190,10 @@ def toggle_guidebook(guidebook_id):
 
     db.session.commit()
 
+    # Warm the PDF cache so the first download after publishing is a cache hit
+    if gb.active:
+        _schedule_pdf_pregeneration(gb.id)
+
     return jsonify({
         "ok": True,
         "active": gb.active,
@@ -1822,6 +2202,7 @@ def toggle_guidebook(guidebook_id):
     })
 
 @app.route('/api/places/search', methods=['POST'])
+@rate_limited('places')
 def places_search():
     """Proxy Google Places Text Search. Returns minimal normalized items.
     Body: { "query": string, "near": string|null }
@@ -1832,76 +2213,128 @@ def places_search():
     near = (data.get('near') or '').strip()
     if not query:
         return jsonify({"error": "query is required"}), 400
-    try:
-        resp = google_places_text_search(query, location=near or None)
-        items = []
-        for r in resp.get('results', [])[:8]:
-            items.append({
+    def fetch(q, location):
+        resp = google_places_text_search(q, location=location or None)
+        return [
+            {
                 'name': r.get('name') or '',
                 'address': r.get('formatted_address') or '',
                 'place_id': r.get('place_id') or '',
-            })
+            }
+            for r in resp.get('results', [])
+        ]
+
+    try:
+        # Keystroke-by-keystroke queries are answered from recent prefix results where possible
+        items = search_places(query, near, fetch)[:8]
         return jsonify({ 'items': items })
     except Exception as e:
         log.error("places_search error: %s: %s", type(e).__name__, e)
         return jsonify({"error": "Failed to search places"}), 502
 
+def _place_item(entry: dict, origin: str, origin_coords=None) -> dict:
+    """DynamicItem-like object for a place catalog entry, with driving time from origin.
+    driving_minutes comes from the route cache when this drive was routed before, otherwise it is
+    a local estimate from coordinates (refined in the background once saved). No routing call is made.
+    """
+    rating = entry.get('rating')
+    types = entry.get('types') or []
+    website = entry.get('website') or ''
+    parts = []
+    if rating is not None:
+        parts.append(f"Rating {rating}")
+    if types:
+        parts.append((types[0] or '').replace('_', ' ').title())
+    if website:
+        parts.append(website)
+    description = ' • '.join([p for p in parts if p])
+    address = entry.get('formatted_address') or ''
+
+    coords = coords_of(entry)
+    driving_minutes = None
+    estimated = False
+    if origin and address:
+        routed = get_cached_routes(origin, [(address, entry.get('place_id'))]).get(0)
+        if routed:
+            driving_minutes = routed['duration_minutes']
+        elif coords:
+            origin_coords = origin_coords or google_geocode(origin)
+            if origin_coords:
+                driving_minutes = estimate_driving(origin_coords, coords)['duration_minutes']
+                estimated = True
+
+    return {
+        'name': entry.get('name') or '',
+        'address': address,
+        'description': description,
+        # Return the raw photo_reference so the frontend can call our
+        # /api/place-photo proxy endpoint to bypass browser CORS.
+        # The frontend expects a non-http string here and will proxy it.
+        'image_url': entry.get('photo_reference') or '',
+        'place_id': entry.get('place_id'),
+        'lat': coords[0] if coords else None,
+        'lng': coords[1] if coords else None,
+        'driving_minutes': driving_minutes,
+        'driving_minutes_estimated': estimated,
+    }
+
 @app.route('/api/places/enrich', methods=['GET'])
+@rate_limited('places')
 def places_enrich():
     """Given a place_id, return a DynamicItem-like normalized object.
-    Response: { name, address, description, image_url, driving_minutes }
+    Response: { name, address, description, image_url, place_id, lat, lng, driving_minutes, driving_minutes_estimated }
     Query params: place_id (required), origin (optional - property address for distance calculation)
+    Details are read through the shared place catalog, so places already used by any
+    guidebook need no Places call.
     """
     place_id = (request.args.get('place_id') or '').strip()
     origin = (request.args.get('origin') or '').strip()
     if not place_id:
         return jsonify({"error": "place_id is required"}), 400
     try:
-        det = google_places_details(place_id)
-        result = det.get('result') or {}
-        name = result.get('name') or ''
-        address = result.get('formatted_address') or ''
-        website = result.get('website') or ''
-        rating = result.get('rating')
-        types = result.get('types') or []
-        parts = []
-        if rating is not None:
-            parts.append(f"Rating {rating}")
-        if types:
-            parts.append((types[0] or '').replace('_', ' ').title())
-        if website:
-            parts.append(website)
-        description = ' • '.join([p for p in parts if p])
-        image_url = ''
-        photos = result.get('photos') or []
-        if photos:
-            ref = (photos[0] or {}).get('photo_reference')
-            if ref:
-                # Return the raw photo_reference so the frontend can call our
-                # /api/place-photo proxy endpoint to bypass browser CORS.
-                # The frontend expects a non-http string here and will proxy it.
-                image_url = ref
-
-        # Calculate driving distance if origin is provided
-        driving_minutes = None
-        if origin and address:
-            distance_data = google_distance_matrix(origin, address)
-            driving_minutes = distance_data.get('duration_minutes')
-
-        return jsonify({
-            'name': name,
-            'address': address,
-            'description': description,
-            'image_url': image_url,
-            'driving_minutes': driving_minutes,
-        })
+        entry = get_or_fetch_place(place_id)
+        if entry is None:
+            return jsonify({"error": "Place not found"}), 404
+        return jsonify(_place_item(entry, origin))
     except Exception as e:
         log.error("places_enrich error: %s: %s", type(e).__name__, e)
         return jsonify({"error": "Failed to enrich place"}), 502
 
-# In-memory cache for generated PDFs for the lifetime of the process
-PDF_CACHE = {}
-PRINT_PDF_CACHE = {}
+@app.route('/api/places/nearby', methods=['GET'])
+@rate_limited('places')
+def places_nearby():
+    """Suggest places near a property from the shared place catalog (no Google calls beyond a cached geocode).
+    Query params: origin (required - property address), type (optional Google place type, e.g. restaurant),
+    radius_km (optional, default 10, max 50), limit (optional, default 10, max 25)
+    Response: { items: [ DynamicItem-like objects as from /api/places/enrich ] }
+    """
+    origin = (request.args.get('origin') or '').strip()
+    if not origin:
+        return jsonify({"error": "origin is required"}), 400
+    place_type = (request.args.get('type') or '').strip() or None
+    try:
+        radius_km = min(max(float(request.args.get('radius_km', 10)), 0.1), 50)
+        limit = min(max(int(request.args.get('limit', 10)), 1), 25)
+    except ValueError:
+        return jsonify({"error": "radius_km and limit must be numbers"}), 400
+    try:
+        origin_coords = google_geocode(origin)
+        if not origin_coords:
+            return jsonify({'items': []})
+        places = nearby_places(origin_coords, radius_km, place_type=place_type, limit=limit)
+        return jsonify({'items': [_place_item(entry, origin, origin_coords) for entry in places]})
+    except Exception as e:
+        log.error("places_nearby error: %s: %s", type(e).__name__, e)
+        return jsonify({"error": "Failed to find nearby places"}), 502
+
+# Generated PDFs are cached as files (see utils/pdf_cache.py) so cache hits are
+# served from disk with conditional/Range support instead of copying bytes.
+# Optional offload of the file body to a fronting proxy:
+#   PDF_SENDFILE_MODE=x-accel    -> nginx X-Accel-Redirect; PDF_ACCEL_REDIRECT_PREFIX is an
+#                                   internal location aliased to PDF_CACHE_DIR
+#   PDF_SENDFILE_MODE=x-sendfile -> Apache/lighttpd X-Sendfile with the absolute file path
+PDF_SENDFILE_MODE = (os.environ.get('PDF_SENDFILE_MODE') or '').strip().lower()
+PDF_ACCEL_REDIRECT_PREFIX = os.environ.get('PDF_ACCEL_REDIRECT_PREFIX', '/_pdf_cache/')
 
 def _pdf_cache_key(guidebook: Guidebook, template_key: str) -> str:
     # Use id + template; include last_modified_time when available for better busting
@@ -1909,6 +2342,310 @@ def _pdf_cache_key(guidebook: Guidebook, template_key: str) -> str:
     ts_val = str(ts.timestamp()) if hasattr(ts, 'timestamp') else str(ts)
     return f"{guidebook.id}:{template_key}:{ts_val}"
 
+def _pdf_not_modified(etag: str):
+    """Return a 304 response if the client already has this PDF version, else None."""
+    if request.if_none_match.contains(etag):
+        resp = make_response('', 304)
+        resp.set_etag(etag)
+        return resp
+    return None
+
+def _send_pdf_file(path: str, etag: str, download_name: str, as_attachment: bool):
+    """Serve a cached PDF from disk (zero-copy where the server supports it)."""
+    if PDF_SENDFILE_MODE in ('x-accel', 'x-sendfile'):
+        # The proxy streams the file and handles Range itself; we only send headers.
+        resp = werkzeug_send_file(
+            path,
+            request.environ,
+            mimetype='application/pdf',
+            as_attachment=as_attachment,
+            download_name=download_name,
+            conditional=False,
+            etag=etag,
+            use_x_sendfile=True,
+        )
+        if PDF_SENDFILE_MODE == 'x-accel':
+            resp.headers.pop('X-Sendfile', None)
+            resp.headers['X-Accel-Redirect'] = PDF_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + cache_relative_path(path)
+    else:
+        # conditional=True handles If-None-Match/If-Modified-Since and Range (206)
+        resp = send_file(
+            path,
+            mimetype='application/pdf',
+            as_attachment=as_attachment,
+            download_name=download_name,
+            conditional=True,
+            etag=etag,
+        )
+    resp.headers['Cache-Control'] = 'public, max-age=3600'
+    return resp
+
+def _send_pdf_bytes(pdf_bytes: bytes, etag: str, download_name: str, as_attachment: bool):
+    """Fallback when the PDF could not be written to the disk cache."""
+    resp = send_file(
+        io.BytesIO(pdf_bytes),
+        mimetype='application/pdf',
+        as_attachment=as_attachment,
+        download_name=download_name,
+        etag=etag,
+    )
+    resp.headers['Cache-Control'] = 'public, max-age=3600'
+    return resp
+
+def _store_pdf_or_none(guidebook_id: str, variant: str, version: str, pdf_bytes: bytes) -> str | None:
+    try:
+        return store_pdf(guidebook_id, variant, version, pdf_bytes)
+    except Exception as e:
+        log.warning("Failed to write PDF cache file for %s/%s: %s: %s", guidebook_id, variant, type(e).__name__, e)
+        return None
+
+_pdf_render_locks = KeyedLocks()
+
+def _pdf_variant(gb: Guidebook, template_key: str, qr_url: str | None = None) -> tuple[str, str]:
+    """Return (variant, etag) identifying one version of a template PDF."""
+    # Incorporate QR params into cache key so variants don't collide
+    cache_key = _pdf_cache_key(gb, template_key)
+    variant = template_key
+    if qr_url:
+        try:
+            qh = hashlib.sha256(qr_url.encode('utf-8')).hexdigest()[:12]
+        except Exception:
+            qh = 'qr'
+        cache_key = f"{cache_key}:qr:{qh}"
+        variant = f"{template_key}-qr-{qh}"
+    return variant, hashlib.sha256(cache_key.encode('utf-8')).hexdigest()
+
+def _print_pdf_variant(gb: Guidebook) -> tuple[str, str]:
+    """Return (variant, etag) identifying the current version of the print PDF."""
+    # Cache key includes template and last modified time
+    variant = (getattr(gb, 'template_key', None) or 'template_welcomebook') + '_print'
+    return variant, hashlib.sha256(_pdf_cache_key(gb, variant).encode('utf-8')).hexdigest()
+
+def _render_template_pdf(gb: Guidebook, template_key: str, qr_url: str | None = None) -> bytes:
+    # The generator reads gb.template_key, so temporarily override it.
+    original_template = getattr(gb, 'template_key', None)
+    try:
+        gb.template_key = template_key
+        return pdf_generator.create_guidebook_pdf(gb, qr_url=qr_url)
+    finally:
+        gb.template_key = original_template
+
+def _render_pdf_once(guidebook_id: str, variant: str, etag: str, render) -> tuple[str | None, bytes | None]:
+    """Return (path, None) for the cached PDF, rendering it on a miss.
+
+    Concurrent callers for the same version (guest requests and the background
+    pre-generation job) wait on one render instead of each running WeasyPrint.
+    If the file cannot be written, returns (None, pdf_bytes) instead.
+    """
+    path = get_cached_pdf_path(guidebook_id, variant, etag)
+    if path is not None:
+        return path, None
+    with _pdf_render_locks.hold(f"{guidebook_id}:{variant}:{etag}"):
+        path = get_cached_pdf_path(guidebook_id, variant, etag)
+        if path is not None:
+            return path, None
+        pdf_bytes = render()
+        path = _store_pdf_or_none(guidebook_id, variant, etag, pdf_bytes)
+        return path, (None if path else pdf_bytes)
+
+# Seconds to wait after the last edit before pre-generating PDFs, so a burst of
+# autosaves results in a single render.
+PDF_PREGENERATE_DELAY_SECONDS = float(os.environ.get('PDF_PREGENERATE_DELAY_SECONDS', '15'))
+
+def _pregenerate_default_pdfs(guidebook_id: str):
+    """Render the print PDF and the default template PDF into the disk cache."""
+    with app.app_context():
+        gb = Guidebook.query.get(guidebook_id)
+        if gb is None:
+            return
+        variant, etag = _print_pdf_variant(gb)
+        try:
+            _render_pdf_once(gb.id, variant, etag, lambda: pdf_generator.create_print_pdf_from_web_template(gb))
+        except Exception as e:
+            log.warning("Print PDF pre-generation failed for %s: %s: %s", guidebook_id, type(e).__name__, e)
+        variant, etag = _pdf_variant(gb, 'template_pdf_original')
+        try:
+            _render_pdf_once(gb.id, variant, etag, lambda: _render_template_pdf(gb, 'template_pdf_original'))
+        except Exception as e:
+            log.warning("PDF pre-generation failed for %s: %s: %s", guidebook_id, type(e).__name__, e)
+
+def _schedule_pdf_pregeneration(guidebook_id: str):
+    """Queue (debounced, deduplicated) background rendering of a guidebook's default PDFs."""
+    try:
+        debounce(f"pdf:{guidebook_id}", PDF_PREGENERATE_DELAY_SECONDS, _pregenerate_default_pdfs, guidebook_id)
+    except Exception as e:
+        log.warning("Failed to schedule PDF pre-generation for %s: %s: %s", guidebook_id, type(e).__name__, e)
+
+# Seconds to wait after the last edit before refining driving times with the Routes API
+DISTANCE_REFINE_DELAY_SECONDS = float(os.environ.get('DISTANCE_REFINE_DELAY_SECONDS', '20'))
+DISTANCE_ITEM_FIELDS = ('things_to_do', 'places_to_eat')
+
+def _property_address(prop) -> str:
+    parts = [getattr(prop, f, None) for f in ('address_street', 'address_city_state', 'address_zip')]
+    return ', '.join(p.strip() for p in parts if isinstance(p, str) and p.strip())
+
+def _refine_guidebook_distances(guidebook_id: str):
+    """Geocode the property if its address changed, then replace estimated driving
+    times on food/activity items with routed times (read through the route cache;
+    misses go out in one batched matrix request)."""
+    with app.app_context():
+        gb = Guidebook.query.get(guidebook_id)
+        prop = gb.property if gb else None
+        address = _property_address(prop) if prop else ''
+        if not address:
+            return
+
+        # A new address invalidates every stored time, estimated or not
+        moved = prop.geocoded_address != address
+        if moved:
+            coords = google_geocode(address)
+            prop.latitude, prop.longitude = coords if coords else (None, None)
+            prop.geocoded_address = address
+            db.session.commit()
+
+        def needs_refinement(item):
+            return isinstance(item, dict) and bool(item.get('address')) and (
+                moved or item.get('driving_minutes') is None or bool(item.get('driving_minutes_estimated'))
+            )
+
+        pending = sorted({
+            (item['address'], item.get('place_id') or None)
+            for field in DISTANCE_ITEM_FIELDS
+            for item in (getattr(gb, field) or [])
+            if needs_refinement(item)
+        }, key=lambda dest: (dest[0], dest[1] or ''))
+        if not pending:
+            return
+        distances = route_matrix(address, pending)
+        refined = {dest: d.get('duration_minutes') for dest, d in zip(pending, distances)}
+
+        # Apply to the latest saved items (the editor may have saved while we were routing),
+        # with the row locked so a concurrent save waits for this update
+        db.session.refresh(gb, with_for_update=True)
+        origin = (prop.latitude, prop.longitude) if prop.latitude is not None else None
+        changed = False
+        values = {}
+        for field in DISTANCE_ITEM_FIELDS:
+            updated = []
+            for item in getattr(gb, field) or []:
+                dest = (item.get('address'), item.get('place_id') or None) if isinstance(item, dict) else None
+                if needs_refinement(item) and dest in refined:
+                    minutes = refined[dest]
+                    if minutes is not None:
+                        item = dict(item, driving_minutes=minutes, driving_minutes_estimated=False)
+                        changed = True
+                    elif moved and origin and coords_of(item):
+                        # No route found; keep a fresh estimate from the new origin
+                        item = dict(item, driving_minutes=estimate_driving(origin, coords_of(item))['duration_minutes'],
+                                    driving_minutes_estimated=True)
+                        changed = True
+                updated.append(item)
+            values[field] = updated
+        if not changed:
+            db.session.rollback()
+            return
+
+        # Refined times aren't an edit: a Core UPDATE keeps last_modified_time (the ORM
+        # would bump it), so a published snapshot stays current and is re-rendered in place
+        snapshot_current = bool(gb.published_html and gb.published_at and gb.last_modified_time
+                                and gb.published_at >= gb.last_modified_time)
+        db.session.execute(
+            update(Guidebook)
+            .where(Guidebook.id == gb.id)
+            .values(last_modified_time=Guidebook.last_modified_time, **values)
+        )
+        db.session.commit()
+        if snapshot_current:
+            _refresh_published_snapshot(guidebook_id)
+        _schedule_pdf_pregeneration(guidebook_id)
+
+def _refresh_published_snapshot(guidebook_id: str):
+    """Re-render a current published snapshot in place, keeping it current (last_modified_time is unchanged)."""
+    try:
+        gb = Guidebook.query.populate_existing().with_for_update().get(guidebook_id)
+        if gb.published_at < gb.last_modified_time:
+            # Edited since; the snapshot is stale anyway until the next publish
+            db.session.rollback()
+            return
+        html, template_key = _render_snapshot_html(gb)
+        etag = hashlib.sha256((gb.id + template_key + str(gb.last_modified_time) + html).encode('utf-8')).hexdigest()
+        db.session.execute(
+            update(Guidebook)
+            .where(Guidebook.id == gb.id)
+            .values(published_html=html, published_etag=etag, published_at=datetime.now(timezone.utc),
+                    last_modified_time=Guidebook.last_modified_time)
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        log.warning("Published snapshot refresh failed for %s: %s: %s", guidebook_id, type(e).__name__, e)
+
+def _keep_refined_distances(incoming, stored):
+    """
+    Keep routed driving times on items the editor sends back with its older estimates.
+
+    The editor holds the estimates it showed when the items were added; without this,
+    each autosave would overwrite the background refinement and schedule it again.
+    """
+    if not isinstance(incoming, list):
+        return incoming
+    routed = {
+        (item.get('address'), item.get('place_id') or None): item
+        for item in stored or []
+        if isinstance(item, dict) and item.get('driving_minutes') is not None
+        and not item.get('driving_minutes_estimated')
+    }
+    merged = []
+    for item in incoming:
+        if isinstance(item, dict) and (item.get('driving_minutes') is None or item.get('driving_minutes_estimated')):
+            match = routed.get((item.get('address'), item.get('place_id') or None))
+            if match is not None:
+                item = dict(item, driving_minutes=match['driving_minutes'], driving_minutes_estimated=False)
+        merged.append(item)
+    return merged
+
+# Warm the recommendation cache for a property's neighborhood as soon as its address
+# is saved, so the editor's food/activities steps are cache hits.
+RECOMMENDATION_PREFETCH_ENABLED = os.environ.get('RECOMMENDATION_PREFETCH_ENABLED', '1').strip().lower() not in ('0', 'false', 'no')
+RECOMMENDATION_PREFETCH_TYPES = [
+    t.strip() for t in os.environ.get('RECOMMENDATION_PREFETCH_TYPES', 'food,activities').split(',') if t.strip()
+]
+# Matches the editor's "Prepopulate with AI" request so the prefetched lists are the ones it asks for
+RECOMMENDATION_PREFETCH_NUM_ITEMS = int(os.environ.get('RECOMMENDATION_PREFETCH_NUM_ITEMS', '5'))
+# Seconds to wait after the last address change (autosaves while typing) before prefetching
+RECOMMENDATION_PREFETCH_DELAY_SECONDS = float(os.environ.get('RECOMMENDATION_PREFETCH_DELAY_SECONDS', '5'))
+# Time budget for one prefetch; background quota waits are long, so it exceeds the interactive one
+RECOMMENDATION_PREFETCH_DEADLINE_SECONDS = float(os.environ.get('RECOMMENDATION_PREFETCH_DEADLINE_SECONDS', '120'))
+
+def _prefetch_recommendations(address: str):
+    """Generate and enrich the default recommendation types for an address into the recommendation cache.
+
+    Runs under a deadline so lists cut short (by time, quota or an open circuit)
+    are not cached; the editor's own request then generates a full list.
+    """
+    with app.app_context(), deadline(RECOMMENDATION_PREFETCH_DEADLINE_SECONDS) as budget:
+        results = get_multi_ai_recommendations(RECOMMENDATION_PREFETCH_TYPES, address, RECOMMENDATION_PREFETCH_NUM_ITEMS)
+        log.info("Prefetched recommendations for %r: %s%s", address,
+                 ", ".join(f"{t}={len(items)}" for t, items in results.items()),
+                 " (partial, not cached)" if budget.partial else "")
+
+def _schedule_recommendation_prefetch(prop):
+    """Queue (debounced per property, background priority) a recommendation prefetch for its saved address."""
+    address = (getattr(prop, 'address_street', None) or '').strip()
+    if not RECOMMENDATION_PREFETCH_ENABLED or not RECOMMENDATION_PREFETCH_TYPES or not address:
+        return
+    try:
+        debounce(f"prefetch:property:{prop.id}", RECOMMENDATION_PREFETCH_DELAY_SECONDS, _prefetch_recommendations, address)
+    except Exception as e:
+        log.warning("Failed to schedule recommendation prefetch for property %s: %s: %s", prop.id, type(e).__name__, e)
+
+def _schedule_distance_refinement(guidebook_id: str):
+    """Queue (debounced, deduplicated) background refinement of a guidebook's driving times."""
+    try:
+        debounce(f"distances:{guidebook_id}", DISTANCE_REFINE_DELAY_SECONDS, _refine_guidebook_distances, guidebook_id)
+    except Exception as e:
+        log.warning("Failed to schedule distance refinement for %s: %s: %s", guidebook_id, type(e).__name__, e)
+
 @app.route('/api/guidebook/<guidebook_id>/pdf', methods=['GET'])
 def get_pdf_on_demand(guidebook_id):
     gb = Guidebook.query.get_or_404(guidebook_id)
@@ -1923,53 +2660,27 @@ def get_pdf_on_demand(guidebook_id):
     else:
         chosen_template = 'template_pdf_original'
 
-    # Incorporate QR params into cache key so variants don't collide
-    cache_key = _pdf_cache_key(gb, chosen_template)
-    if include_qr and qr_url_param:
-        try:
-            qh = hashlib.sha256(qr_url_param.encode('utf-8')).hexdigest()[:12]
-        except Exception:
-            qh = 'qr'
-        cache_key = f"{cache_key}:qr:{qh}"
-    etag = hashlib.sha256(cache_key.encode('utf-8')).hexdigest()
-    if request.headers.get('If-None-Match') == etag:
-        resp = make_response('', 304)
-        resp.headers['ETag'] = etag
-        return resp
-
-    cached = PDF_CACHE.get(cache_key)
-    if cached:
-        resp = send_file(
-            io.BytesIO(cached),
-            mimetype='application/pdf',
-            as_attachment=want_download,
-            download_name='guidebook.pdf'
-        )
-        resp.headers['ETag'] = etag
-        resp.headers['Cache-Control'] = 'public, max-age=3600'
+    variant, etag = _pdf_variant(gb, chosen_template, qr_url_param)
+    not_modified = _pdf_not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    # Serve from the disk cache, generating lazily on a miss
+    path, pdf_bytes = get_cached_pdf_path(gb.id, variant, etag), None
+    if path is None:
+        rejected, release = _admit_request('pdf')
+        if rejected is not None:
+            return rejected
         try:
-            resp.headers['X-PDF-Template-Key'] = chosen_template
-        except Exception:
-            pass
-        return resp
-
-    # Generate PDF lazily. If the generator reads gb.template_key, temporarily override.
-    original_template = getattr(gb, 'template_key', None)
-    try:
-        gb.template_key = chosen_template
-        pdf_bytes = pdf_generator.create_guidebook_pdf(gb, qr_url=qr_url_param)
-    finally:
-        gb.template_key = original_template
-
-    PDF_CACHE[cache_key] = pdf_bytes
-    resp = send_file(
-        io.BytesIO(pdf_bytes),
-        mimetype='application/pdf',
-        as_attachment=want_download,
-        download_name='guidebook.pdf'
-    )
-    resp.headers['ETag'] = etag
-    resp.headers['Cache-Control'] = 'public, max-age=3600'
+            path, pdf_bytes = _render_pdf_once(
+                gb.id, variant, etag, lambda: _render_template_pdf(gb, chosen_template, qr_url_param)
+            )
+        finally:
+            release()
+    if path is None:
+        resp = _send_pdf_bytes(pdf_bytes, etag, 'guidebook.pdf', want_download)
+    else:
+        resp = _send_pdf_file(path, etag, 'guidebook.pdf', want_download)
     try:
         resp.headers['X-PDF-Template-Key'] = chosen_template
     except Exception:
@@ -2009,52 +2720,37 @@ def get_print_pdf(guidebook_id):
     gb = Guidebook.query.get_or_404(guidebook_id)
     want_download = str(request.args.get('download', '1')).lower() in ('1', 'true', 'yes')
 
-    # Cache key includes template and last modified time
-    cache_key = _pdf_cache_key(gb, getattr(gb, 'template_key', 'template_welcomebook') + '_print')
-    etag = hashlib.sha256(cache_key.encode('utf-8')).hexdigest()
+    variant, etag = _print_pdf_variant(gb)
 
     # Check if client has cached version
-    if request.headers.get('If-None-Match') == etag:
-        resp = make_response('', 304)
-        resp.headers['ETag'] = etag
-        return resp
+    not_modified = _pdf_not_modified(etag)
+    if not_modified is not None:
+        return not_modified
 
-    # Check server cache
-    cached = PRINT_PDF_CACHE.get(cache_key)
-    if cached:
-        resp = send_file(
-            io.BytesIO(cached),
-            mimetype='application/pdf',
-            as_attachment=want_download,
-            download_name=f"{getattr(gb.property, 'name', 'guidebook') if hasattr(gb, 'property') else 'guidebook'}_print.pdf"
-        )
-        resp.headers['ETag'] = etag
-        resp.headers['Cache-Control'] = 'public, max-age=3600'
-        resp.headers['X-PDF-Type'] = 'print'
-        return resp
-
-    # Generate PDF from web template
-    try:
-        pdf_bytes = pdf_generator.create_print_pdf_from_web_template(gb)
-    except Exception as e:
-        log.error(f"Failed to generate print PDF: {type(e).__name__}: {e}")
-        return jsonify({"error": "Failed to generate print PDF"}), 500
-
-    # Cache the generated PDF
-    PRINT_PDF_CACHE[cache_key] = pdf_bytes
-
-    # Return PDF
     property_name = getattr(gb.property, 'name', 'guidebook') if hasattr(gb, 'property') else 'guidebook'
     safe_filename = property_name.replace(' ', '_').replace('/', '_')
+    download_name = f"{safe_filename}_print.pdf"
+
+    # Check server (disk) cache, generating from the web template on a miss
+    path, pdf_bytes = get_cached_pdf_path(gb.id, variant, etag), None
+    if path is None:
+        rejected, release = _admit_request('pdf')
+        if rejected is not None:
+            return rejected
+        try:
+            path, pdf_bytes = _render_pdf_once(
+                gb.id, variant, etag, lambda: pdf_generator.create_print_pdf_from_web_template(gb)
+            )
+        except Exception as e:
+            log.error(f"Failed to generate print PDF: {type(e).__name__}: {e}")
+            return jsonify({"error": "Failed to generate print PDF"}), 500
+        finally:
+            release()
 
-    resp = send_file(
-        io.BytesIO(pdf_bytes),
-        mimetype='application/pdf',
-        as_attachment=want_download,
-        download_name=f"{safe_filename}_print.pdf"
-    )
-    resp.headers['ETag'] = etag
-    resp.headers['Cache-Control'] = 'public, max-age=3600'
+    if path is None:
+        resp = _send_pdf_bytes(pdf_bytes, etag, download_name, want_download)
+    else:
+        resp = _send_pdf_file(path, etag, download_name, want_download)
     resp.headers['X-PDF-Type'] = 'print'
 
     return resp
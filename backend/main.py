@@ -2,6 +2,7 @@ from dotenv import load_dotenv
 from jinja2 import Environment, FileSystemLoader
 from weasyprint import HTML, default_url_fetcher
 from utils.aifunctions import get_ai_recommendations
+from utils.qr_poster_pdf import render_qr_poster_pdf
 # Import models from models.py to be used in PDF generation
 from models import Guidebook, Host, Property
 import json
@@ -9,9 +10,13 @@ import ast
 import urllib.parse
 import ssl
 import urllib.request
+import os
 
 load_dotenv()
 
+# Draw the single-page QR poster directly instead of through WeasyPrint (set to 0 to disable)
+QR_POSTER_FAST_PATH = os.environ.get('QR_POSTER_FAST_PATH', '1').lower() not in ('0', 'false', 'no')
+
 # Custom URL fetcher that ignores SSL verification for external images
 def custom_url_fetcher(url):
     """Fetch URLs with relaxed SSL verification to allow external images."""
@@ -265,12 +270,20 @@ def create_guidebook_pdf(guidebook, qr_url: str | None = None):
         'qr_img_src': data['qr_img_src'],
     }
 
-    # Setup Jinja2 environment
-    # Search for templates at project root and inside templates/
-    env = Environment(loader=FileSystemLoader(['.', 'templates']))
     # Expect canonical PDF keys (template_pdf_original, template_pdf_basic). Fallback to original.
     raw_key = getattr(guidebook, 'template_key', None)
     selected_key = raw_key if raw_key in PDF_TEMPLATE_REGISTRY else 'template_pdf_original'
+
+    # Fast path: the QR poster is a fixed one-page layout, drawn straight to PDF.
+    # Returns None for anything it can't reproduce, in which case we fall through.
+    if selected_key == 'template_pdf_qr' and QR_POSTER_FAST_PATH:
+        pdf = render_qr_poster_pdf(ctx)
+        if pdf is not None:
+            return pdf
+
+    # Setup Jinja2 environment
+    # Search for templates at project root and inside templates/
+    env = Environment(loader=FileSystemLoader(['.', 'templates']))
     template_path = PDF_TEMPLATE_REGISTRY.get(selected_key, PDF_TEMPLATE_REGISTRY['template_pdf_original'])
     template = env.get_template(template_path)
 
@@ -20,6 +20,11 @@ class Property(db.Model):
     address_street = db.Column(db.String(100))
     address_city_state = db.Column(db.String(100))
     address_zip = db.Column(db.String(50))
+    # Geocode of the address, used as the origin for local driving estimates.
+    # geocoded_address is the address string it was resolved from (stale when it differs).
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geocoded_address = db.Column(db.Text, nullable=True)
     # Ownership: Supabase user ID (UUID as string)
     user_id = db.Column(db.String(36), index=True, nullable=True)
     guidebooks = db.relationship('Guidebook', backref='property', lazy=True)
@@ -70,3 +75,33 @@ class Guidebook(db.Model):
     published_html = db.Column(db.Text, nullable=True)
     published_etag = db.Column(db.String(64), nullable=True)
     published_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+class RouteCache(db.Model):
+    """Drive time between a normalized origin address and a destination (place_id or address)."""
+    # origin_key: normalized address; destination_key: "place:<place_id>" or "addr:<normalized address>"
+    origin_key = db.Column(db.Text, primary_key=True)
+    destination_key = db.Column(db.Text, primary_key=True)
+    travel_mode = db.Column(db.String(20), primary_key=True)
+    # Misses aren't cached, since lookup failures look the same as "no route"
+    duration_minutes = db.Column(db.Integer, nullable=False)
+    distance_meters = db.Column(db.Integer, nullable=True)
+    fetched_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+
+class Place(db.Model):
+    """Google place shared by every guidebook, so enrichment can skip Places lookups."""
+    place_id = db.Column(db.String(255), primary_key=True)
+    name = db.Column(db.Text, nullable=False)
+    # Normalized name used to match recommendation items without a text search
+    name_key = db.Column(db.Text, nullable=False, index=True)
+    formatted_address = db.Column(db.Text, nullable=True)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    rating = db.Column(db.Float, nullable=True)
+    # List of Google place types, e.g. ["restaurant", "food"]
+    types = db.Column(db.JSON, nullable=True)
+    photo_reference = db.Column(db.Text, nullable=True)
+    website = db.Column(db.Text, nullable=True)
+    fetched_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (db.Index('ix_place_lat_lng', 'latitude', 'longitude'),)
@@ -0,0 +1,154 @@
+"""
+Visual parity check: direct QR poster PDF vs the WeasyPrint template.
+
+Renders a few fixture guidebooks through both utils/qr_poster_pdf.py and
+templates/templates_pdf/template_pdf_qr.html (WeasyPrint), rasterizes page 1
+of each, and compares them. The direct writer uses base-14 Times where
+WeasyPrint uses whatever serif fontconfig resolves (an accepted deviation, see
+utils/qr_poster_pdf.py), so both pages are box-blurred before comparing; what's
+left is layout: frame, title position and wrapping, subtitle, QR placement and
+size, footer.
+
+Run from backend/ (needs the full requirements plus `pip install pypdfium2`):
+
+    python scripts/compare_qr_poster.py --out /tmp/qr-parity
+
+Exits non-zero if any fixture differs by more than --max-diff (fraction of
+pixels). Side-by-side and diff images are written to --out for inspection.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from PIL import Image, ImageChops, ImageFilter  # noqa: E402
+from jinja2 import Environment, FileSystemLoader  # noqa: E402
+from utils.qr_poster_pdf import render_qr_poster_pdf  # noqa: E402
+
+TEMPLATE_PATH = 'templates/templates_pdf/template_pdf_qr.html'
+
+# Fixture guidebooks: (name, ctx without qr_img_src)
+FIXTURES = [
+    ('host', {'property_name': 'Seaside Cottage', 'host': {'name': 'Jamie Rivera'}}),
+    ('no-host', {'property_name': 'Mountain View Cabin', 'host': {}}),
+    ('wrapped-title', {'property_name': 'Blue Heron Lakehouse’s Guest Suite', 'host': {'name': 'Sam'}}),
+    ('untitled', {'property_name': '', 'host': {'name': 'Alex Chen'}}),
+]
+
+
+def fixture_qr_png(modules: int = 33, scale: int = 10) -> bytes:
+    """A deterministic QR-like greyscale PNG (finder squares plus seeded noise)."""
+    rng = random.Random(42)
+    size = modules * scale
+    img = Image.new('L', (modules, modules), 255)
+    px = img.load()
+    for y in range(modules):
+        for x in range(modules):
+            px[x, y] = 0 if rng.random() < 0.5 else 255
+    for ox, oy in ((0, 0), (modules - 7, 0), (0, modules - 7)):
+        for y in range(7):
+            for x in range(7):
+                ring = max(abs(x - 3), abs(y - 3))
+                px[ox + x, oy + y] = 255 if ring == 2 else 0
+    img = img.resize((size, size), Image.NEAREST)
+    buf = BytesIO()
+    img.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def render_weasyprint(ctx: dict) -> bytes:
+    from weasyprint import HTML
+    env = Environment(loader=FileSystemLoader(['.', 'templates']))
+    html_out = env.get_template(TEMPLATE_PATH).render({}, ctx=ctx)
+    return HTML(string=html_out, base_url='.').write_pdf()
+
+
+def rasterize(pdf: bytes, dpi: int) -> Image.Image:
+    import pypdfium2 as pdfium
+    doc = pdfium.PdfDocument(pdf)
+    try:
+        return doc[0].render(scale=dpi / 72).to_pil().convert('L')
+    finally:
+        doc.close()
+
+
+def compare(a: Image.Image, b: Image.Image, blur: float, tolerance: int):
+    """Returns (fraction of differing pixels, diff image)."""
+    if a.size != b.size:
+        b = b.resize(a.size)
+    a_soft = a.filter(ImageFilter.BoxBlur(blur))
+    b_soft = b.filter(ImageFilter.BoxBlur(blur))
+    diff = ImageChops.difference(a_soft, b_soft).point(lambda v: 255 if v > tolerance else 0)
+    hist = diff.histogram()
+    return hist[255] / (diff.width * diff.height), diff
+
+
+def _weasyprint_error():
+    """None if WeasyPrint and its system libraries load, else the reason they don't."""
+    try:
+        import weasyprint  # noqa: F401
+    except (ImportError, OSError) as e:
+        return f"{type(e).__name__}: {str(e).strip().splitlines()[0]}"
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--out', default=None, help='Directory for side-by-side and diff PNGs')
+    parser.add_argument('--dpi', type=int, default=72)
+    parser.add_argument('--blur', type=float, default=3.0, help='Box blur radius applied before diffing')
+    parser.add_argument('--tolerance', type=int, default=48, help='Per-pixel grey difference ignored (0-255)')
+    parser.add_argument('--max-diff', type=float, default=0.02, help='Allowed fraction of differing pixels')
+    parser.add_argument('--fast-only', action='store_true', help='Only render the direct PDF (no WeasyPrint)')
+    args = parser.parse_args()
+
+    if not args.fast_only:
+        error = _weasyprint_error()
+        if error:
+            print(f"WeasyPrint is unavailable ({error}); install its system libraries or use --fast-only")
+            return 2
+
+    os.chdir(BACKEND_DIR)
+    out = Path(args.out) if args.out else None
+    if out:
+        out.mkdir(parents=True, exist_ok=True)
+
+    qr_png = fixture_qr_png()
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        qr_path = Path(tmp) / 'qr.png'
+        qr_path.write_bytes(qr_png)
+        for name, base_ctx in FIXTURES:
+            ctx = dict(base_ctx, qr_img_src=qr_path.as_uri())
+            fast_pdf = render_qr_poster_pdf(ctx, fetch_image=lambda _url: qr_png)
+            if fast_pdf is None:
+                print(f"{name}: direct renderer declined (falls back to WeasyPrint), skipped")
+                continue
+            fast = rasterize(fast_pdf, args.dpi)
+            if args.fast_only:
+                print(f"{name}: direct PDF {len(fast_pdf)} bytes, {fast.width}x{fast.height}px")
+                if out:
+                    fast.save(out / f'{name}-direct.png')
+                continue
+            reference = rasterize(render_weasyprint(ctx), args.dpi)
+            fraction, diff = compare(reference, fast, args.blur, args.tolerance)
+            ok = fraction <= args.max_diff
+            failed = failed or not ok
+            print(f"{name}: {fraction:.2%} of pixels differ ({'ok' if ok else 'FAIL'})")
+            if out:
+                side = Image.new('L', (reference.width * 3, reference.height), 255)
+                side.paste(reference, (0, 0))
+                side.paste(fast.resize(reference.size), (reference.width, 0))
+                side.paste(diff, (reference.width * 2, 0))
+                side.save(out / f'{name}.png')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,59 @@
 import os
 import json
+import hashlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
 from dotenv import load_dotenv
-from openai import OpenAI
-from .google_places import google_places_text_search, google_places_details, google_distance_matrix
+from .openai_client import chat_completion
+from .google_places import google_places_text_search, google_geocode
+from .geo import coords_of, estimate_driving, place_coords
+from .route_cache import get_cached_routes
+from .place_catalog import find_place, get_or_fetch_place
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from models import db, Property
+from .cache import get_cache
+from .deadline import remaining, mark_partial, is_partial
+from .quota import QuotaExhausted
+from .circuit_breaker import CircuitOpenError
 
 load_dotenv()
 
+# Google Places enrichment: concurrent lookups per request and an overall time budget
+ENRICH_MAX_WORKERS = int(os.environ.get("ENRICH_MAX_WORKERS", "5"))
+ENRICH_DEADLINE_SECONDS = float(os.environ.get("ENRICH_DEADLINE_SECONDS", "20"))
+
+# Enriched recommendation lists are shared by nearby properties: the address is
+# geocoded and rounded to a grid cell (2 decimals is roughly 1 km).
+RECOMMENDATION_CACHE_TTL = int(os.environ.get("RECOMMENDATION_CACHE_TTL", str(24 * 3600)))
+RECOMMENDATION_CELL_DECIMALS = int(os.environ.get("RECOMMENDATION_CELL_DECIMALS", "2"))
+
+_recommendation_cache = get_cache("recommendations")
+
+
+def _configured_model(type_name: str, default: str) -> str:
+    """Model for a recommendation type, overridable with RECOMMENDATION_MODEL_<TYPE>."""
+    return os.environ.get(f"RECOMMENDATION_MODEL_{type_name.upper()}") or default
+
+
+# Model for combined multi-type requests; must support JSON schema structured outputs
+MULTI_RECOMMENDATION_MODEL = _configured_model("multi", "gpt-4o")
+MULTI_RECOMMENDATION_PREAMBLE = "Answer every request below in a single JSON object, one key per request."
+MULTI_RECOMMENDATION_ITEM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "address": {"type": "string"},
+        "description": {"type": "string"}
+    },
+    "required": ["name", "address", "description"],
+    "additionalProperties": False
+}
+
 # Configuration for different recommendation types
 RECOMMENDATION_CONFIGS = {
     "food": {
-        "model": "gpt-4-1106-preview",
+        "model": _configured_model("food", "gpt-4-1106-preview"),
         "system_prompt": "You are a helpful assistant that provides diverse, highly-rated restaurant and food recommendations.",
         "user_prompt_template": """Provide a JSON object with a key '{response_key}' containing a list of {num_items} diverse, highly-rated restaurants or food spots near {address}.
         Each item must have 'name', 'address', and a brief 'description'.
@@ -20,7 +64,7 @@ RECOMMENDATION_CONFIGS = {
         "default_response_key": "places_to_eat"
     },
     "activities": {
-        "model": "gpt-4o",
+        "model": _configured_model("activities", "gpt-4o"),
         "system_prompt": "You are a helpful assistant that provides local activities and things to do in a strict JSON format.",
         "user_prompt_template": """For the vacation rental located at {address},
         please provide a list of local activities and things to do.
@@ -33,7 +77,7 @@ RECOMMENDATION_CONFIGS = {
         "default_response_key": "activities"
     },
     "nightlife": {
-        "model": "gpt-4o",
+        "model": _configured_model("nightlife", "gpt-4o"),
         "system_prompt": "You are a helpful assistant that provides nightlife and entertainment recommendations.",
         "user_prompt_template": """Provide a JSON object with a key '{response_key}' containing a list of {num_items} popular nightlife spots, bars, clubs, or entertainment venues near {address}.
         Each item must have 'name', 'address', and a brief 'description'.
@@ -49,7 +93,8 @@ RECOMMENDATION_CONFIGS = {
 def get_ai_recommendations(
     recommendation_type: str,
     address: str,
-    num_items: int = 5
+    num_items: int = 5,
+    refresh: bool = False
 ) -> list:
     """
     Unified AI recommendation engine that fetches recommendations from OpenAI
@@ -59,6 +104,7 @@ def get_ai_recommendations(
         recommendation_type: Type of recommendations ("food", "activities", "nightlife", etc.)
         address: Location to get recommendations for
         num_items: Number of items to recommend (default: 5)
+        refresh: Skip the result cache and generate a fresh list
 
     Returns:
         List of enriched recommendations with name, address, description, photo_reference
@@ -67,42 +113,18 @@ def get_ai_recommendations(
         ValueError: If recommendation_type is not configured
     """
 
-    # Validate recommendation type
-    if recommendation_type not in RECOMMENDATION_CONFIGS:
-        raise ValueError(
-            f"Unknown recommendation type: {recommendation_type}. "
-            f"Available types: {', '.join(RECOMMENDATION_CONFIGS.keys())}"
-        )
+    config = _get_config(recommendation_type)
 
-    config = RECOMMENDATION_CONFIGS[recommendation_type]
+    cell = _location_cell(address)
+    cache_key = _recommendation_cache_key(recommendation_type, config, cell, num_items)
+    if not refresh:
+        cached_key, cached = _get_cached_recommendations(recommendation_type, config, cell, num_items)
+        if cached is not None:
+            print(f"Serving cached {recommendation_type} recommendations for {cached_key}")
+            return _reuse_cached_recommendations(cached, address)
 
     try:
-        # Initialize OpenAI client
-        client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-
-        # Build the prompt
-        user_prompt = config["user_prompt_template"].format(
-            address=address,
-            num_items=num_items,
-            response_key=config["default_response_key"]
-        )
-
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model=config["model"],
-            messages=[
-                {"role": "system", "content": config["system_prompt"]},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-
-        # Parse the response
-        raw_response = response.choices[0].message.content
-        parsed_response = json.loads(raw_response)
-
-        # Extract items from response (try multiple possible keys)
-        items = _extract_items_from_response(parsed_response, config["response_keys"])
+        items = _generate_items(recommendation_type, config, address, num_items)
 
         if not items:
             print(f"WARNING: No items found in OpenAI response for {recommendation_type}")
@@ -114,6 +136,8 @@ def get_ai_recommendations(
         print(f"--- Enhanced {recommendation_type.title()} Response ---")
         print(json.dumps(enriched_items, indent=2))
 
+        _store_recommendations(cache_key, address, enriched_items)
+
         return enriched_items
 
     except Exception as e:
@@ -121,6 +145,308 @@ def get_ai_recommendations(
         return []
 
 
+def stream_ai_recommendations(
+    recommendation_type: str,
+    address: str,
+    num_items: int = 5,
+    refresh: bool = False
+):
+    """
+    Streaming form of get_ai_recommendations that yields events as work progresses.
+
+    Events (dicts, in order):
+        {"event": "status", "phase": "generating"}
+        {"event": "status", "phase": "enriching", "total": n}
+        {"event": "item", "index": i, "item": {...}}  once per enriched item, as soon
+            as its lookups finish; index is the item's position in the LLM list
+        {"event": "distances", "driving_minutes": {index: minutes}}
+        {"event": "done", "items": [...], "partial": bool}  the final list, same as
+            get_ai_recommendations; partial is true if the request deadline cut it short
+        {"event": "error", "error": "..."}  instead of "done" if generation failed
+
+    Raises:
+        ValueError: If recommendation_type is not configured (before anything is yielded)
+    """
+    config = _get_config(recommendation_type)
+    return _stream_recommendations(recommendation_type, config, address, num_items, refresh)
+
+
+def _stream_recommendations(recommendation_type: str, config: dict, address: str, num_items, refresh: bool):
+    cell = _location_cell(address)
+    cache_key = _recommendation_cache_key(recommendation_type, config, cell, num_items)
+    if not refresh:
+        _, cached = _get_cached_recommendations(recommendation_type, config, cell, num_items)
+        if cached is not None:
+            items = _reuse_cached_recommendations(cached, address)
+            for index, item in enumerate(items):
+                yield {"event": "item", "index": index, "item": item}
+            yield {"event": "done", "items": items, "partial": False}
+            return
+
+    try:
+        yield {"event": "status", "phase": "generating"}
+        items = _generate_items(recommendation_type, config, address, num_items)
+        yield {"event": "status", "phase": "enriching", "total": len(items)}
+
+        results = {}
+        for index, enriched in _iter_enriched(items, address):
+            if enriched:
+                results[index] = enriched
+                yield {"event": "item", "index": index, "item": enriched}
+
+        indices = sorted(results)
+        enriched_items = [results[index] for index in indices]
+        try:
+            _attach_driving_minutes(enriched_items, address)
+        except Exception as e:
+            print(f"WARNING: Distance calculation failed: {e}")
+        yield {
+            "event": "distances",
+            "driving_minutes": {index: results[index]["driving_minutes"] for index in indices}
+        }
+
+        _store_recommendations(cache_key, address, enriched_items)
+        yield {"event": "done", "items": enriched_items, "partial": is_partial()}
+
+    except Exception as e:
+        print(f"ERROR in stream_ai_recommendations({recommendation_type}): {e}")
+        yield {"event": "error", "error": "Could not get recommendations"}
+
+
+def get_multi_ai_recommendations(
+    recommendation_types: list,
+    address: str,
+    num_items: int = 5,
+    refresh: bool = False
+) -> dict:
+    """
+    Recommendations for several types at once, e.g. ["food", "activities"].
+
+    Types not already cached are generated with a single structured OpenAI
+    request (one array per type), then enriched together in one concurrent
+    Places pass, with driving times estimated locally from the shared origin.
+
+    Args:
+        recommendation_types: Types to fetch (each must be in RECOMMENDATION_CONFIGS)
+        address: Location to get recommendations for
+        num_items: Number of items to recommend per type (default: 5)
+        refresh: Skip the result cache and generate fresh lists
+
+    Returns:
+        Dict mapping each type to its list of enriched recommendations
+
+    Raises:
+        ValueError: If any recommendation type is not configured
+    """
+    types = list(dict.fromkeys(recommendation_types))
+    configs = {t: _get_config(t) for t in types}
+    results = {t: [] for t in types}
+
+    # The origin is geocoded once and shared by every type's cache key
+    cell = _location_cell(address)
+    missing = []
+    for t in types:
+        cached_key, cached = (None, None) if refresh else _get_cached_recommendations(t, configs[t], cell, num_items)
+        if cached is not None:
+            print(f"Serving cached {t} recommendations for {cached_key}")
+            results[t] = _reuse_cached_recommendations(cached, address)
+        else:
+            missing.append(t)
+    if not missing:
+        return results
+
+    try:
+        # Lists from the combined request are keyed by its model and prompt as well
+        multi = len(missing) > 1
+        if multi:
+            generated = _generate_multi_items(missing, configs, address, num_items)
+        else:
+            generated = {missing[0]: _generate_items(missing[0], configs[missing[0]], address, num_items)}
+
+        # One shared enrichment pass over every type's items
+        flat = [(t, item) for t in missing for item in generated.get(t) or []]
+        enriched_by_index = dict(_iter_enriched([item for _, item in flat], address))
+        enriched_by_type = {t: [] for t in missing}
+        for index, (t, _) in enumerate(flat):
+            if enriched_by_index.get(index):
+                enriched_by_type[t].append(enriched_by_index[index])
+
+        all_enriched = [item for t in missing for item in enriched_by_type[t]]
+        try:
+            _attach_driving_minutes(all_enriched, address)
+        except Exception as e:
+            print(f"WARNING: Distance calculation failed: {e}")
+
+        for t in missing:
+            results[t] = enriched_by_type[t]
+            cache_key = _recommendation_cache_key(t, configs[t], cell, num_items, multi=multi)
+            _store_recommendations(cache_key, address, enriched_by_type[t])
+    except Exception as e:
+        print(f"ERROR in get_multi_ai_recommendations({', '.join(missing)}): {e}")
+
+    return results
+
+
+def _generate_multi_items(recommendation_types: list, configs: dict, address: str, num_items) -> dict:
+    """
+    Ask OpenAI for several types' items in one request, using a JSON schema with
+    one array per type (keyed by its default_response_key).
+
+    Returns:
+        Dict mapping each type to its raw (unenriched) items
+    """
+    keys = {t: configs[t]["default_response_key"] for t in recommendation_types}
+    schema = {
+        "type": "object",
+        "properties": {
+            keys[t]: {"type": "array", "items": MULTI_RECOMMENDATION_ITEM_SCHEMA} for t in recommendation_types
+        },
+        "required": [keys[t] for t in recommendation_types],
+        "additionalProperties": False
+    }
+
+    system_prompt = " ".join(configs[t]["system_prompt"] for t in recommendation_types)
+    sections = "\n\n".join(
+        configs[t]["user_prompt_template"].format(address=address, num_items=num_items, response_key=keys[t])
+        for t in recommendation_types
+    )
+    user_prompt = MULTI_RECOMMENDATION_PREAMBLE + "\n\n" + sections
+
+    response = chat_completion(
+        "+".join(recommendation_types),
+        model=MULTI_RECOMMENDATION_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        response_format={
+            "type": "json_schema",
+            "json_schema": {"name": "recommendations", "strict": True, "schema": schema}
+        }
+    )
+
+    parsed_response = json.loads(response.choices[0].message.content)
+    return {
+        t: _extract_items_from_response(parsed_response, [keys[t]] + configs[t]["response_keys"])
+        for t in recommendation_types
+    }
+
+
+def _get_config(recommendation_type: str) -> dict:
+    if recommendation_type not in RECOMMENDATION_CONFIGS:
+        raise ValueError(
+            f"Unknown recommendation type: {recommendation_type}. "
+            f"Available types: {', '.join(RECOMMENDATION_CONFIGS.keys())}"
+        )
+    return RECOMMENDATION_CONFIGS[recommendation_type]
+
+
+def _generate_items(recommendation_type: str, config: dict, address: str, num_items) -> list:
+    """Ask OpenAI for the raw (unenriched) recommendation items."""
+    # Build the prompt
+    user_prompt = config["user_prompt_template"].format(
+        address=address,
+        num_items=num_items,
+        response_key=config["default_response_key"]
+    )
+
+    # Call OpenAI API (shared client; latency and token usage recorded per type)
+    response = chat_completion(
+        recommendation_type,
+        model=config["model"],
+        messages=[
+            {"role": "system", "content": config["system_prompt"]},
+            {"role": "user", "content": user_prompt}
+        ],
+        response_format={"type": "json_object"}
+    )
+
+    # Parse the response
+    raw_response = response.choices[0].message.content
+    parsed_response = json.loads(raw_response)
+
+    # Extract items from response (try multiple possible keys)
+    return _extract_items_from_response(parsed_response, config["response_keys"])
+
+
+def _store_recommendations(cache_key: str, address: str, enriched_items: list) -> None:
+    # Lists cut short by the request deadline aren't cached, so the next request gets a full one
+    if enriched_items and not is_partial():
+        _recommendation_cache.set(
+            cache_key,
+            {"origin": _normalize_address(address), "items": enriched_items},
+            RECOMMENDATION_CACHE_TTL
+        )
+
+
+def _normalize_address(address: str) -> str:
+    return " ".join(str(address or "").lower().split())
+
+
+def _location_cell(address: str) -> str:
+    """
+    Map an address to a coarse grid cell so nearby properties share cache entries.
+    Falls back to the normalized address when it can't be geocoded.
+    """
+    try:
+        coords = google_geocode(address)
+    except Exception as e:
+        print(f"WARNING: Geocoding failed for {address}: {e}")
+        coords = None
+    if not coords:
+        return f"addr:{_normalize_address(address)}"
+    lat, lng = coords
+    return f"{lat:.{RECOMMENDATION_CELL_DECIMALS}f},{lng:.{RECOMMENDATION_CELL_DECIMALS}f}"
+
+
+def _prompt_version(config: dict, multi: bool = False) -> str:
+    """
+    Short hash of a type's model and prompts, so editing them invalidates cached lists.
+    Lists produced by the multi-type request also hash that request's model and framing.
+    """
+    version = config
+    if multi:
+        version = {
+            "config": config,
+            "model": MULTI_RECOMMENDATION_MODEL,
+            "preamble": MULTI_RECOMMENDATION_PREAMBLE,
+            "item_schema": MULTI_RECOMMENDATION_ITEM_SCHEMA,
+        }
+    return hashlib.sha256(json.dumps(version, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def _recommendation_cache_key(recommendation_type: str, config: dict, cell: str, num_items, multi: bool = False) -> str:
+    return f"{recommendation_type}|{cell}|{num_items}|{_prompt_version(config, multi)}"
+
+
+def _get_cached_recommendations(recommendation_type: str, config: dict, cell: str, num_items):
+    """
+    Cached list for a type, whether it came from its own request or the multi-type one.
+    Returns: (cache_key, cached) or (None, None)
+    """
+    for multi in (False, True):
+        cache_key = _recommendation_cache_key(recommendation_type, config, cell, num_items, multi)
+        cached = _recommendation_cache.get(cache_key)
+        if cached is not None:
+            return cache_key, cached
+    return None, None
+
+
+def _reuse_cached_recommendations(cached: dict, address: str) -> list:
+    """
+    Return a cached list for this address. Driving times are origin-specific, so
+    they are re-estimated from the stored coordinates when the list was built
+    for a different address in the same cell.
+    """
+    items = cached.get("items") or []
+    if cached.get("origin") != _normalize_address(address):
+        try:
+            _attach_driving_minutes(items, address)
+        except Exception as e:
+            print(f"WARNING: Distance calculation failed: {e}")
+    return items
+
+
 def _extract_items_from_response(response_data: dict | list, possible_keys: list) -> list:
     """
     Extract items array from OpenAI response, trying multiple possible keys.
@@ -149,72 +475,214 @@ def _enrich_with_google_places(items: list, location: str) -> list:
     """
     Enrich recommendation items with Google Places data (real address, photo, driving distance).
 
+    Items are looked up concurrently (at most ENRICH_MAX_WORKERS at a time) and the
+    whole pass is bounded by ENRICH_DEADLINE_SECONDS (or the request deadline, if
+    sooner). Items whose lookups fail or don't finish in time are dropped; the rest keep their original order.
+    Driving times are estimated locally from each place's coordinates.
+
     Args:
         items: List of items from OpenAI (each with name, address, description)
         location: General location for Google Places search (also used as origin for distance calculation)
 
     Returns:
-        List of enriched items with photo_reference and driving_minutes fields
+        List of enriched items with photo_reference, lat/lng and driving_minutes fields
+    """
+    results = [None] * len(items)
+    for index, enriched in _iter_enriched(items, location):
+        results[index] = enriched
+
+    enriched = [item for item in results if item]
+    try:
+        _attach_driving_minutes(enriched, location)
+    except Exception as e:
+        print(f"WARNING: Distance calculation failed: {e}")
+    return enriched
+
+
+def _iter_enriched(items: list, location: str):
+    """
+    Enrich items concurrently, yielding (index, enriched_item_or_None) as each finishes.
+
+    At most ENRICH_MAX_WORKERS lookups run at once and iteration stops at
+    ENRICH_DEADLINE_SECONDS or the request deadline, whichever comes first;
+    items that fail or haven't finished by then are not yielded. Running out
+    of time, quota or an open circuit marks the request deadline's results
+    partial (so they aren't cached).
+    """
+    if not items:
+        return
+
+    timeout = ENRICH_DEADLINE_SECONDS
+    left = remaining()
+    if left is not None:
+        timeout = max(0.0, min(timeout, left))
+
+    # Resolved once for the whole pass (stored property coordinates, else a cached geocode)
+    origin = _origin_coords(location)
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(ENRICH_MAX_WORKERS, len(items))),
+        thread_name_prefix="enrich"
+    )
+    # Each task runs in a copy of the caller's context so its outbound quota priority
+    # and request deadline carry over
+    futures = {
+        executor.submit(contextvars.copy_context().run, _enrich_item, item, location, origin): index
+        for index, item in enumerate(items)
+    }
+    try:
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                index = futures[future]
+                try:
+                    yield index, future.result()
+                except Exception as e:
+                    if isinstance(e, (QuotaExhausted, CircuitOpenError)):
+                        # Dropped for capacity, not because the place is bad: the list is incomplete
+                        mark_partial()
+                    print(f"WARNING: Enrichment failed for {items[index].get('name')}: {e}")
+        except TimeoutError:
+            mark_partial()
+            not_done = sum(1 for future in futures if not future.done())
+            print(f"WARNING: {not_done} of {len(items)} enrichments did not finish within "
+                  f"{timeout:.1f}s, returning partial results")
+    finally:
+        # Don't block on stragglers; their own HTTP timeouts bound them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _enrich_item(item: dict, location: str, origin=None) -> dict | None:
     """
-    enriched = []
+    Enrich a single recommendation item with Google Places data.
 
-    for item in items:
-        name = item.get("name")
-        item_address = item.get("address")
-        description = item.get("description", "")
+    The shared place catalog is tried first (same name at the same street
+    address, near the property), so popular places need no Places calls at
+    all; otherwise a text search finds the place_id and its details are read
+    through the catalog.
 
-        if not name or not item_address:
-            print(f"WARNING: Skipping item with missing name or address: {item}")
-            continue
+    Args:
+        item: Item from OpenAI (with name, address, description)
+        location: Property location, used as search bias
+        origin: (lat, lng) of the property, or None
+
+    Returns:
+        Enriched item, or None if the item should be skipped
+    """
+    name = item.get("name")
+    item_address = item.get("address")
+    description = item.get("description", "")
 
+    if not name or not item_address:
+        print(f"WARNING: Skipping item with missing name or address: {item}")
+        return None
+
+    entry = find_place(name, item_address, origin) if origin else None
+    place = {}
+    if entry is None:
         # Search Google Places
         query = f"{name}, {item_address}"
         search_results = google_places_text_search(query, location=location)
 
-        # If we found a match, enrich the data
-        if search_results.get("results"):
-            place = search_results["results"][0]
-            place_id = place.get("place_id")
-
-            if place_id:
-                # Get detailed place information
-                details = google_places_details(place_id)
-                details_result = details.get("result", {})
-
-                # Get real address
-                real_address = (
-                    details_result.get("formatted_address") or
-                    place.get("formatted_address") or
-                    item_address
-                )
-
-                # Get photo reference
-                photos = details_result.get("photos") or place.get("photos")
-                photo_reference = None
-                if photos and len(photos) > 0:
-                    photo_reference = photos[0].get("photo_reference")
-
-                # Calculate driving distance from property location
-                driving_minutes = None
-                if location and real_address:
-                    print(f"Calculating distance from '{location}' to '{real_address}'")
-                    distance_data = google_distance_matrix(location, real_address)
-                    driving_minutes = distance_data.get('duration_minutes')
-                    print(f"Distance result for {name}: {driving_minutes} minutes")
-
-                # Add enriched item
-                enriched.append({
-                    "name": name,
-                    "address": real_address,
-                    "description": description,
-                    "photo_reference": photo_reference,
-                    "driving_minutes": driving_minutes
-                })
-            else:
-                print(f"WARNING: No place_id for {name}, skipping")
-        else:
+        if not search_results.get("results"):
             print(f"WARNING: No Google Places results for {name}, skipping")
+            return None
+
+        # If we found a match, enrich the data
+        place = search_results["results"][0]
+        place_id = place.get("place_id")
+        if not place_id:
+            print(f"WARNING: No place_id for {name}, skipping")
+            return None
+
+        # Get detailed place information (from the catalog when another guidebook has it)
+        entry = get_or_fetch_place(place_id) or {"place_id": place_id}
+
+    # Get real address
+    real_address = (
+        entry.get("formatted_address") or
+        place.get("formatted_address") or
+        item_address
+    )
+
+    # Get photo reference
+    photo_reference = entry.get("photo_reference")
+    if not photo_reference and place.get("photos"):
+        photo_reference = place["photos"][0].get("photo_reference")
+
+    # Coordinates are kept so driving times can be estimated without a routing call
+    coords = coords_of(entry) or place_coords(place)
+    place_id = entry["place_id"]
+
+    # driving_minutes is filled in for all items at once by _attach_driving_minutes
+    return {
+        "name": name,
+        "address": real_address,
+        "description": description,
+        "photo_reference": photo_reference,
+        "place_id": place_id,
+        "lat": coords[0] if coords else None,
+        "lng": coords[1] if coords else None,
+        "driving_minutes": None
+    }
+
+
+def _stored_origin_coords(location: str):
+    """Coordinates already stored on a property geocoded from exactly this address, or None."""
+    try:
+        with Session(db.engine) as session:
+            row = session.query(Property.latitude, Property.longitude).filter(
+                Property.geocoded_address == str(location or "").strip(),
+                Property.latitude.isnot(None),
+                Property.longitude.isnot(None),
+            ).first()
+    except (SQLAlchemyError, RuntimeError) as e:
+        print(f"WARNING: Stored property coordinates lookup failed: {type(e).__name__}: {e}")
+        return None
+    return (row[0], row[1]) if row else None
+
+
+def _origin_coords(location: str):
+    """Coordinates of the property location: stored on the property if geocoded, else geocoded (cached), or None."""
+    stored = _stored_origin_coords(location)
+    if stored is not None:
+        return stored
+    try:
+        return google_geocode(location)
+    except Exception as e:
+        print(f"WARNING: Geocoding failed for {location}: {e}")
+        return None
+
 
+def _attach_driving_minutes(enriched: list, location: str) -> list:
+    """
+    Set driving_minutes on enriched items without any routing request.
+
+    Drives already routed from this origin come from the route cache; the rest
+    are estimated from coordinates with the road-factor model in utils.geo
+    (the origin comes from the property's stored coordinates, else a cached
+    geocode). Saved guidebooks have estimated times refined with the Routes
+    API in the background.
+
+    Args:
+        enriched: Enriched items (with lat/lng where the place had a geometry)
+        location: Property location used as the origin
+
+    Returns:
+        The same list, with driving_minutes filled in where both ends have coordinates
+    """
+    if not location or not enriched:
+        return enriched
+    routed = get_cached_routes(location, [(item.get("address"), item.get("place_id")) for item in enriched])
+    origin = _origin_coords(location)
+    for index, item in enumerate(enriched):
+        coords = coords_of(item)
+        if routed.get(index):
+            item["driving_minutes"] = routed[index]["duration_minutes"]
+            item["driving_minutes_estimated"] = False
+        elif origin and coords:
+            item["driving_minutes"] = estimate_driving(origin, coords)["duration_minutes"]
+            item["driving_minutes_estimated"] = True
+        else:
+            item["driving_minutes"] = None
     return enriched
 
 
@@ -240,7 +708,7 @@ def add_recommendation_type(
         )
     """
     RECOMMENDATION_CONFIGS[type_name] = {
-        "model": model,
+        "model": _configured_model(type_name, model),
         "system_prompt": system_prompt,
         "user_prompt_template": user_prompt_template,
         "response_keys": response_keys,
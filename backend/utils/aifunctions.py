@@ -1,13 +1,12 @@
 import os
 import json
 from dotenv import load_dotenv
-from openai import OpenAI
+from .openai_client import chat_completion
 
 def get_ai_recommendations(address, num_things_to_do=3, num_places_to_eat=3):
     """Get Things to Do and Places to Eat from OpenAI based on an address."""
     load_dotenv() # Load environment variables from .env file
     try:
-        client = OpenAI()
         prompt = f"""
         For the vacation rental located at {address}, 
         please provide a list of local recommendations. 
@@ -18,7 +17,8 @@ def get_ai_recommendations(address, num_things_to_do=3, num_places_to_eat=3):
         If there is no image available from the actual event or place, we should use a placeholder image from Unsplash or another reputable source.
         Confrim that the image is not a 404 before including it in the JSON object."""
 
-        response = client.chat.completions.create(
+        response = chat_completion(
+            "legacy",
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that provides local recommendations in a strict JSON format."},
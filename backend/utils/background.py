@@ -0,0 +1,85 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from .quota import outbound_priority, BACKGROUND
+
+load_dotenv()
+
+# Small per-process pool for work that should not run on the request thread
+# (PDF pre-generation, cache warming). Created lazily so each gunicorn worker
+# gets its own pool after fork.
+BACKGROUND_WORKERS = int(os.environ.get('BACKGROUND_WORKERS', '2'))
+
+_executor = None
+_lock = threading.Lock()
+_in_flight = set()
+_rerun = {}
+_timers = {}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix='guidewise-bg')
+    return _executor
+
+
+def _run_job(key: str, fn, args, kwargs):
+    try:
+        # Background work yields outbound API quota to interactive requests
+        with outbound_priority(BACKGROUND):
+            fn(*args, **kwargs)
+    except Exception as e:
+        print(f"Background job {key} failed: {type(e).__name__}: {e}")
+    finally:
+        with _lock:
+            _in_flight.discard(key)
+            again = _rerun.pop(key, None)
+        if again is not None:
+            submit_once(key, *again)
+
+
+def submit_once(key: str, fn, *args, **kwargs) -> bool:
+    """
+    Run fn in the background unless a job with the same key is already queued or running.
+
+    If the same key is submitted while its job is running, the job runs once
+    more after it finishes (so work triggered by a newer change is not lost),
+    but never more than once extra.
+
+    Returns:
+        True if a new job was queued, False if it was merged into an existing one
+    """
+    with _lock:
+        if key in _in_flight:
+            _rerun[key] = (fn, args, kwargs)
+            return False
+        _in_flight.add(key)
+    _get_executor().submit(_run_job, key, fn, args, kwargs)
+    return True
+
+
+def debounce(key: str, delay: float, fn, *args, **kwargs) -> None:
+    """
+    Run fn in the background `delay` seconds after the last call with this key.
+
+    Each call restarts the timer, so a burst of calls (e.g. editor autosaves)
+    results in a single job.
+    """
+    def fire():
+        with _lock:
+            if _timers.get(key) is timer:
+                _timers.pop(key, None)
+        submit_once(key, fn, *args, **kwargs)
+
+    timer = threading.Timer(delay, fire)
+    timer.daemon = True
+    with _lock:
+        previous = _timers.get(key)
+        if previous is not None:
+            previous.cancel()
+        _timers[key] = timer
+    timer.start()
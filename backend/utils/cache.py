@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Store used by get_cache():
+#   memory - per-process LRU (default)
+#   sqlite - per-process LRU in front of a SQLite file shared by all workers on the host
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory').strip().lower()
+CACHE_DIR = os.environ.get('CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'guidewise-cache')
+CACHE_MEMORY_MAX_ENTRIES = int(os.environ.get('CACHE_MEMORY_MAX_ENTRIES', '2048'))
+
+
+class MemoryStore:
+    """Thread-safe in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = CACHE_MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Return (serialized_value, expires_at) or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SqliteStore:
+    """
+    Cache entries in a SQLite file so every worker process on the host shares them.
+    Each thread uses its own connection; expired rows are purged opportunistically.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at),
+        )
+        if random.random() < 0.01:
+            conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+
+class TieredStore:
+    """A fast local store in front of a shared one."""
+
+    def __init__(self, local, shared):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key: str):
+        entry = self.local.get(key)
+        if entry is not None:
+            return entry
+        entry = self.shared.get(key)
+        if entry is not None:
+            self.local.set(key, entry[0], entry[1])
+        return entry
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        self.local.set(key, value, expires_at)
+        self.shared.set(key, value, expires_at)
+
+    def delete(self, key: str) -> None:
+        self.local.delete(key)
+        self.shared.delete(key)
+
+
+class TTLCache:
+    """
+    Namespaced JSON cache with per-entry TTLs on top of a store.
+
+    Values are stored serialized, so callers always get their own copy and
+    can mutate what they read without affecting the cache.
+    """
+
+    def __init__(self, namespace: str, store):
+        self.namespace = namespace
+        self.store = store
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str):
+        """Return the cached value, or None on a miss."""
+        try:
+            entry = self.store.get(self._key(key))
+        except Exception as e:
+            print(f"Cache get failed ({self.namespace}): {e}")
+            return None
+        return json.loads(entry[0]) if entry is not None else None
+
+    def set(self, key: str, value, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        try:
+            self.store.set(self._key(key), json.dumps(value), time.time() + ttl)
+        except Exception as e:
+            print(f"Cache set failed ({self.namespace}): {e}")
+
+    def delete(self, key: str) -> None:
+        try:
+            self.store.delete(self._key(key))
+        except Exception as e:
+            print(f"Cache delete failed ({self.namespace}): {e}")
+
+
+_store = None
+_caches = {}
+_lock = threading.Lock()
+
+
+def _build_store():
+    memory = MemoryStore(CACHE_MEMORY_MAX_ENTRIES)
+    if CACHE_BACKEND == 'sqlite':
+        try:
+            return TieredStore(memory, SqliteStore(os.path.join(CACHE_DIR, 'cache.sqlite3')))
+        except Exception as e:
+            print(f"SQLite cache unavailable ({e}), using in-memory cache")
+    return memory
+
+
+def get_cache(namespace: str) -> TTLCache:
+    """Return the process-wide cache for a namespace, backed by the configured store."""
+    global _store
+    with _lock:
+        if _store is None:
+            _store = _build_store()
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = _caches[namespace] = TTLCache(namespace, _store)
+        return cache
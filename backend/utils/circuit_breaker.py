@@ -0,0 +1,128 @@
+import os
+import time
+import threading
+from dotenv import load_dotenv
+from .metrics import incr, set_gauge
+
+load_dotenv()
+
+# Consecutive failures that open a breaker, and how long it stays open before probing
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_BREAKER_FAILURE_THRESHOLD', '5'))
+CIRCUIT_BREAKER_RESET_SECONDS = float(os.environ.get('CIRCUIT_BREAKER_RESET_SECONDS', '30'))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-process breaker for one upstream.
+
+    Closed: calls go through; CIRCUIT_BREAKER_FAILURE_THRESHOLD consecutive
+    failures open it. Open: calls are refused immediately until the reset
+    timeout passes. Half-open: a single probe call is let through; success
+    closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        set_gauge("circuit_breaker.state", _STATE_GAUGE[CLOSED], upstream=name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def _set_state(self, state: str) -> None:
+        if state != self._state:
+            self._state = state
+            set_gauge("circuit_breaker.state", _STATE_GAUGE[state], upstream=self.name)
+            incr("circuit_breaker.transitions", upstream=self.name, to=state)
+            print(f"Circuit breaker {self.name} -> {state}")
+
+    def allow(self) -> bool:
+        """Whether a call may go to the upstream now (claims the probe when half-open)."""
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    incr("circuit_breaker.short_circuited", upstream=self.name)
+                    return False
+                self._set_state(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._probing:
+                    incr("circuit_breaker.short_circuited", upstream=self.name)
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            self._set_state(CLOSED)
+
+    def abandon(self) -> None:
+        """Give back an allowed call that never reached the upstream or says nothing about its health."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Call fn through the breaker. Any exception counts as a failure and is re-raised.
+
+        Raises:
+            CircuitOpenError: if the breaker is open (fn is not called)
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the process-wide breaker for an upstream, creating it on first use."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def breaker_states() -> dict:
+    """Current state of every breaker in this process, by upstream name."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.state for breaker in breakers}
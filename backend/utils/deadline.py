@@ -0,0 +1,98 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Overall time budget for an AI recommendations request: the OpenAI call,
+# every Places lookup and the distance lookups all fit inside it
+AI_REQUEST_DEADLINE_SECONDS = float(os.environ.get('AI_REQUEST_DEADLINE_SECONDS', '50'))
+# Below this much remaining time an outbound call isn't worth starting
+MIN_CALL_SECONDS = 0.25
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting an outbound call when the request's deadline has passed."""
+
+
+class _Budget:
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+        # Set when work was cut short; shared with threads that copied the context
+        self.partial = False
+
+
+_budget = ContextVar('request_deadline', default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Run a block under a deadline `seconds` from now (or the enclosing one, if sooner).
+
+    The deadline propagates to threads started with contextvars.copy_context().
+    Yields the budget; check `partial` afterwards to see whether any work was cut short.
+    """
+    outer = _budget.get()
+    expires_at = time.monotonic() + seconds
+    if outer is not None:
+        expires_at = min(expires_at, outer.expires_at)
+    budget = _Budget(expires_at)
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+        if outer is not None and budget.partial:
+            outer.partial = True
+
+
+def remaining() -> float | None:
+    """Seconds left before the current deadline, or None when there is none."""
+    budget = _budget.get()
+    if budget is None:
+        return None
+    return budget.expires_at - time.monotonic()
+
+
+def mark_partial() -> None:
+    """Record that the current deadline cut work short (results are incomplete)."""
+    budget = _budget.get()
+    if budget is not None:
+        budget.partial = True
+
+
+def is_partial() -> bool:
+    """Whether the current deadline has cut any work short."""
+    budget = _budget.get()
+    return budget is not None and budget.partial
+
+
+def check_deadline(what: str = "call") -> float | None:
+    """
+    Remaining seconds (None without a deadline), raising if too little is left to start `what`.
+
+    Raises:
+        DeadlineExceeded: if the deadline has (nearly) passed; the budget is marked partial
+    """
+    left = remaining()
+    if left is not None and left < MIN_CALL_SECONDS:
+        mark_partial()
+        raise DeadlineExceeded(f"Deadline passed before {what}")
+    return left
+
+
+def clip_timeout(timeout, left: float | None):
+    """
+    Shrink a requests-style timeout (seconds or (connect, read)) to fit `left` seconds.
+    Returns: (timeout, clipped) where clipped says whether the deadline shortened it.
+    """
+    if left is None:
+        return timeout, False
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        clipped = connect > left or read > left
+        return (min(connect, left), min(read, left)), clipped
+    return min(timeout, left), timeout > left
@@ -0,0 +1,60 @@
+import os
+import math
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Road-factor model for instant driving estimates from coordinates alone.
+# Road distance is the great-circle distance times GEO_ROAD_FACTOR; the first
+# GEO_URBAN_KM of it are driven at GEO_URBAN_SPEED_KMH and the rest at
+# GEO_HIGHWAY_SPEED_KMH, plus GEO_OVERHEAD_MINUTES for parking and lights.
+GEO_ROAD_FACTOR = float(os.environ.get('GEO_ROAD_FACTOR', '1.35'))
+GEO_URBAN_KM = float(os.environ.get('GEO_URBAN_KM', '8'))
+GEO_URBAN_SPEED_KMH = float(os.environ.get('GEO_URBAN_SPEED_KMH', '30'))
+GEO_HIGHWAY_SPEED_KMH = float(os.environ.get('GEO_HIGHWAY_SPEED_KMH', '70'))
+GEO_OVERHEAD_MINUTES = float(os.environ.get('GEO_OVERHEAD_MINUTES', '2'))
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def coords_of(item) -> tuple[float, float] | None:
+    """(lat, lng) stored on an item dict, or None if it has no usable coordinates."""
+    if not isinstance(item, dict):
+        return None
+    try:
+        lat, lng = float(item.get('lat')), float(item.get('lng'))
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def great_circle_km(origin: tuple[float, float], destination: tuple[float, float]) -> float:
+    """Haversine distance in kilometres between two (lat, lng) points."""
+    lat1, lng1 = map(math.radians, origin)
+    lat2, lng2 = map(math.radians, destination)
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def estimate_driving(origin: tuple[float, float], destination: tuple[float, float]) -> dict:
+    """
+    Approximate a drive between two points without any network call.
+    Returns: { duration_minutes: int, distance_meters: int }
+    """
+    road_km = great_circle_km(origin, destination) * GEO_ROAD_FACTOR
+    urban_km = min(road_km, GEO_URBAN_KM)
+    hours = urban_km / GEO_URBAN_SPEED_KMH + (road_km - urban_km) / GEO_HIGHWAY_SPEED_KMH
+    minutes = hours * 60 + (GEO_OVERHEAD_MINUTES if road_km > 0.1 else 0)
+    return {
+        'duration_minutes': max(1, round(minutes)),
+        'distance_meters': round(road_km * 1000),
+    }
+
+
+def place_coords(place) -> tuple[float, float] | None:
+    """(lat, lng) from a Google Places result's geometry, or None."""
+    location = ((place or {}).get('geometry') or {}).get('location') or {}
+    return coords_of(location)
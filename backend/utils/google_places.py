@@ -1,6 +1,11 @@
 import os
 import requests
 from dotenv import load_dotenv
+from .cache import get_cache
+from .http import get_session, retries_within
+from .quota import acquire_quota
+from .circuit_breaker import get_breaker, CircuitOpenError
+from .deadline import check_deadline, clip_timeout, mark_partial, DeadlineExceeded
 
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -9,137 +14,307 @@ PLACES_TEXT_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/textsearch/
 PLACES_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
 PLACES_PHOTO_URL = "https://maps.googleapis.com/maps/api/place/photo"
 DISTANCE_MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
-ROUTES_API_URL = "https://routes.googleapis.com/directions/v2:computeRoutes"
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+ROUTES_MATRIX_API_URL = "https://routes.googleapis.com/distanceMatrix/v2:computeRouteMatrix"
+# Legacy Distance Matrix accepts at most 25 destinations per request
+DISTANCE_MATRIX_MAX_DESTINATIONS = 25
+
+# (connect, read) timeouts in seconds per endpoint
+PLACES_TIMEOUT = (3.05, 10)
+GEOCODE_TIMEOUT = (3.05, 10)
+ROUTES_TIMEOUT = (3.05, 10)
+DISTANCE_MATRIX_TIMEOUT = (3.05, 10)
+PLACES_PHOTO_TIMEOUT = (3.05, 15)
+
+# Cache lifetimes (seconds) for Places responses. Empty results are cached
+# briefly so repeated misses don't keep spending quota; errors are never cached.
+PLACES_TEXT_SEARCH_TTL = int(os.getenv("PLACES_TEXT_SEARCH_TTL", str(6 * 3600)))
+PLACES_DETAILS_TTL = int(os.getenv("PLACES_DETAILS_TTL", str(24 * 3600)))
+PLACES_NEGATIVE_TTL = int(os.getenv("PLACES_NEGATIVE_TTL", "600"))
+GEOCODE_TTL = int(os.getenv("GEOCODE_TTL", str(30 * 24 * 3600)))
+PLACES_DETAILS_FIELDS = "name,formatted_address,photos,website,rating,geometry,types"
+
+# Legacy Maps APIs report quota/key problems in a 200 body; these count against the breaker
+UPSTREAM_ERROR_STATUSES = ("OVER_QUERY_LIMIT", "REQUEST_DENIED", "UNKNOWN_ERROR")
+
+# Auth/permission rejections mean the key or API setup is broken, not the input
+CONFIG_ERROR_HTTP_STATUSES = (401, 403)
+
+_places_cache = get_cache("places")
+
+def _normalize(text):
+    """Case- and whitespace-insensitive form of a query or location for cache keys."""
+    return " ".join(str(text or "").lower().split())
+
+def _cache_places_response(key, data, ttl):
+    status = data.get("status") if isinstance(data, dict) else None
+    if status == "OK":
+        _places_cache.set(key, data, ttl)
+    elif status in ("ZERO_RESULTS", "NOT_FOUND"):
+        _places_cache.set(key, data, PLACES_NEGATIVE_TTL)
+
+def _reports_api_key_error(resp) -> bool:
+    """True if a 400 body blames the API key (Google APIs use 400 for an invalid key)."""
+    try:
+        error = resp.json().get("error") or {}
+    except (ValueError, AttributeError):
+        return "API key" in (resp.text or "") or "API_KEY" in (resp.text or "")
+    if not isinstance(error, dict):
+        return False
+    reasons = [d.get("reason") or "" for d in error.get("details") or [] if isinstance(d, dict)]
+    return any(r.startswith("API_KEY") for r in reasons) or "API key" in (error.get("message") or "")
+
+def _counts_as_failure(resp) -> bool:
+    """Whether an HTTP error response says something about upstream health or configuration."""
+    status = resp.status_code if resp is not None else 500
+    if status >= 500 or status == 429 or status in CONFIG_ERROR_HTTP_STATUSES:
+        return True
+    return status == 400 and _reports_api_key_error(resp)
+
+def _google_request(upstream, quota_endpoint, method, url, cost=1, **kwargs):
+    """
+    Call a Google API through its circuit breaker and shared quota; returns the parsed JSON.
+
+    Connection errors, 5xx, 429, 401/403, a 400 for a bad API key and upstream
+    error statuses count against the breaker (a misconfigured API should open
+    it); other 4xx (bad input such as an unknown place_id) don't.
+
+    Under a request deadline (utils.deadline) the quota wait and the timeout
+    are shortened to fit the time left, and the shared session only retries
+    as often as full attempts still fit (utils.http.retries_within); timeouts
+    caused by the deadline don't count against the breaker.
+
+    Raises:
+        DeadlineExceeded: if the deadline has passed (nothing is called)
+        CircuitOpenError: if the upstream's breaker is open (no quota is spent)
+        QuotaExhausted: if quota isn't available in time (not counted as a failure)
+    """
+    check_deadline(upstream)
+    breaker = get_breaker(upstream)
+    if not breaker.allow():
+        raise CircuitOpenError(f"{upstream} circuit is open")
+    try:
+        acquire_quota(quota_endpoint, cost=cost)
+        left = check_deadline(upstream)
+        timeout, clipped = clip_timeout(kwargs.pop("timeout"), left)
+    except Exception:
+        breaker.abandon()
+        raise
+    try:
+        resp = get_session(retries_within(left, timeout)).request(method, url, timeout=timeout, **kwargs)
+        resp.raise_for_status()
+        data = resp.json()
+    except requests.Timeout:
+        if clipped:
+            mark_partial()
+            breaker.abandon()
+        else:
+            breaker.record_failure()
+        raise
+    except requests.HTTPError as e:
+        # A bad request (invalid place_id, malformed query) says nothing about upstream health
+        if _counts_as_failure(e.response):
+            breaker.record_failure()
+        else:
+            breaker.abandon()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    if isinstance(data, dict) and data.get("status") in UPSTREAM_ERROR_STATUSES:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return data
 
 def google_places_text_search(query, location=None):
+    cache_key = f"textsearch:{_normalize(query)}|{_normalize(location)}"
+    cached = _places_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     params = {
         "query": query,
         "key": GOOGLE_API_KEY
     }
     if location:
         params["location"] = location
-    resp = requests.get(PLACES_TEXT_SEARCH_URL, params=params, timeout=10)
-    print(f"DEBUG: Google Places Raw Response for query '{query}': {resp.text}")
-    resp.raise_for_status()
-    return resp.json()
+    data = _google_request("places", "places_text_search", "GET", PLACES_TEXT_SEARCH_URL,
+                           params=params, timeout=PLACES_TIMEOUT)
+    print(f"DEBUG: Google Places Raw Response for query '{query}': {data}")
+    _cache_places_response(cache_key, data, PLACES_TEXT_SEARCH_TTL)
+    return data
 
 def google_places_details(place_id):
+    cache_key = f"details:{place_id}|{PLACES_DETAILS_FIELDS}"
+    cached = _places_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     params = {
         "place_id": place_id,
-        "fields": "name,formatted_address,photos,website,rating,geometry,types",
+        "fields": PLACES_DETAILS_FIELDS,
         "key": GOOGLE_API_KEY
     }
-    resp = requests.get(PLACES_DETAILS_URL, params=params, timeout=10)
-    resp.raise_for_status()
-    return resp.json()
+    data = _google_request("places", "places_details", "GET", PLACES_DETAILS_URL,
+                           params=params, timeout=PLACES_TIMEOUT)
+    _cache_places_response(cache_key, data, PLACES_DETAILS_TTL)
+    return data
+
+def google_geocode(address):
+    """
+    Resolve an address to coordinates with the Geocoding API (cached).
+    Returns: (lat, lng) or None if the address could not be geocoded
+    """
+    if not address or not str(address).strip():
+        return None
+    cache_key = f"geocode:{_normalize(address)}"
+    data = _places_cache.get(cache_key)
+    if data is None:
+        data = _google_request("geocode", "geocode", "GET", GEOCODE_URL,
+                               params={"address": address, "key": GOOGLE_API_KEY}, timeout=GEOCODE_TIMEOUT)
+        _cache_places_response(cache_key, data, GEOCODE_TTL)
+    results = data.get("results") or []
+    if data.get("status") != "OK" or not results:
+        return None
+    loc = (results[0].get("geometry") or {}).get("location") or {}
+    if loc.get("lat") is None or loc.get("lng") is None:
+        return None
+    return loc["lat"], loc["lng"]
 
 def google_places_photo_url(photo_reference, maxwidth=800):
     return f"{PLACES_PHOTO_URL}?maxwidth={maxwidth}&photo_reference={photo_reference}&key={GOOGLE_API_KEY}"
 
+def _parse_duration_seconds(duration_str):
+    """Parse a Routes API duration string (format: "123s") into seconds."""
+    if duration_str and duration_str.endswith('s'):
+        try:
+            return int(float(duration_str[:-1]))
+        except ValueError:
+            pass
+    return None
+
+def _empty_distance():
+    return {'duration_minutes': None, 'distance_meters': None}
+
 def google_distance_matrix(origin, destination):
     """
-    Calculate driving distance and time between origin and destination using Routes API (new).
-    Falls back to Distance Matrix API (legacy) if Routes API fails.
+    Calculate driving distance and time between origin and destination.
+    Single-destination form of google_distance_matrix_batch.
     Returns: { duration_minutes: int | None, distance_meters: int | None }
     """
-    # Try new Routes API first
+    return google_distance_matrix_batch(origin, [destination])[0]
+
+def _matrix_address(address):
+    """An address safe to send in a Distance Matrix list ('|' separates entries there)."""
+    return " ".join(str(address).replace("|", " ").split())
+
+def google_distance_matrix_batch(origin, destinations):
+    """
+    Calculate driving distance and time from one origin to many destinations
+    with a single Routes API (new) route matrix request.
+    Destinations the Routes API can't answer fall back to one Distance Matrix
+    API (legacy) request covering all of them.
+    Returns: list aligned with destinations of { duration_minutes: int | None, distance_meters: int | None }
+    """
+    results = [_empty_distance() for _ in destinations]
+    pending = [i for i, dest in enumerate(destinations) if dest]
+    if not origin or not pending:
+        return results
+
+    # Try new Routes API route matrix first
     try:
         headers = {
             "Content-Type": "application/json",
             "X-Goog-Api-Key": GOOGLE_API_KEY,
-            "X-Goog-FieldMask": "routes.duration,routes.distanceMeters"
+            "X-Goog-FieldMask": "originIndex,destinationIndex,duration,distanceMeters,status,condition"
         }
 
         body = {
-            "origin": {
-                "address": origin
-            },
-            "destination": {
-                "address": destination
-            },
+            "origins": [{"waypoint": {"address": origin}}],
+            "destinations": [{"waypoint": {"address": destinations[i]}} for i in pending],
             "travelMode": "DRIVE",
             "routingPreference": "TRAFFIC_AWARE"
         }
 
-        resp = requests.post(ROUTES_API_URL, headers=headers, json=body, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-
-        print(f"Routes API response: {data}")
-
-        # Extract route information
-        routes = data.get('routes', [])
-        if routes:
-            route = routes[0]
-            duration_str = route.get('duration', '')
-            distance_meters = route.get('distanceMeters')
-
-            # Parse duration string (format: "123s")
-            duration_seconds = None
-            if duration_str and duration_str.endswith('s'):
-                try:
-                    duration_seconds = int(duration_str[:-1])
-                except ValueError:
-                    pass
+        elements = _google_request("routes", "routes_matrix", "POST", ROUTES_MATRIX_API_URL, cost=len(pending),
+                                   headers=headers, json=body, timeout=ROUTES_TIMEOUT)
 
-            duration_minutes = round(duration_seconds / 60) if duration_seconds else None
+        print(f"Routes API matrix response: {elements}")
 
-            print(f"Routes API success: {duration_minutes} minutes, {distance_meters} meters")
-
-            return {
-                'duration_minutes': duration_minutes,
-                'distance_meters': distance_meters
+        for element in elements if isinstance(elements, list) else []:
+            if element.get('condition') != 'ROUTE_EXISTS' or (element.get('status') or {}).get('code'):
+                continue
+            dest_index = element.get('destinationIndex', 0)
+            if dest_index >= len(pending):
+                continue
+            duration_seconds = _parse_duration_seconds(element.get('duration', ''))
+            results[pending[dest_index]] = {
+                'duration_minutes': round(duration_seconds / 60) if duration_seconds else None,
+                'distance_meters': element.get('distanceMeters')
             }
-        else:
-            print("Routes API returned no routes, trying fallback...")
 
+        pending = [i for i in pending if results[i]['duration_minutes'] is None]
+        print(f"Routes API matrix success: {len(destinations) - len(pending)} of {len(destinations)} routes")
+        if not pending:
+            return results
+        print(f"Routes API matrix missing {len(pending)} routes, trying fallback...")
+
+    except DeadlineExceeded:
+        # Out of time for this request; the rest stay unknown
+        return results
+    except CircuitOpenError:
+        # Routes has been failing; go straight to the fallback instead of paying for another attempt
+        print("Routes API circuit open, using Distance Matrix API")
     except Exception as e:
         print(f"Routes API failed ({e}), falling back to Distance Matrix API...")
 
-    # Fallback to legacy Distance Matrix API
-    params = {
-        "origins": origin,
-        "destinations": destination,
-        "mode": "driving",
-        "key": GOOGLE_API_KEY
-    }
-    try:
-        resp = requests.get(DISTANCE_MATRIX_URL, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-
-        # Check if we got valid results
-        if data.get('status') != 'OK':
-            print(f"Distance Matrix API returned status: {data.get('status')}")
-            return {'duration_minutes': None, 'distance_meters': None}
+    # Fallback to legacy Distance Matrix API (up to 25 destinations per request)
+    for start in range(0, len(pending), DISTANCE_MATRIX_MAX_DESTINATIONS):
+        chunk = pending[start:start + DISTANCE_MATRIX_MAX_DESTINATIONS]
+        params = {
+            "origins": _matrix_address(origin),
+            "destinations": "|".join(_matrix_address(destinations[i]) for i in chunk),
+            "mode": "driving",
+            "key": GOOGLE_API_KEY
+        }
+        try:
+            data = _google_request("distance_matrix", "distance_matrix", "GET", DISTANCE_MATRIX_URL, cost=len(chunk),
+                                   params=params, timeout=DISTANCE_MATRIX_TIMEOUT)
 
-        rows = data.get('rows', [])
-        if not rows:
-            print("Distance Matrix API returned no rows")
-            return {'duration_minutes': None, 'distance_meters': None}
+            # Check if we got valid results
+            if data.get('status') != 'OK':
+                print(f"Distance Matrix API returned status: {data.get('status')}")
+                continue
 
-        elements = rows[0].get('elements', [])
-        if not elements:
-            print("Distance Matrix API returned no elements")
-            return {'duration_minutes': None, 'distance_meters': None}
+            rows = data.get('rows', [])
+            if not rows:
+                print("Distance Matrix API returned no rows")
+                continue
 
-        element = elements[0]
-        if element.get('status') != 'OK':
-            print(f"Distance Matrix element status: {element.get('status')}")
-            return {'duration_minutes': None, 'distance_meters': None}
+            elements = rows[0].get('elements', [])
+            if len(elements) != len(chunk):
+                # Results are matched to destinations by position; don't guess
+                print(f"Distance Matrix API returned {len(elements)} elements for {len(chunk)} destinations")
+                continue
+            for i, element in zip(chunk, elements):
+                if element.get('status') != 'OK':
+                    print(f"Distance Matrix element status: {element.get('status')}")
+                    continue
 
-        # Extract duration in minutes and distance in meters
-        duration_seconds = element.get('duration', {}).get('value')
-        distance_meters = element.get('distance', {}).get('value')
+                # Extract duration in minutes and distance in meters
+                duration_seconds = element.get('duration', {}).get('value')
+                distance_meters = element.get('distance', {}).get('value')
 
-        duration_minutes = round(duration_seconds / 60) if duration_seconds else None
+                results[i] = {
+                    'duration_minutes': round(duration_seconds / 60) if duration_seconds else None,
+                    'distance_meters': distance_meters
+                }
 
-        print(f"Distance Matrix API success: {duration_minutes} minutes")
+            print(f"Distance Matrix API success: {len(elements)} elements")
+        except DeadlineExceeded:
+            break
+        except Exception as e:
+            print(f"Error calculating distance: {e}")
 
-        return {
-            'duration_minutes': duration_minutes,
-            'distance_meters': distance_meters
-        }
-    except Exception as e:
-        print(f"Error calculating distance: {e}")
-        return {'duration_minutes': None, 'distance_meters': None}
+    return results
@@ -0,0 +1,110 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+from .providers import recording_enabled, RecordReplayAdapter
+
+load_dotenv()
+
+# Keep-alive pool per host. Sized for gunicorn request threads times the
+# concurrent enrichment lookups each request can make.
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '20'))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', '2'))
+HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', '0.3'))
+# Upper bound on a server's Retry-After; the wait happens on the calling thread
+HTTP_RETRY_AFTER_MAX_SECONDS = float(os.environ.get('HTTP_RETRY_AFTER_MAX_SECONDS', '5'))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Hosts whose POST endpoints are read-only and therefore safe to retry
+RETRYABLE_POST_PREFIXES = ("https://routes.googleapis.com/",)
+
+_sessions = {}
+_sessions_pid = None
+_lock = threading.Lock()
+
+
+class _CappedRetry(Retry):
+    """Retry that honours Retry-After only up to HTTP_RETRY_AFTER_MAX_SECONDS."""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, HTTP_RETRY_AFTER_MAX_SECONDS)
+
+
+def _retry(methods, retries: int) -> Retry:
+    kwargs = dict(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(methods),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    try:
+        # Jitter spreads out retries from concurrent lookups (urllib3 >= 2)
+        return _CappedRetry(backoff_jitter=HTTP_BACKOFF_FACTOR, **kwargs)
+    except TypeError:
+        return _CappedRetry(**kwargs)
+
+
+def _adapter(methods, retries: int) -> HTTPAdapter:
+    # PROVIDER_MODE=record/replay captures or serves responses from local fixtures
+    adapter_cls = RecordReplayAdapter if recording_enabled() else HTTPAdapter
+    return adapter_cls(pool_connections=4, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=_retry(methods, retries))
+
+
+def _build_session(retries: int) -> requests.Session:
+    session = requests.Session()
+    session.mount("https://", _adapter(("GET", "HEAD"), retries))
+    session.mount("http://", _adapter(("GET", "HEAD"), retries))
+    for prefix in RETRYABLE_POST_PREFIXES:
+        session.mount(prefix, _adapter(("GET", "HEAD", "POST"), retries))
+    return session
+
+
+def retries_within(left: float | None, timeout) -> int:
+    """
+    How many retries of a call fit in `left` seconds (HTTP_RETRIES without a deadline).
+
+    Each retry is budgeted a full attempt (connect + read timeout) plus the
+    longest wait before it (HTTP_RETRY_AFTER_MAX_SECONDS).
+    """
+    if left is None:
+        return HTTP_RETRIES
+    attempt = sum(timeout) if isinstance(timeout, tuple) else timeout
+    fits = int((left - attempt) // (attempt + HTTP_RETRY_AFTER_MAX_SECONDS))
+    return max(0, min(HTTP_RETRIES, fits))
+
+
+def get_session(retries: int | None = None) -> requests.Session:
+    """
+    Return the shared per-process session for outbound API calls.
+
+    Connections are pooled and reused across requests and threads. Idempotent
+    calls are retried with jittered exponential backoff on connection errors
+    and 429/5xx responses (honouring Retry-After up to
+    HTTP_RETRY_AFTER_MAX_SECONDS), at most `retries` times (default
+    HTTP_RETRIES; see retries_within for calls under a deadline).
+    """
+    global _sessions_pid
+    retries = HTTP_RETRIES if retries is None else max(0, min(retries, HTTP_RETRIES))
+    pid = os.getpid()
+    session = _sessions.get(retries) if _sessions_pid == pid else None
+    if session is None:
+        with _lock:
+            if _sessions_pid != pid:
+                # Don't share pooled sockets with a parent process after fork
+                _sessions.clear()
+                _sessions_pid = pid
+            session = _sessions.get(retries)
+            if session is None:
+                session = _sessions[retries] = _build_session(retries)
+    return session
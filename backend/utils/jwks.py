@@ -0,0 +1,139 @@
+import os
+import time
+import threading
+from dotenv import load_dotenv
+import jwt
+from jwt import PyJWKSet
+from .http import get_session
+from .metrics import incr, set_gauge
+
+load_dotenv()
+
+# Supabase signing keys are fetched and refreshed on a background thread;
+# verification only ever reads the in-memory keys.
+JWKS_REFRESH_SECONDS = float(os.environ.get('JWKS_REFRESH_SECONDS', '600'))
+# Retry interval while fetches fail (the last keys fetched keep being used)
+JWKS_RETRY_SECONDS = float(os.environ.get('JWKS_RETRY_SECONDS', '30'))
+# An unknown kid wakes the refresher early, but at most this often
+JWKS_MIN_REFRESH_INTERVAL_SECONDS = float(os.environ.get('JWKS_MIN_REFRESH_INTERVAL_SECONDS', '30'))
+# Longest a worker waits for the first fetch, at startup or on the first token
+JWKS_STARTUP_WAIT_SECONDS = float(os.environ.get('JWKS_STARTUP_WAIT_SECONDS', '2'))
+JWKS_TIMEOUT = (3.05, 10)
+
+
+class UnknownSigningKey(Exception):
+    """Raised when a token's kid isn't among the currently loaded signing keys."""
+
+
+class JWKSKeyring:
+    """
+    Signing keys from a JWKS URL, kept fresh by a per-process daemon thread.
+
+    A failed refresh keeps the last good keys. A token with an unknown kid
+    (e.g. right after a key rotation) is rejected immediately and schedules
+    an early refresh instead of fetching on the request thread.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._attempted = threading.Event()
+        self._pid = None
+        self.last_attempt_at = None
+        self.last_success_at = None
+        self.last_error = None
+        self.consecutive_failures = 0
+
+    def refresh(self) -> bool:
+        """Fetch the JWKS now. Returns: True if keys were loaded, False if the previous keys were kept."""
+        self.last_attempt_at = time.time()
+        try:
+            resp = get_session().get(self.url, timeout=JWKS_TIMEOUT)
+            resp.raise_for_status()
+            keys = {key.key_id: key for key in PyJWKSet.from_dict(resp.json()).keys}
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.consecutive_failures += 1
+            incr("jwks.refreshes", outcome="error")
+            print(f"JWKS refresh failed ({self.consecutive_failures} in a row), keeping {len(self._keys)} keys: {self.last_error}")
+            self._attempted.set()
+            return False
+        with self._lock:
+            added = set(keys) - set(self._keys)
+            self._keys = keys
+        self.last_success_at = time.time()
+        self._attempted.set()
+        self.last_error = None
+        self.consecutive_failures = 0
+        incr("jwks.refreshes", outcome="ok")
+        set_gauge("jwks.keys", len(keys))
+        if added:
+            print(f"JWKS loaded {len(keys)} keys (new kid: {', '.join(sorted(str(k) for k in added))})")
+        return True
+
+    def _run(self) -> None:
+        if self.last_success_at is None:
+            # First fetch happens here rather than on the importing thread
+            self.refresh()
+        while True:
+            ok = self.consecutive_failures == 0 and self.last_success_at is not None
+            woken = self._wake.wait(JWKS_REFRESH_SECONDS if ok else JWKS_RETRY_SECONDS)
+            self._wake.clear()
+            if woken and self.last_attempt_at is not None:
+                time.sleep(max(0.0, self.last_attempt_at + JWKS_MIN_REFRESH_INTERVAL_SECONDS - time.time()))
+            self.refresh()
+
+    def load(self, wait: float = JWKS_STARTUP_WAIT_SECONDS) -> bool:
+        """
+        Start the refresher and wait up to `wait` seconds for its first fetch.
+
+        Returns:
+            True if keys are loaded; otherwise the fetch carries on in the background
+        """
+        self.start()
+        self._attempted.wait(wait)
+        return self.last_success_at is not None
+
+    def start(self) -> None:
+        """Start the refresher in this process (idempotent; restarts after a fork)."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name='jwks-refresh', daemon=True).start()
+
+    def signing_key(self, token: str):
+        """
+        Loaded signing key for a token's kid, without any network call.
+
+        Raises:
+            UnknownSigningKey: if the kid isn't loaded (an early refresh is scheduled)
+        """
+        self.start()
+        if self.last_success_at is None:
+            # Requests arriving before the first fetch finishes wait for it, briefly
+            self._attempted.wait(JWKS_STARTUP_WAIT_SECONDS)
+        kid = jwt.get_unverified_header(token).get('kid')
+        with self._lock:
+            key = self._keys.get(kid)
+        if key is None:
+            incr("jwks.unknown_kid")
+            self._wake.set()
+            raise UnknownSigningKey(f"No loaded JWKS key for kid={kid}")
+        return key
+
+    def status(self) -> dict:
+        with self._lock:
+            kids = sorted(str(k) for k in self._keys)
+        return {
+            'keys': len(kids),
+            'kids': kids,
+            'last_attempt_at': self.last_attempt_at,
+            'last_success_at': self.last_success_at,
+            'last_error': self.last_error,
+            'consecutive_failures': self.consecutive_failures,
+            'stale': self.last_success_at is None
+                     or time.time() - self.last_success_at > 2 * JWKS_REFRESH_SECONDS,
+        }
@@ -0,0 +1,68 @@
+import threading
+from contextlib import contextmanager
+
+
+class KeyedLocks:
+    """
+    One lock per key, created on first use and dropped once nobody holds or
+    waits for it.
+
+    Entries are reference counted under a single guard, so a thread that has
+    looked a lock up but not yet acquired it keeps the entry alive; a later
+    caller for the same key always gets that same lock rather than a new one.
+    """
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._entries = {}  # key -> [lock, holders and waiters]
+
+    def _ref(self, key) -> threading.Lock:
+        with self._guard:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [threading.Lock(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def _unref(self, key) -> None:
+        with self._guard:
+            entry = self._entries[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._entries[key]
+
+    @contextmanager
+    def hold(self, key):
+        """Hold the lock for key, waiting for any current holder."""
+        lock = self._ref(key)
+        try:
+            with lock:
+                yield
+        finally:
+            self._unref(key)
+
+    def try_acquire(self, key):
+        """
+        Take the lock for key without waiting.
+
+        Returns:
+            An idempotent release() callable, or None if the key is already held
+        """
+        lock = self._ref(key)
+        if not lock.acquire(blocking=False):
+            self._unref(key)
+            return None
+        released = []
+
+        def release():
+            if released:
+                return
+            released.append(True)
+            lock.release()
+            self._unref(key)
+
+        return release
+
+    def __len__(self) -> int:
+        with self._guard:
+            return len(self._entries)
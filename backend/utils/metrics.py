@@ -0,0 +1,92 @@
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Number of recent samples kept per timing series for percentiles
+METRICS_SAMPLE_SIZE = int(os.environ.get('METRICS_SAMPLE_SIZE', '1024'))
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_timings = {}
+
+
+def _series(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    inner = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{inner}}}"
+
+
+def incr(name: str, value: float = 1, **labels) -> None:
+    """Add value to a counter."""
+    key = _series(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    """Record the current value of a gauge."""
+    key = _series(name, labels)
+    with _lock:
+        _gauges[key] = value
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """Record one sample (e.g. a latency in ms) of a timing series."""
+    key = _series(name, labels)
+    with _lock:
+        series = _timings.get(key)
+        if series is None:
+            series = _timings[key] = {"count": 0, "sum": 0.0, "max": 0.0,
+                                      "samples": deque(maxlen=METRICS_SAMPLE_SIZE)}
+        series["count"] += 1
+        series["sum"] += value
+        series["max"] = max(series["max"], value)
+        series["samples"].append(value)
+
+
+@contextmanager
+def timed(name: str, **labels):
+    """Observe the elapsed wall time of a block in milliseconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, (time.perf_counter() - start) * 1000, **labels)
+
+
+def _percentile(ordered: list, pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def snapshot() -> dict:
+    """Return all counters, gauges and timing summaries for this process."""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        timings = {key: (s["count"], s["sum"], s["max"], sorted(s["samples"])) for key, s in _timings.items()}
+    return {
+        "pid": os.getpid(),
+        "counters": counters,
+        "gauges": gauges,
+        "timings": {
+            key: {
+                "count": count,
+                "avg": round(total / count, 2) if count else 0.0,
+                "p50": round(_percentile(ordered, 50), 2),
+                "p90": round(_percentile(ordered, 90), 2),
+                "p99": round(_percentile(ordered, 99), 2),
+                "max": round(peak, 2),
+            }
+            for key, (count, total, peak, ordered) in timings.items()
+        },
+    }
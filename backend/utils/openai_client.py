@@ -0,0 +1,118 @@
+import os
+import time
+import threading
+import httpx
+from dotenv import load_dotenv
+from openai import OpenAI, APIStatusError, APITimeoutError
+from .metrics import incr, observe
+from .circuit_breaker import get_breaker, CircuitOpenError
+from .deadline import check_deadline, mark_partial
+from .providers import recording_enabled, RecordReplayTransport
+
+load_dotenv()
+
+# Per-request deadline and bounded retries (the SDK backs off on 429/5xx/timeouts)
+OPENAI_TIMEOUT_SECONDS = float(os.environ.get('OPENAI_TIMEOUT_SECONDS', '45'))
+OPENAI_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('OPENAI_CONNECT_TIMEOUT_SECONDS', '5'))
+OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', '2'))
+OPENAI_MAX_CONNECTIONS = int(os.environ.get('OPENAI_MAX_CONNECTIONS', '20'))
+# Longest backoff the SDK sleeps before a retry
+OPENAI_RETRY_BACKOFF_SECONDS = 8.0
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+def _build_client() -> OpenAI:
+    limits = httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+    )
+    # PROVIDER_MODE=record/replay captures or serves responses from local fixtures
+    transport = RecordReplayTransport(httpx.HTTPTransport(limits=limits)) if recording_enabled() else None
+    http_client = httpx.Client(
+        limits=limits,
+        transport=transport,
+        timeout=httpx.Timeout(OPENAI_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS),
+    )
+    return OpenAI(
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        timeout=httpx.Timeout(OPENAI_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS),
+        max_retries=OPENAI_MAX_RETRIES,
+        http_client=http_client,
+    )
+
+
+def get_openai_client() -> OpenAI:
+    """Return the shared per-process OpenAI client (pooled keep-alive connections)."""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                _client = _build_client()
+                _client_pid = pid
+    return _client
+
+
+def chat_completion(metric_type: str, **kwargs):
+    """
+    Create a chat completion with the shared client and record metrics.
+
+    Latency, failures and prompt/completion token usage are recorded under
+    openai.* metrics labelled with metric_type and the model. Exceptions
+    from the SDK are re-raised after being counted.
+
+    Calls go through the "openai" circuit breaker: timeouts, connection
+    errors, 401/403 (revoked key, no access), 429s and 5xx count as failures,
+    while other 4xx responses (bad requests) don't.
+
+    Under a request deadline (utils.deadline) each attempt's timeout is capped
+    at the time left, and the SDK only retries as often as full attempts
+    (OPENAI_TIMEOUT_SECONDS each) still fit before the deadline.
+
+    Raises:
+        DeadlineExceeded: if the deadline has passed (no request is made)
+        CircuitOpenError: if the breaker is open (no request is made)
+    """
+    model = kwargs.get("model", "")
+    labels = {"type": metric_type, "model": model}
+    left = check_deadline("OpenAI call")
+    breaker = get_breaker("openai")
+    if not breaker.allow():
+        incr("openai.failures", error=CircuitOpenError.__name__, **labels)
+        raise CircuitOpenError("openai circuit is open")
+    client = get_openai_client()
+    clipped = left is not None and left < OPENAI_TIMEOUT_SECONDS
+    if left is not None:
+        timeout = min(left, OPENAI_TIMEOUT_SECONDS)
+        # Retries (plus their backoff) must not run the call past the deadline
+        retries = max(0, min(client.max_retries, int(left // (OPENAI_TIMEOUT_SECONDS + OPENAI_RETRY_BACKOFF_SECONDS)) - 1))
+        client = client.with_options(
+            timeout=httpx.Timeout(timeout, connect=min(timeout, OPENAI_CONNECT_TIMEOUT_SECONDS)),
+            max_retries=retries,
+        )
+    start = time.perf_counter()
+    try:
+        response = client.chat.completions.create(**kwargs)
+    except Exception as e:
+        observe("openai.latency_ms", (time.perf_counter() - start) * 1000, **labels)
+        incr("openai.failures", error=type(e).__name__, **labels)
+        if isinstance(e, APIStatusError) and e.status_code < 500 and e.status_code not in (401, 403, 429):
+            breaker.abandon()
+        elif isinstance(e, APITimeoutError) and clipped:
+            # Our deadline, not the upstream, cut this call short
+            mark_partial()
+            breaker.abandon()
+        else:
+            breaker.record_failure()
+        raise
+    breaker.record_success()
+    observe("openai.latency_ms", (time.perf_counter() - start) * 1000, **labels)
+    incr("openai.requests", **labels)
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        incr("openai.prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0, **labels)
+        incr("openai.completion_tokens", getattr(usage, "completion_tokens", 0) or 0, **labels)
+    return response
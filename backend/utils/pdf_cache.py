@@ -0,0 +1,84 @@
+import os
+import re
+import glob
+import tempfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Generated PDFs are kept on local disk so cache hits can be served straight
+# from a file (sendfile / Range support) instead of copying bytes through Python.
+PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'guidewise-pdf-cache')
+
+_SAFE_NAME_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def _safe_name(value) -> str:
+    return _SAFE_NAME_RE.sub('_', str(value or '')).strip('._') or 'x'
+
+
+def _guidebook_dir(guidebook_id) -> str:
+    return os.path.join(PDF_CACHE_DIR, _safe_name(guidebook_id))
+
+
+def _pdf_path(guidebook_id, variant: str, version: str) -> str:
+    return os.path.join(_guidebook_dir(guidebook_id), f"{_safe_name(variant)}.{_safe_name(version)}.pdf")
+
+
+def get_cached_pdf_path(guidebook_id, variant: str, version: str) -> str | None:
+    """Return the on-disk path of a cached PDF, or None if it has not been generated yet."""
+    path = _pdf_path(guidebook_id, variant, version)
+    return path if os.path.isfile(path) else None
+
+
+def store_pdf(guidebook_id, variant: str, version: str, pdf_bytes: bytes) -> str:
+    """
+    Write a generated PDF to the cache and return its path.
+
+    The file is written to a temp file and renamed into place so concurrent
+    readers never see a partial PDF. Older versions of the same variant are
+    removed, since a new version means the guidebook changed.
+    """
+    directory = _guidebook_dir(guidebook_id)
+    os.makedirs(directory, exist_ok=True)
+    path = _pdf_path(guidebook_id, variant, version)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(pdf_bytes)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    prefix = os.path.join(directory, f"{_safe_name(variant)}.")
+    for stale in glob.glob(glob.escape(prefix) + '*.pdf'):
+        if stale != path:
+            try:
+                os.unlink(stale)
+            except OSError:
+                pass
+    return path
+
+
+def purge_guidebook_pdfs(guidebook_id) -> None:
+    """Remove every cached PDF for a guidebook (e.g. after it is deleted)."""
+    directory = _guidebook_dir(guidebook_id)
+    for path in glob.glob(os.path.join(glob.escape(directory), '*')):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    try:
+        os.rmdir(directory)
+    except OSError:
+        pass
+
+
+def cache_relative_path(path: str) -> str:
+    """Path of a cached PDF relative to PDF_CACHE_DIR (used for X-Accel-Redirect)."""
+    return os.path.relpath(path, PDF_CACHE_DIR).replace(os.sep, '/')
@@ -0,0 +1,237 @@
+import os
+import io
+import glob
+import time
+import random
+import hashlib
+import tempfile
+from dotenv import load_dotenv
+from .keyed_locks import KeyedLocks
+
+load_dotenv()
+
+# Google Places photos are immutable per photo_reference, so proxied photos are
+# kept on local disk and served from there on every later request.
+PHOTO_CACHE_DIR = os.environ.get('PHOTO_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'guidewise-photo-cache')
+PHOTO_CACHE_MAX_MB = int(os.environ.get('PHOTO_CACHE_MAX_MB', '1024'))
+PHOTO_WEBP_QUALITY = int(os.environ.get('PHOTO_WEBP_QUALITY', '80'))
+# Upstream photos are streamed in chunks; anything larger than this is refused
+PHOTO_MAX_BYTES = int(os.environ.get('PHOTO_MAX_BYTES', str(10 * 1024 * 1024)))
+PHOTO_STREAM_CHUNK_BYTES = 64 * 1024
+
+# Requested widths are rounded up to one of these so near-identical sizes share a file
+PHOTO_WIDTH_BUCKETS = (200, 400, 800, 1200, 1600)
+
+_MIMETYPES = {'jpg': 'image/jpeg', 'png': 'image/png', 'gif': 'image/gif', 'webp': 'image/webp'}
+_EXTENSIONS = {mimetype: ext for ext, mimetype in _MIMETYPES.items()}
+
+_fetch_locks = KeyedLocks()
+_webp_supported = None
+
+
+def width_bucket(maxwidth) -> int:
+    """Smallest bucket at least as wide as maxwidth (the largest bucket if none is)."""
+    try:
+        width = int(maxwidth)
+    except (TypeError, ValueError):
+        width = 800
+    for bucket in PHOTO_WIDTH_BUCKETS:
+        if width <= bucket:
+            return bucket
+    return PHOTO_WIDTH_BUCKETS[-1]
+
+
+def photo_etag(photo_reference: str, width: int, fmt: str) -> str:
+    """Strong validator for a cached photo; derived from the key since the image never changes."""
+    digest = hashlib.sha256(photo_reference.encode('utf-8')).hexdigest()[:32]
+    return f"{digest}-{width}-{fmt}"
+
+
+def _base_path(photo_reference: str, width: int, fmt: str) -> str:
+    return os.path.join(PHOTO_CACHE_DIR, photo_etag(photo_reference, width, fmt))
+
+
+def get_cached_photo(photo_reference: str, width: int, fmt: str) -> tuple[str, str] | None:
+    """Return (path, mimetype) of a cached photo, or None on a miss."""
+    base = _base_path(photo_reference, width, fmt)
+    for path in glob.glob(glob.escape(base) + '.*'):
+        ext = path.rsplit('.', 1)[-1]
+        if ext in _MIMETYPES:
+            return path, _MIMETYPES[ext]
+    return None
+
+
+class PhotoTooLarge(Exception):
+    """Raised when an upstream photo exceeds PHOTO_MAX_BYTES."""
+
+
+class _PhotoWriter:
+    """Writes one photo to a temp file in the cache dir; commit() moves it into place."""
+
+    def __init__(self, photo_reference: str, width: int, fmt: str):
+        os.makedirs(PHOTO_CACHE_DIR, exist_ok=True)
+        self.base = _base_path(photo_reference, width, fmt)
+        self.size = 0
+        fd, self.tmp_path = tempfile.mkstemp(dir=PHOTO_CACHE_DIR, suffix='.tmp')
+        self.fh = os.fdopen(fd, 'wb')
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > PHOTO_MAX_BYTES:
+            raise PhotoTooLarge(f"photo exceeds {PHOTO_MAX_BYTES} bytes")
+        self.fh.write(chunk)
+
+    def commit(self, mimetype: str) -> str:
+        ext = _EXTENSIONS.get((mimetype or '').split(';')[0].strip().lower(), 'jpg')
+        path = f"{self.base}.{ext}"
+        self.fh.close()
+        os.replace(self.tmp_path, path)
+        self.tmp_path = None
+        if random.random() < 0.02:
+            _prune()
+        return path
+
+    def abort(self) -> None:
+        if self.tmp_path is None:
+            return
+        try:
+            self.fh.close()
+            os.unlink(self.tmp_path)
+        except OSError:
+            pass
+        self.tmp_path = None
+
+
+def store_photo(photo_reference: str, width: int, fmt: str, data: bytes, mimetype: str) -> str:
+    """Atomically write a photo to the cache and return its path."""
+    writer = _PhotoWriter(photo_reference, width, fmt)
+    try:
+        writer.write(data)
+        return writer.commit(mimetype)
+    finally:
+        writer.abort()
+
+
+def tee_photo(photo_reference: str, width: int, fmt: str, chunks, mimetype: str, deadline: float | None = None):
+    """
+    Yield upstream chunks unchanged while writing them into the cache.
+
+    The cached file only appears once the whole body has been received, so a
+    client disconnect or an upstream error never leaves a truncated photo.
+    Raises PhotoTooLarge past PHOTO_MAX_BYTES and TimeoutError past deadline
+    (a time.monotonic() value).
+    """
+    writer = _PhotoWriter(photo_reference, width, fmt)
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            writer.write(chunk)
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("photo download exceeded its deadline")
+            yield chunk
+        writer.commit(mimetype)
+    finally:
+        writer.abort()
+
+
+def _prune() -> None:
+    """Delete least recently written photos while the cache exceeds PHOTO_CACHE_MAX_MB."""
+    limit = PHOTO_CACHE_MAX_MB * 1024 * 1024
+    entries = []
+    total = 0
+    for path in glob.glob(os.path.join(glob.escape(PHOTO_CACHE_DIR), '*')):
+        if path.endswith('.tmp'):
+            continue  # download in progress
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.unlink(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def webp_supported() -> bool:
+    """Whether Pillow is installed with WebP encoding (checked once per process)."""
+    global _webp_supported
+    if _webp_supported is None:
+        try:
+            from PIL import features
+            _webp_supported = bool(features.check('webp'))
+        except ImportError:
+            _webp_supported = False
+        if not _webp_supported:
+            print("Pillow with WebP support is not available; serving photos in their original format")
+    return _webp_supported
+
+
+def transcode_webp(source_path: str, width: int) -> bytes | None:
+    """Re-encode an image file as WebP no wider than width. Returns None if Pillow can't."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(source_path) as img:
+            if img.width > width:
+                img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+            out = io.BytesIO()
+            img.save(out, format='WEBP', quality=PHOTO_WEBP_QUALITY, method=4)
+            return out.getvalue()
+    except Exception as e:
+        print(f"WebP transcode failed: {e}")
+        return None
+
+
+def claim_photo_fetch(photo_reference: str, width: int, fmt: str):
+    """
+    Become the single fetcher of a missing photo without waiting (see get_or_fetch_photo).
+
+    Returns:
+        An idempotent release() to call once the photo is cached (or the fetch
+        failed), or None if another request is already fetching it
+    """
+    return _fetch_locks.try_acquire(photo_etag(photo_reference, width, fmt))
+
+
+def get_or_fetch_photo(photo_reference: str, width: int, fmt: str, fetch) -> tuple[str, str]:
+    """
+    Return (path, mimetype) for a photo, calling fetch() -> (chunks, mimetype) on a miss.
+
+    The fetched body is written to disk chunk by chunk, so memory stays flat
+    regardless of image size. Concurrent requests for the same photo wait for
+    a single fetch. With fmt='webp' the cached original is transcoded (falling
+    back to the original format if that isn't possible), so each photo is
+    fetched from Google once.
+    """
+    cached = get_cached_photo(photo_reference, width, fmt)
+    if cached is not None:
+        return cached
+    key = photo_etag(photo_reference, width, fmt)
+    with _fetch_locks.hold(key):
+        cached = get_cached_photo(photo_reference, width, fmt)
+        if cached is not None:
+            return cached
+        start = time.perf_counter()
+        if fmt == 'webp':
+            original_path, mimetype = get_or_fetch_photo(photo_reference, width, 'orig', fetch)
+            webp = transcode_webp(original_path, width)
+            if webp is None:
+                return original_path, mimetype
+            store_photo(photo_reference, width, fmt, webp, 'image/webp')
+        else:
+            chunks, mimetype = fetch()
+            for _ in tee_photo(photo_reference, width, fmt, chunks, mimetype):
+                pass
+        print(f"Cached place photo {key} in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return get_cached_photo(photo_reference, width, fmt)
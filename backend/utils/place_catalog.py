@@ -0,0 +1,219 @@
+import os
+import re
+import math
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from flask import current_app
+from sqlalchemy import String, cast
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from models import db, Place
+from .background import submit_once
+from .geo import great_circle_km, place_coords
+from .google_places import google_places_details
+from .metrics import incr
+
+load_dotenv()
+
+# Catalog entries older than this are still served but refreshed in the background
+PLACE_CATALOG_TTL_DAYS = float(os.environ.get('PLACE_CATALOG_TTL_DAYS', '30'))
+# A recommendation matches a catalog place with the same name within this distance of the property
+PLACE_CATALOG_MATCH_RADIUS_KM = float(os.environ.get('PLACE_CATALOG_MATCH_RADIUS_KM', '25'))
+
+
+def name_key(name: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a place name."""
+    text = re.sub(r"['\u2019]", "", str(name or "").lower())
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+# Street-type words as Google abbreviates them in formatted addresses
+_STREET_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'boulevard': 'blvd', 'drive': 'dr',
+    'lane': 'ln', 'place': 'pl', 'court': 'ct', 'highway': 'hwy', 'parkway': 'pkwy',
+    'square': 'sq', 'terrace': 'ter', 'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+}
+
+
+def street_key(address: str) -> str:
+    """
+    Normalized street line (before the first comma) of an address, with street
+    types abbreviated; empty unless it starts with a house number.
+    """
+    words = name_key(str(address or "").split(",")[0]).split()
+    if not words or not words[0][0].isdigit():
+        return ""
+    return " ".join(_STREET_ABBREVIATIONS.get(word, word) for word in words)
+
+
+def _session() -> Session:
+    # Own session on the engine (see utils/route_cache.py); requires an app context
+    return Session(db.engine)
+
+
+def _to_dict(place: Place) -> dict:
+    return {
+        'place_id': place.place_id,
+        'name': place.name,
+        'formatted_address': place.formatted_address,
+        'lat': place.latitude,
+        'lng': place.longitude,
+        'rating': place.rating,
+        'types': place.types or [],
+        'photo_reference': place.photo_reference,
+        'website': place.website,
+    }
+
+
+def _is_stale(place: Place) -> bool:
+    fetched_at = place.fetched_at
+    if fetched_at.tzinfo is None:
+        fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+    return fetched_at < datetime.now(timezone.utc) - timedelta(days=PLACE_CATALOG_TTL_DAYS)
+
+
+def store_place_details(place_id: str, result: dict) -> dict | None:
+    """
+    Upsert a place from a google_places_details result into the catalog.
+    Returns: the catalog entry as a dict (even if the write failed), or None if the result had no name
+    """
+    if not place_id or not (result or {}).get('name'):
+        return None
+    coords = place_coords(result)
+    photos = result.get('photos') or []
+    place = Place(
+        place_id=place_id,
+        name=result['name'],
+        name_key=name_key(result['name']),
+        formatted_address=result.get('formatted_address'),
+        latitude=coords[0] if coords else None,
+        longitude=coords[1] if coords else None,
+        rating=result.get('rating'),
+        types=result.get('types') or [],
+        photo_reference=(photos[0] or {}).get('photo_reference') if photos else None,
+        website=result.get('website'),
+        fetched_at=datetime.now(timezone.utc),
+    )
+    entry = _to_dict(place)
+    try:
+        with _session() as session:
+            session.merge(place)
+            session.commit()
+    except (SQLAlchemyError, RuntimeError) as e:
+        print(f"Place catalog store failed for {place_id}: {type(e).__name__}: {e}")
+    return entry
+
+
+def _refresh(app, place_id: str) -> None:
+    with app.app_context():
+        details = google_places_details(place_id)
+        if details.get('status') == 'OK':
+            store_place_details(place_id, details.get('result') or {})
+
+
+def _schedule_refresh(place_id: str) -> None:
+    try:
+        app = current_app._get_current_object()
+        submit_once(f"place:{place_id}", _refresh, app, place_id)
+        incr("place_catalog.refreshes")
+    except Exception as e:
+        print(f"Failed to schedule place refresh for {place_id}: {type(e).__name__}: {e}")
+
+
+def _lookup(query_fn) -> dict | None:
+    try:
+        with _session() as session:
+            place = query_fn(session)
+            entry = _to_dict(place) if place else None
+            stale = place is not None and _is_stale(place)
+    except (SQLAlchemyError, RuntimeError) as e:
+        print(f"Place catalog lookup failed: {type(e).__name__}: {e}")
+        return None
+    incr("place_catalog.lookups", outcome="hit" if entry else "miss")
+    if stale:
+        _schedule_refresh(entry['place_id'])
+    return entry
+
+
+def get_place(place_id: str) -> dict | None:
+    """Catalog entry for a place_id, or None. Stale entries are returned and refreshed in the background."""
+    if not place_id:
+        return None
+    return _lookup(lambda session: session.get(Place, place_id))
+
+
+def get_or_fetch_place(place_id: str) -> dict | None:
+    """
+    Read-through catalog lookup: on a miss, fetch Places details and store them.
+    Returns: catalog entry dict, or None if Google has no such place
+    """
+    entry = get_place(place_id)
+    if entry is not None:
+        return entry
+    details = google_places_details(place_id)
+    return store_place_details(place_id, details.get('result') or {})
+
+
+def _bounding_box(origin: tuple[float, float], radius_km: float):
+    lat, lng = origin
+    dlat = radius_km / 111.0
+    dlng = radius_km / (111.0 * max(0.01, math.cos(math.radians(lat))))
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+def find_place(name: str, address: str, origin: tuple[float, float],
+               radius_km: float = PLACE_CATALOG_MATCH_RADIUS_KM) -> dict | None:
+    """
+    Catalog place with this (normalized) name at this street address, within radius_km of origin.
+
+    Both must match, so a chain's name never binds to a different branch; an
+    address without a house number never matches (callers fall back to search).
+    """
+    key = name_key(name)
+    street = street_key(address)
+    if not key or not street or not origin:
+        return None
+    min_lat, max_lat, min_lng, max_lng = _bounding_box(origin, radius_km)
+
+    def query(session):
+        candidates = session.query(Place).filter(
+            Place.name_key == key,
+            Place.latitude.between(min_lat, max_lat),
+            Place.longitude.between(min_lng, max_lng),
+        ).all()
+        return next((p for p in candidates if street_key(p.formatted_address) == street), None)
+
+    return _lookup(query)
+
+
+def nearby_places(origin: tuple[float, float], radius_km: float, place_type: str | None = None,
+                  limit: int = 10) -> list:
+    """
+    Catalog places within radius_km of origin, best rated first (then nearest).
+    Optionally only places whose Google types include place_type.
+    """
+    min_lat, max_lat, min_lng, max_lng = _bounding_box(origin, radius_km)
+    try:
+        with _session() as session:
+            query = session.query(Place).filter(
+                Place.latitude.between(min_lat, max_lat),
+                Place.longitude.between(min_lng, max_lng),
+            )
+            if place_type:
+                # Types are stored as a JSON array of strings; match the quoted element
+                # (works for json and SQLite alike). "_" is a LIKE wildcard, so escape it.
+                escaped = place_type.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                query = query.filter(cast(Place.types, String).like(f'%"{escaped}"%', escape='\\'))
+            rows = query.all()
+    except (SQLAlchemyError, RuntimeError) as e:
+        print(f"Place catalog nearby query failed: {type(e).__name__}: {e}")
+        return []
+    places = []
+    for row in rows:
+        if place_type and place_type not in (row.types or []):
+            continue
+        distance_km = great_circle_km(origin, (row.latitude, row.longitude))
+        if distance_km <= radius_km:
+            places.append((row, distance_km))
+    places.sort(key=lambda pair: (-(pair[0].rating or 0), pair[1]))
+    return [_to_dict(row) for row, _ in places[:limit]]
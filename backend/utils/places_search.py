@@ -0,0 +1,137 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from .metrics import incr
+
+load_dotenv()
+
+# Recent autocomplete results are kept per location bias so a longer query
+# ("Blue Bottl" after "Blue Bott") can be answered by filtering an earlier
+# result list instead of another Text Search.
+PLACES_PREFIX_TTL_SECONDS = float(os.environ.get('PLACES_PREFIX_TTL_SECONDS', '300'))
+# Only prefixes at least this long are reused, and only when filtering leaves enough results
+PLACES_PREFIX_MIN_CHARS = int(os.environ.get('PLACES_PREFIX_MIN_CHARS', '4'))
+PLACES_PREFIX_MIN_MATCHES = int(os.environ.get('PLACES_PREFIX_MIN_MATCHES', '3'))
+# How long a request waits for an in-flight search of the same (or a prefix) query
+PLACES_COALESCE_WAIT_SECONDS = float(os.environ.get('PLACES_COALESCE_WAIT_SECONDS', '3'))
+PLACES_PREFIX_MAX_LOCATIONS = 256
+PLACES_PREFIX_MAX_QUERIES = 64
+
+_lock = threading.Lock()
+_index = OrderedDict()  # near -> OrderedDict(query -> (expires_at, items))
+_in_flight = {}  # (near, query) -> _Pending
+
+
+class _Pending:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+def _normalize(text) -> str:
+    return " ".join(str(text or "").lower().split())
+
+
+def _matches(item: dict, tokens: list) -> bool:
+    haystack = f"{item.get('name') or ''} {item.get('address') or ''}".lower()
+    return all(token in haystack for token in tokens)
+
+
+def _lookup(near: str, query: str):
+    """Return (source, items) answerable from the index, or None. Caller holds _lock."""
+    entries = _index.get(near)
+    if not entries:
+        return None
+    now = time.monotonic()
+    best = None
+    for prefix, (expires_at, items) in list(entries.items()):
+        if expires_at <= now:
+            del entries[prefix]
+            continue
+        if prefix == query:
+            entries.move_to_end(prefix)
+            return "exact", items
+        if len(prefix) >= PLACES_PREFIX_MIN_CHARS and query.startswith(prefix):
+            if best is None or len(prefix) > len(best[0]):
+                best = (prefix, items)
+    if best is None:
+        return None
+    tokens = query.split()
+    filtered = [item for item in best[1] if _matches(item, tokens)]
+    if len(filtered) < PLACES_PREFIX_MIN_MATCHES:
+        return None
+    return "prefix", filtered
+
+
+def _remember(near: str, query: str, items: list) -> None:
+    """Store a result list. Caller holds _lock."""
+    entries = _index.get(near)
+    if entries is None:
+        entries = _index[near] = OrderedDict()
+    _index.move_to_end(near)
+    entries[query] = (time.monotonic() + PLACES_PREFIX_TTL_SECONDS, items)
+    entries.move_to_end(query)
+    while len(entries) > PLACES_PREFIX_MAX_QUERIES:
+        entries.popitem(last=False)
+    while len(_index) > PLACES_PREFIX_MAX_LOCATIONS:
+        _index.popitem(last=False)
+
+
+def _pending_prefix(near: str, query: str):
+    """Longest in-flight search for query or one of its prefixes. Caller holds _lock."""
+    best = None
+    for (pending_near, prefix), pending in _in_flight.items():
+        if pending_near != near or not query.startswith(prefix):
+            continue
+        if prefix != query and len(prefix) < PLACES_PREFIX_MIN_CHARS:
+            continue
+        if best is None or len(prefix) > len(best[0]):
+            best = (prefix, pending)
+    return best[1] if best else None
+
+
+def search_places(query: str, near: str | None, fetch) -> list:
+    """
+    Autocomplete search backed by a per-location prefix index.
+
+    Answers from a recent result for the same query or, by filtering, for a
+    prefix of it; otherwise waits briefly for an in-flight search of the same
+    query or a prefix; otherwise calls fetch(query, near) -> list of
+    { name, address, place_id }. Each outcome is counted in the
+    places_search.requests metric by source (exact, prefix, coalesced, upstream).
+    """
+    q = _normalize(query)
+    n = _normalize(near)
+
+    with _lock:
+        hit = _lookup(n, q)
+        pending = None if hit else _pending_prefix(n, q)
+        own = None
+        if hit is None and pending is None:
+            own = _in_flight[(n, q)] = _Pending()
+    if hit is not None:
+        incr("places_search.requests", source=hit[0])
+        return hit[1]
+
+    if pending is not None:
+        pending.done.wait(PLACES_COALESCE_WAIT_SECONDS)
+        with _lock:
+            hit = _lookup(n, q)
+            if hit is None and (n, q) not in _in_flight:
+                own = _in_flight[(n, q)] = _Pending()
+        if hit is not None:
+            incr("places_search.requests", source="coalesced")
+            return hit[1]
+
+    try:
+        items = fetch(query, near)
+        with _lock:
+            _remember(n, q, items)
+        incr("places_search.requests", source="upstream")
+        return items
+    finally:
+        if own is not None:
+            with _lock:
+                _in_flight.pop((n, q), None)
+            own.done.set()
@@ -0,0 +1,187 @@
+import os
+import io
+import json
+import time
+import base64
+import random
+import hashlib
+import tempfile
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from dotenv import load_dotenv
+from .metrics import incr
+
+load_dotenv()
+
+# How outbound calls to OpenAI, Google and Stripe are made:
+#   live   - straight to the service (default)
+#   record - to the service, saving every response as a fixture
+#   replay - served from fixtures with no network, with optional injected latency/failures
+PROVIDER_MODE = os.environ.get('PROVIDER_MODE', 'live').strip().lower()
+# Recorded responses can contain customer data; keep them outside the repo
+PROVIDER_FIXTURES_DIR = os.environ.get('PROVIDER_FIXTURES_DIR') or os.path.join(
+    tempfile.gettempdir(), 'guidewise-provider-fixtures'
+)
+
+# Query parameters that carry credentials; never part of a fixture key or file
+SECRET_PARAMS = {'key', 'api_key'}
+# Headers not worth storing (bodies are stored decoded)
+_DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection',
+                    'set-cookie', 'date'}
+
+_PROVIDER_HOSTS = {
+    'maps.googleapis.com': 'google',
+    'routes.googleapis.com': 'google',
+    'api.openai.com': 'openai',
+    'api.stripe.com': 'stripe',
+}
+
+
+def recording_enabled() -> bool:
+    return PROVIDER_MODE in ('record', 'replay')
+
+
+def _provider_for(url: str) -> str:
+    return _PROVIDER_HOSTS.get(urlsplit(url).hostname or '', 'other')
+
+
+def _setting(name: str, provider: str, default: str) -> float:
+    """Replay knob, overridable per provider (e.g. PROVIDER_REPLAY_LATENCY_MS_OPENAI)."""
+    return float(os.environ.get(f'{name}_{provider.upper()}') or os.environ.get(name) or default)
+
+
+def _public_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in SECRET_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+def _canonical_body(body) -> bytes:
+    if body is None:
+        return b''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    try:
+        return json.dumps(json.loads(body), sort_keys=True).encode('utf-8')
+    except (ValueError, UnicodeDecodeError):
+        return bytes(body)
+
+
+def _fixture_path(method: str, url: str, body) -> tuple[str, str]:
+    public_url = _public_url(url)
+    digest = hashlib.sha256(
+        method.upper().encode('utf-8') + b' ' + public_url.encode('utf-8') + b'\n' + _canonical_body(body)
+    ).hexdigest()[:32]
+    return os.path.join(PROVIDER_FIXTURES_DIR, _provider_for(url), f'{digest}.json'), public_url
+
+
+def _save_fixture(method: str, url: str, body, status: int, headers, content: bytes) -> None:
+    path, public_url = _fixture_path(method, url, body)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fixture = {
+        'request': {'method': method.upper(), 'url': public_url},
+        'response': {
+            'status': status,
+            'headers': {k: v for k, v in headers.items() if k.lower() not in _DROPPED_HEADERS},
+            'body_b64': base64.b64encode(content).decode('ascii'),
+        },
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as fh:
+        json.dump(fixture, fh, indent=2)
+    os.replace(tmp_path, path)
+    incr('providers.recorded', provider=_provider_for(url))
+
+
+def _replay(method: str, url: str, body):
+    """Return (status, headers, content) for a recorded call, or None if there is no fixture."""
+    provider = _provider_for(url)
+    latency_ms = _setting('PROVIDER_REPLAY_LATENCY_MS', provider, '0')
+    if latency_ms > 0:
+        # Exponential spread around the configured mean, like real network latency
+        time.sleep(random.expovariate(1 / latency_ms) / 1000)
+    if random.random() < _setting('PROVIDER_REPLAY_FAILURE_RATE', provider, '0'):
+        incr('providers.replayed', provider=provider, outcome='injected_failure')
+        return 503, {'Content-Type': 'application/json'}, b'{"error": "injected replay failure"}'
+
+    path, public_url = _fixture_path(method, url, body)
+    try:
+        with open(path) as fh:
+            response = json.load(fh)['response']
+    except FileNotFoundError:
+        incr('providers.replayed', provider=provider, outcome='missing')
+        print(f"No provider fixture for {method.upper()} {public_url} ({path})")
+        return None
+    incr('providers.replayed', provider=provider, outcome='hit')
+    return response['status'], response['headers'], base64.b64decode(response['body_b64'])
+
+
+class RecordReplayAdapter(HTTPAdapter):
+    """requests transport adapter that records or replays responses per PROVIDER_MODE."""
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if PROVIDER_MODE == 'replay':
+            replayed = _replay(request.method, request.url, request.body)
+            if replayed is None:
+                raise requests.ConnectionError(f"No provider fixture for {request.method} {_public_url(request.url)}",
+                                               request=request)
+            status, headers, content = replayed
+            resp = requests.Response()
+            resp.status_code = status
+            resp.headers = CaseInsensitiveDict(headers)
+            resp.raw = io.BytesIO(content)
+            resp.encoding = get_encoding_from_headers(resp.headers)
+            resp.reason = 'Replayed'
+            resp.url = request.url
+            resp.request = request
+            resp.connection = self
+            return resp
+
+        resp = super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        if PROVIDER_MODE == 'record':
+            _save_fixture(request.method, request.url, request.body, resp.status_code, resp.headers, resp.content)
+        return resp
+
+
+class RecordReplayTransport(httpx.BaseTransport):
+    """httpx transport (used by the OpenAI SDK) that records or replays responses per PROVIDER_MODE."""
+
+    def __init__(self, inner: httpx.BaseTransport):
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        body = request.read()
+        if PROVIDER_MODE == 'replay':
+            replayed = _replay(request.method, url, body)
+            if replayed is None:
+                raise httpx.ConnectError(f"No provider fixture for {request.method} {_public_url(url)}", request=request)
+            status, headers, content = replayed
+            return httpx.Response(status, headers=headers, content=content, request=request)
+
+        resp = self.inner.handle_request(request)
+        if PROVIDER_MODE != 'record':
+            return resp
+        try:
+            content = resp.read()
+        finally:
+            resp.close()
+        headers = {k: v for k, v in resp.headers.items() if k.lower() not in _DROPPED_HEADERS}
+        _save_fixture(request.method, url, body, resp.status_code, headers, content)
+        return httpx.Response(resp.status_code, headers=headers, content=content, request=request)
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+def install_stripe_provider(stripe_module) -> None:
+    """Route Stripe SDK calls through the record/replay adapter when not in live mode."""
+    if not recording_enabled():
+        return
+    session = requests.Session()
+    session.mount('https://', RecordReplayAdapter())
+    stripe_module.default_http_client = stripe_module.RequestsClient(session=session)
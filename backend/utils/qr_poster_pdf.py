@@ -0,0 +1,352 @@
+"""
+Direct PDF writer for the one-page QR poster (template_pdf_qr).
+
+The poster is a fixed layout (title, optional "Hosted by" line, a large QR
+code and a footer), so it is drawn straight to PDF here instead of going
+through Jinja -> HTML -> WeasyPrint. The layout mirrors
+templates/templates_pdf/template_pdf_qr.html; keep the two in sync.
+
+render_qr_poster_pdf() returns None whenever it cannot reproduce the HTML
+template faithfully (text outside the standard PDF font encoding, a title
+too long for the page, a QR image format we don't embed) so the caller can
+fall back to the WeasyPrint pipeline.
+
+Accepted deviations from the WeasyPrint output:
+- Text is set in the base-14 Times faces instead of the template's Georgia
+  stack. Georgia isn't installed in the backend image (WeasyPrint falls back to
+  whatever serif fontconfig resolves), and embedding a font would undo the
+  point of this writer. Glyph shapes and advance widths differ slightly, so a
+  title near the wrap width can break at a different word.
+- Vertical text positions use fixed ascent ratios rather than each font's
+  metrics, so baselines can sit a point or two apart.
+scripts/compare_qr_poster.py measures the remaining difference.
+"""
+import logging
+import struct
+import zlib
+from .http import get_session
+
+log = logging.getLogger(__name__)
+
+# Page geometry in PDF points (1in = 72pt), matching the template CSS:
+# @page { size: letter; margin: 0.5in } and .page-frame { border: 2pt; padding: 0.4in }
+PAGE_WIDTH = 612.0
+PAGE_HEIGHT = 792.0
+PAGE_MARGIN = 36.0
+FRAME_BORDER = 2.0
+FRAME_RADIUS = 10.0
+FRAME_PADDING = 28.8
+CONTENT_LEFT = PAGE_MARGIN + FRAME_BORDER + FRAME_PADDING
+CONTENT_RIGHT = PAGE_WIDTH - CONTENT_LEFT
+CONTENT_TOP = PAGE_HEIGHT - PAGE_MARGIN - FRAME_BORDER - FRAME_PADDING
+CONTENT_BOTTOM = PAGE_MARGIN + FRAME_BORDER + FRAME_PADDING
+CONTENT_WIDTH = CONTENT_RIGHT - CONTENT_LEFT
+
+TITLE_SIZE = 30.0
+TITLE_LETTER_SPACING = 0.225  # letter-spacing: 0.3px
+SUBTITLE_SIZE = 12.0
+FOOTER_SIZE = 10.0
+LINE_HEIGHT = 1.15
+QR_SIZE = 468.0          # .qr { width: 6.5in; height: 6.5in }
+QR_BORDER = 9.0          # 12px white border
+QR_RADIUS = 12.0         # 16px
+
+# Template colours
+COLOR_FRAME = (0xe5, 0xe7, 0xeb)
+COLOR_TITLE = (0x11, 0x18, 0x27)
+COLOR_SUBTITLE = (0x6b, 0x72, 0x80)
+COLOR_FOOTER = (0x9c, 0xa3, 0xaf)
+
+QR_FETCH_TIMEOUT = 10
+
+# Advance widths (1/1000 em) for WinAnsi codes 32..126 from the Adobe
+# Times-Roman and Times-Bold AFM files. Other codes fall back to DEFAULT_WIDTH.
+_TIMES_ROMAN_WIDTHS = [
+    250, 333, 408, 500, 500, 833, 778, 180, 333, 333, 500, 564, 250, 333, 250, 278,
+    500, 500, 500, 500, 500, 500, 500, 500, 500, 500, 278, 278, 564, 564, 564, 444,
+    921, 722, 667, 667, 722, 611, 556, 722, 722, 333, 389, 722, 611, 889, 722, 722,
+    556, 722, 667, 556, 611, 722, 722, 944, 722, 722, 611, 333, 278, 333, 469, 500,
+    333, 444, 500, 444, 500, 444, 333, 500, 500, 278, 278, 500, 278, 778, 500, 500,
+    500, 500, 333, 389, 278, 500, 500, 722, 500, 500, 444, 480, 200, 480, 541,
+]
+_TIMES_BOLD_WIDTHS = [
+    250, 333, 555, 500, 500, 1000, 833, 278, 333, 333, 500, 570, 250, 333, 250, 278,
+    500, 500, 500, 500, 500, 500, 500, 500, 500, 500, 333, 333, 570, 570, 570, 500,
+    930, 722, 667, 722, 722, 667, 611, 778, 778, 389, 500, 778, 667, 944, 722, 778,
+    611, 778, 722, 556, 667, 722, 722, 1000, 722, 722, 667, 333, 278, 333, 581, 500,
+    333, 500, 556, 444, 556, 444, 333, 500, 556, 278, 333, 556, 278, 833, 556, 500,
+    556, 556, 444, 389, 333, 556, 500, 722, 500, 500, 444, 394, 220, 394, 520,
+]
+DEFAULT_WIDTH = 500
+BULLET_WIDTH = 350  # WinAnsi 0x95 in both fonts
+
+FONTS = {
+    'F1': ('Times-Roman', _TIMES_ROMAN_WIDTHS),
+    'F2': ('Times-Bold', _TIMES_BOLD_WIDTHS),
+}
+
+
+def _encode(text: str) -> bytes:
+    """Encode text for a base-14 font with WinAnsiEncoding (raises UnicodeEncodeError)."""
+    return text.encode('cp1252')
+
+
+def _text_width(encoded: bytes, font: str, size: float, char_spacing: float = 0.0) -> float:
+    widths = FONTS[font][1]
+    total = 0
+    for code in encoded:
+        if 32 <= code <= 126:
+            total += widths[code - 32]
+        elif code == 0x95:
+            total += BULLET_WIDTH
+        else:
+            total += DEFAULT_WIDTH
+    return total * size / 1000.0 + char_spacing * len(encoded)
+
+
+def _wrap(text: str, font: str, size: float, max_width: float, char_spacing: float = 0.0) -> list:
+    """Greedy word wrap, like the browser does for the centred title."""
+    lines = []
+    current = ''
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if current and _text_width(_encode(candidate), font, size, char_spacing) > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines
+
+
+def _pdf_string(encoded: bytes) -> bytes:
+    return b'(' + encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _rgb(color) -> str:
+    return ' '.join(f"{c / 255:.3f}" for c in color)
+
+
+def _rounded_rect(x: float, y: float, w: float, h: float, r: float) -> str:
+    """Path operators for a rounded rectangle with its lower-left corner at (x, y)."""
+    k = r * 0.5523
+    return (
+        f"{x + r:.2f} {y:.2f} m "
+        f"{x + w - r:.2f} {y:.2f} l "
+        f"{x + w - r + k:.2f} {y:.2f} {x + w:.2f} {y + r - k:.2f} {x + w:.2f} {y + r:.2f} c "
+        f"{x + w:.2f} {y + h - r:.2f} l "
+        f"{x + w:.2f} {y + h - r + k:.2f} {x + w - r + k:.2f} {y + h:.2f} {x + w - r:.2f} {y + h:.2f} c "
+        f"{x + r:.2f} {y + h:.2f} l "
+        f"{x + r - k:.2f} {y + h:.2f} {x:.2f} {y + h - r + k:.2f} {x:.2f} {y + h - r:.2f} c "
+        f"{x:.2f} {y + r:.2f} l "
+        f"{x:.2f} {y + r - k:.2f} {x + r - k:.2f} {y:.2f} {x + r:.2f} {y:.2f} c h"
+    )
+
+
+def _centered_text(encoded: bytes, font: str, size: float, baseline: float, color, char_spacing: float = 0.0) -> str:
+    x = (PAGE_WIDTH - _text_width(encoded, font, size, char_spacing)) / 2
+    return _text_run([(encoded, font, size, color, char_spacing)], x, baseline)
+
+
+def _text_run(parts: list, x: float, baseline: float) -> str:
+    ops = [f"BT {x:.2f} {baseline:.2f} Td"]
+    for encoded, font, size, color, char_spacing in parts:
+        ops.append(f"/{font} {size:g} Tf {_rgb(color)} rg {char_spacing:g} Tc")
+        ops.append(_pdf_string(encoded).decode('latin-1') + ' Tj')
+    ops.append('ET')
+    return ' '.join(ops)
+
+
+def _png_image(data: bytes):
+    """
+    Build an image XObject from PNG bytes without decoding pixels.
+
+    PNG IDAT data is a zlib stream with per-row filters, which PDF's
+    FlateDecode understands directly via /Predictor 15. Only opaque,
+    non-interlaced greyscale, RGB and palette images are supported.
+    Returns (dictionary_bytes, stream_bytes) or None.
+    """
+    if not data or data[:8] != b'\x89PNG\r\n\x1a\n':
+        return None
+    pos = 8
+    header = None
+    palette = None
+    idat = []
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if chunk_type == b'IHDR':
+            header = struct.unpack('>IIBBBBB', chunk)
+        elif chunk_type == b'PLTE':
+            palette = chunk
+        elif chunk_type == b'IDAT':
+            idat.append(chunk)
+        elif chunk_type == b'IEND':
+            break
+    if not header or not idat:
+        return None
+    width, height, bit_depth, color_type, _compression, _filter, interlace = header
+    if interlace or bit_depth > 8:
+        return None
+    if color_type == 0:
+        colors, color_space = 1, '/DeviceGray'
+    elif color_type == 2:
+        colors, color_space = 3, '/DeviceRGB'
+    elif color_type == 3 and palette:
+        colors = 1
+        color_space = f"[/Indexed /DeviceRGB {len(palette) // 3 - 1} <{palette.hex()}>]"
+    else:
+        return None
+    dictionary = (
+        f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+        f"/ColorSpace {color_space} /BitsPerComponent {bit_depth} /Filter /FlateDecode "
+        f"/DecodeParms << /Predictor 15 /Colors {colors} /BitsPerComponent {bit_depth} /Columns {width} >>"
+    )
+    return dictionary, b''.join(idat)
+
+
+def _fetch_qr_png(url: str):
+    try:
+        resp = get_session().get(url, timeout=QR_FETCH_TIMEOUT)
+        resp.raise_for_status()
+        return resp.content
+    except Exception as e:
+        log.warning("QR poster: failed to fetch QR image: %s", e)
+        return None
+
+
+def _build_pdf(content: bytes, image, title: str) -> bytes:
+    """Assemble a single-page PDF with the two Times fonts and an optional image."""
+    objects = []
+
+    def add(obj: bytes) -> int:
+        objects.append(obj)
+        return len(objects)
+
+    catalog_id = add(b'')  # filled in once the pages id is known
+    pages_id = add(b'')
+    font_ids = {
+        name: add(f"<< /Type /Font /Subtype /Type1 /BaseFont /{base} /Encoding /WinAnsiEncoding >>".encode('ascii'))
+        for name, (base, _widths) in FONTS.items()
+    }
+    xobjects = ''
+    if image is not None:
+        dictionary, stream = image
+        image_id = add(dictionary.encode('ascii') + f" /Length {len(stream)} >>\nstream\n".encode('ascii') + stream + b'\nendstream')
+        xobjects = f" /XObject << /Im1 {image_id} 0 R >>"
+    compressed = zlib.compress(content)
+    content_id = add(f"<< /Length {len(compressed)} /Filter /FlateDecode >>\nstream\n".encode('ascii') + compressed + b'\nendstream')
+    fonts = ' '.join(f"/{name} {obj_id} 0 R" for name, obj_id in font_ids.items())
+    page_id = add((
+        f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 {PAGE_WIDTH:g} {PAGE_HEIGHT:g}] "
+        f"/Resources << /Font << {fonts} >>{xobjects} >> /Contents {content_id} 0 R >>"
+    ).encode('ascii'))
+    objects[catalog_id - 1] = f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode('ascii')
+    objects[pages_id - 1] = f"<< /Type /Pages /Kids [{page_id} 0 R] /Count 1 >>".encode('ascii')
+    info_title = ('\ufeff' + title).encode('utf-16-be').hex()
+    info_id = add(f"<< /Title <{info_title}> /Producer (Guidewise) >>".encode('ascii'))
+
+    out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode('ascii') + obj + b'\nendobj\n'
+    xref_offset = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('ascii')
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode('ascii')
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root {catalog_id} 0 R /Info {info_id} 0 R >>\n"
+        f"startxref\n{xref_offset}\n%%EOF\n"
+    ).encode('ascii')
+    return bytes(out)
+
+
+def render_qr_poster_pdf(ctx: dict, fetch_image=_fetch_qr_png) -> bytes | None:
+    """
+    Render the QR poster for a guidebook context straight to PDF.
+
+    Args:
+        ctx: The PDF rendering context built in create_guidebook_pdf (uses
+            property_name, host.name and qr_img_src)
+        fetch_image: Callable returning PNG bytes for a URL (or None)
+
+    Returns:
+        PDF bytes, or None if the poster should be rendered by WeasyPrint instead
+    """
+    property_name = (ctx.get('property_name') or '').strip()
+    host_name = ((ctx.get('host') or {}).get('name') or '').strip()
+    title = f"{property_name} Digital Guidebook" if property_name else 'Digital Guidebook'
+
+    try:
+        title_lines = [_encode(line) for line in _wrap(title, 'F2', TITLE_SIZE, CONTENT_WIDTH, TITLE_LETTER_SPACING)]
+        subtitle = _encode(f"Hosted by {host_name}") if host_name else None
+    except UnicodeEncodeError:
+        # Characters outside WinAnsi need an embedded font; let WeasyPrint handle it
+        return None
+
+    image = None
+    qr_src = ctx.get('qr_img_src')
+    if qr_src:
+        image = _png_image(fetch_image(qr_src))
+        if image is None:
+            return None
+
+    ops = [
+        # .page-frame border (stroke is centred on the path, so inset by half its width)
+        f"{FRAME_BORDER:g} w {_rgb(COLOR_FRAME)} RG",
+        _rounded_rect(
+            PAGE_MARGIN + FRAME_BORDER / 2, PAGE_MARGIN + FRAME_BORDER / 2,
+            PAGE_WIDTH - 2 * PAGE_MARGIN - FRAME_BORDER, PAGE_HEIGHT - 2 * PAGE_MARGIN - FRAME_BORDER,
+            FRAME_RADIUS,
+        ) + ' S',
+    ]
+
+    # .title { font-size: 30pt; margin: 0.2in 0 0.05in 0 }
+    cursor = CONTENT_TOP - 14.4
+    title_line_height = TITLE_SIZE * LINE_HEIGHT
+    for line in title_lines:
+        baseline = cursor - (title_line_height - TITLE_SIZE) / 2 - TITLE_SIZE * 0.8
+        ops.append(_centered_text(line, 'F2', TITLE_SIZE, baseline, COLOR_TITLE, TITLE_LETTER_SPACING))
+        cursor -= title_line_height
+    cursor -= 3.6
+
+    # .subtitle { font-size: 12pt; margin-bottom: 0.25in }
+    if subtitle:
+        sub_line_height = SUBTITLE_SIZE * LINE_HEIGHT
+        baseline = cursor - (sub_line_height - SUBTITLE_SIZE) / 2 - SUBTITLE_SIZE * 0.8
+        ops.append(_centered_text(subtitle, 'F1', SUBTITLE_SIZE, baseline, COLOR_SUBTITLE))
+        cursor -= sub_line_height + 18.0
+
+    # .qr-wrap { margin: 0.1in 0 0.2in 0 } around a 6.5in image with a 12px white border
+    cursor -= 7.2 + QR_BORDER
+    qr_x = (PAGE_WIDTH - QR_SIZE) / 2
+    qr_y = cursor - QR_SIZE
+    if image is not None:
+        ops.append(f"q {QR_SIZE:g} 0 0 {QR_SIZE:g} {qr_x:.2f} {qr_y:.2f} cm /Im1 Do Q")
+    else:
+        ops.append(f"q 2 w [4 4] 0 d {_rgb(COLOR_FRAME)} RG {_rounded_rect(qr_x, qr_y, QR_SIZE, QR_SIZE, QR_RADIUS)} S Q")
+        middle = qr_y + QR_SIZE / 2
+        ops.append(_centered_text(b'QR unavailable', 'F2', 14.0, middle + 4, COLOR_FOOTER))
+        ops.append(_centered_text(b'Open this PDF via the app with a QR URL to render.', 'F1', 10.0, middle - 12, COLOR_FOOTER))
+    cursor = qr_y - QR_BORDER - 14.4
+
+    # .footer { font-size: 10pt } with an uppercase, letter-spaced .brand
+    footer_line_height = FOOTER_SIZE * LINE_HEIGHT
+    baseline = cursor - (footer_line_height - FOOTER_SIZE) / 2 - FOOTER_SIZE * 0.8
+    if baseline < CONTENT_BOTTOM:
+        # Long titles push the footer off the page; WeasyPrint paginates that case
+        return None
+    lead = _encode('Scan to view the live guidebook • ')
+    brand = b'GUIDEWISE'
+    brand_spacing = 0.9  # letter-spacing: 1.2px
+    width = _text_width(lead, 'F1', FOOTER_SIZE) + _text_width(brand, 'F2', FOOTER_SIZE, brand_spacing)
+    ops.append(_text_run([
+        (lead, 'F1', FOOTER_SIZE, COLOR_FOOTER, 0.0),
+        (brand, 'F2', FOOTER_SIZE, COLOR_TITLE, brand_spacing),
+    ], (PAGE_WIDTH - width) / 2, baseline))
+
+    content = '\n'.join(ops).encode('latin-1')
+    return _build_pdf(content, image, f"{property_name or 'Guidewise Guidebook'} — QR Poster")
@@ -0,0 +1,111 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dotenv import load_dotenv
+from .metrics import incr, observe
+from .rate_limit import get_limiter_store
+from .deadline import remaining
+
+load_dotenv()
+
+# Outbound Google calls draw from one token bucket per endpoint, shared by every
+# worker on the host (same SQLite store as the inbound rate limiter), so bursts
+# queue briefly instead of tripping per-project 429s.
+GOOGLE_QUOTA_ENABLED = os.environ.get('GOOGLE_QUOTA_ENABLED', '1').strip().lower() not in ('0', 'false', 'no')
+# Longest an interactive call queues for quota before failing
+GOOGLE_QUOTA_MAX_WAIT_SECONDS = float(os.environ.get('GOOGLE_QUOTA_MAX_WAIT_SECONDS', '5'))
+# Background calls wait longer but only use capacity above this share of the burst,
+# leaving the rest for interactive requests
+GOOGLE_QUOTA_BACKGROUND_MAX_WAIT_SECONDS = float(os.environ.get('GOOGLE_QUOTA_BACKGROUND_MAX_WAIT_SECONDS', '60'))
+GOOGLE_QUOTA_BACKGROUND_RESERVE = float(os.environ.get('GOOGLE_QUOTA_BACKGROUND_RESERVE', '0.5'))
+
+# Endpoint -> (units per second, burst). Matrix endpoints are metered per element.
+# Override with GOOGLE_QUOTA_<ENDPOINT>="per_second,burst", e.g. GOOGLE_QUOTA_PLACES_DETAILS="5,10".
+DEFAULT_QUOTAS = {
+    'places_text_search': (10, 20),
+    'places_details': (10, 20),
+    'places_photo': (20, 40),
+    'geocode': (20, 40),
+    'routes_matrix': (50, 100),
+    'distance_matrix': (50, 100),
+}
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+_priority = ContextVar('google_quota_priority', default=INTERACTIVE)
+
+
+class QuotaExhausted(Exception):
+    """Raised when an outbound call can't get quota within its maximum wait."""
+
+
+@contextmanager
+def outbound_priority(priority: str):
+    """Run a block with the given outbound priority (INTERACTIVE or BACKGROUND)."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _quota(endpoint: str) -> tuple[float, float]:
+    override = os.environ.get(f'GOOGLE_QUOTA_{endpoint.upper()}')
+    if override:
+        try:
+            per_second, burst = (float(part.strip()) for part in override.split(','))
+            return per_second, burst
+        except ValueError:
+            print(f"Ignoring malformed GOOGLE_QUOTA_{endpoint.upper()}={override!r}")
+    return DEFAULT_QUOTAS[endpoint]
+
+
+def acquire_quota(endpoint: str, cost: float = 1) -> None:
+    """
+    Block until an outbound call to a Google endpoint fits the shared quota.
+
+    Interactive calls queue in arrival order (the bucket goes into debt that
+    each caller waits off) for up to GOOGLE_QUOTA_MAX_WAIT_SECONDS, or until
+    the request deadline (utils.deadline) if that is sooner. Background
+    calls only run while the bucket holds more than the interactive reserve,
+    polling for up to GOOGLE_QUOTA_BACKGROUND_MAX_WAIT_SECONDS. Queue wait is
+    recorded in the google_quota.wait_ms metric.
+
+    Raises:
+        QuotaExhausted: if the call can't be scheduled within its maximum wait
+    """
+    if not GOOGLE_QUOTA_ENABLED:
+        return
+    rate, burst = _quota(endpoint)
+    cost = min(cost, burst)
+    priority = _priority.get()
+    if priority == BACKGROUND:
+        floor = burst * GOOGLE_QUOTA_BACKGROUND_RESERVE
+        max_wait = GOOGLE_QUOTA_BACKGROUND_MAX_WAIT_SECONDS
+    else:
+        max_wait = GOOGLE_QUOTA_MAX_WAIT_SECONDS
+        left = remaining()
+        if left is not None:
+            max_wait = max(0.0, min(max_wait, left))
+        floor = -rate * max_wait
+
+    start = time.monotonic()
+    deadline = start + max_wait
+    store = get_limiter_store()
+    while True:
+        try:
+            granted, wait = store.reserve(f"google:{endpoint}", rate, burst, cost, floor)
+        except Exception as e:
+            print(f"Google quota store error ({endpoint}): {e}")
+            return
+        if granted:
+            if wait > 0:
+                time.sleep(wait)
+            break
+        if time.monotonic() + wait > deadline:
+            incr("google_quota.exhausted", endpoint=endpoint, priority=priority)
+            raise QuotaExhausted(f"No {endpoint} quota available within {max_wait}s")
+        time.sleep(wait)
+    observe("google_quota.wait_ms", (time.monotonic() - start) * 1000, endpoint=endpoint, priority=priority)
@@ -0,0 +1,279 @@
+import os
+import math
+import time
+import random
+import sqlite3
+import threading
+from dotenv import load_dotenv
+from .cache import CACHE_DIR
+from .metrics import incr
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1').strip().lower() not in ('0', 'false', 'no')
+# SQLite file shared by every worker on the host (token buckets and concurrency
+# leases); set RATE_LIMIT_DB= (empty) for per-process limits
+RATE_LIMIT_DB = os.environ.get('RATE_LIMIT_DB', os.path.join(CACHE_DIR, 'rate_limit.sqlite3'))
+# Concurrency leases held longer than this are assumed to be leaked
+RATE_LIMIT_LEASE_SECONDS = float(os.environ.get('RATE_LIMIT_LEASE_SECONDS', '180'))
+
+# Endpoint class -> (requests per minute per client, burst, concurrent requests across workers).
+# Only work that reaches an upstream or renders is limited; cache hits and
+# conditional requests are served without touching the limiter.
+# Override with RATE_LIMIT_<CLASS>="per_minute,burst,concurrency", e.g. RATE_LIMIT_AI="10,5,4".
+DEFAULT_LIMITS = {
+    'ai': (10, 5, 4),
+    'places': (120, 30, 16),
+    'photo': (600, 120, 32),
+    'pdf': (20, 5, 2),
+}
+
+
+def get_limits(endpoint_class: str) -> tuple[float, float, int]:
+    override = os.environ.get(f'RATE_LIMIT_{endpoint_class.upper()}')
+    if override:
+        try:
+            per_minute, burst, concurrency = (part.strip() for part in override.split(','))
+            return float(per_minute), float(burst), int(concurrency)
+        except ValueError:
+            print(f"Ignoring malformed RATE_LIMIT_{endpoint_class.upper()}={override!r}")
+    return DEFAULT_LIMITS[endpoint_class]
+
+
+def _reserve(tokens: float, rate_per_sec: float, cost: float, floor: float) -> tuple[bool, float]:
+    """
+    Decide a reservation against a refilled bucket level.
+
+    The bucket may go down to floor (negative floors let callers queue: the
+    debt is paid back by waiting). Returns (granted, wait): when granted, how
+    long the caller must wait before its turn; otherwise how long until the
+    reservation could succeed.
+    """
+    if tokens - cost >= floor:
+        return True, max(0.0, -(tokens - cost) / rate_per_sec)
+    return False, (floor + cost - tokens) / rate_per_sec
+
+
+class MemoryLimiterStore:
+    """Per-process token buckets and concurrency slots."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._slots = {}
+        self._next_slot = 0
+
+    def take_token(self, key: str, rate_per_sec: float, burst: float) -> float:
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate_per_sec)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rate_per_sec
+
+    def reserve(self, key: str, rate_per_sec: float, burst: float, cost: float, floor: float):
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate_per_sec)
+            granted, wait = _reserve(tokens, rate_per_sec, cost, floor)
+            self._buckets[key] = (tokens - cost if granted else tokens, now)
+            return granted, wait
+
+    def acquire_slot(self, endpoint_class: str, limit: int):
+        now = time.time()
+        with self._lock:
+            slots = self._slots.setdefault(endpoint_class, {})
+            for slot_id, acquired in list(slots.items()):
+                if acquired < now - RATE_LIMIT_LEASE_SECONDS:
+                    del slots[slot_id]
+            if len(slots) >= limit:
+                return None
+            self._next_slot += 1
+            slots[self._next_slot] = now
+            return (endpoint_class, self._next_slot)
+
+    def release_slot(self, slot) -> None:
+        with self._lock:
+            self._slots.get(slot[0], {}).pop(slot[1], None)
+
+
+class SqliteLimiterStore:
+    """
+    Token buckets and concurrency leases in a SQLite file shared by all workers on the host.
+
+    A lease records the worker's pid, so slots held by a worker that died are
+    reclaimed as soon as the class is at capacity, not only once they expire.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, endpoint_class TEXT NOT NULL, pid INTEGER NOT NULL, acquired REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS leases_class ON leases (endpoint_class, acquired)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=2, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take_token(self, key: str, rate_per_sec: float, burst: float) -> float:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate_per_sec)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate_per_sec
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now))
+            if random.random() < 0.001:
+                # Buckets idle for an hour are full again; drop them
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - 3600,))
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def reserve(self, key: str, rate_per_sec: float, burst: float, cost: float, floor: float):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate_per_sec)
+            granted, wait = _reserve(tokens, rate_per_sec, cost, floor)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, tokens - cost if granted else tokens, now),
+            )
+            conn.execute("COMMIT")
+            return granted, wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def acquire_slot(self, endpoint_class: str, limit: int):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM leases WHERE endpoint_class = ? AND acquired < ?",
+                (endpoint_class, now - RATE_LIMIT_LEASE_SECONDS),
+            )
+            rows = conn.execute("SELECT id, pid FROM leases WHERE endpoint_class = ?", (endpoint_class,)).fetchall()
+            if len(rows) >= limit:
+                dead = [(lease_id,) for lease_id, pid in rows if not _pid_alive(pid)]
+                if dead:
+                    conn.executemany("DELETE FROM leases WHERE id = ?", dead)
+                in_use = len(rows) - len(dead)
+            else:
+                in_use = len(rows)
+            slot = None
+            if in_use < limit:
+                slot = conn.execute(
+                    "INSERT INTO leases (endpoint_class, pid, acquired) VALUES (?, ?, ?)",
+                    (endpoint_class, os.getpid(), now),
+                ).lastrowid
+            conn.execute("COMMIT")
+            return slot
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release_slot(self, slot) -> None:
+        self._conn().execute("DELETE FROM leases WHERE id = ?", (slot,))
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether a worker process on this host still exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by another user
+    return True
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_limiter_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = None
+                if RATE_LIMIT_DB:
+                    try:
+                        store = SqliteLimiterStore(RATE_LIMIT_DB)
+                    except Exception as e:
+                        print(f"Shared rate limit store unavailable ({e}), limiting per process")
+                _store = store or MemoryLimiterStore()
+    return _store
+
+
+def _noop():
+    pass
+
+
+def admit(endpoint_class: str, identity: str):
+    """
+    Apply the per-client token bucket and the host-wide concurrency cap for an endpoint class.
+
+    Returns:
+        (rejection, release): rejection is None when admitted, else (status, retry_after_seconds)
+        with status 429 (client over its rate) or 503 (endpoint class at capacity).
+        release() must be called once the admitted request has finished.
+    The limiter fails open: if the store errors, the request is admitted.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return None, _noop
+    per_minute, burst, concurrency = get_limits(endpoint_class)
+    store = get_limiter_store()
+    try:
+        wait = store.take_token(f"{endpoint_class}:{identity}", per_minute / 60.0, burst)
+        if wait > 0:
+            incr("rate_limit.rejected", endpoint_class=endpoint_class, reason="rate")
+            return (429, max(1, math.ceil(wait))), _noop
+        slot = store.acquire_slot(endpoint_class, concurrency)
+        if slot is None:
+            incr("rate_limit.rejected", endpoint_class=endpoint_class, reason="concurrency")
+            return (503, 1), _noop
+    except Exception as e:
+        print(f"Rate limiter error ({endpoint_class}): {e}")
+        return None, _noop
+
+    released = []
+
+    def release():
+        if released:
+            return
+        released.append(True)
+        try:
+            store.release_slot(slot)
+        except Exception as e:
+            print(f"Rate limiter release failed ({endpoint_class}): {e}")
+
+    incr("rate_limit.admitted", endpoint_class=endpoint_class)
+    return None, release
@@ -0,0 +1,130 @@
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from models import db, RouteCache
+from .google_places import google_distance_matrix_batch
+from .metrics import incr
+
+load_dotenv()
+
+# How long a routed drive time is reused before it is fetched again
+ROUTE_CACHE_TTL_DAYS = float(os.environ.get('ROUTE_CACHE_TTL_DAYS', '30'))
+TRAVEL_MODE_DRIVE = 'DRIVE'
+
+
+def origin_key(address: str) -> str:
+    return " ".join(str(address or "").lower().split())
+
+
+def destination_key(address: str, place_id: str | None = None) -> str:
+    if place_id:
+        return f"place:{place_id}"
+    return f"addr:{origin_key(address)}"
+
+
+def _session() -> Session:
+    # A separate session on the engine: lookups never flush or commit the request's
+    # pending changes, and don't run under the per-request RLS role (the table has
+    # no policies and is backend-only). Requires an app context.
+    return Session(db.engine)
+
+
+def get_cached_routes(origin: str, destinations: list, travel_mode: str = TRAVEL_MODE_DRIVE) -> dict:
+    """
+    Look up unexpired cached drives from origin.
+
+    Args:
+        origin: Origin address
+        destinations: List of (address, place_id or None)
+
+    Returns:
+        Dict mapping destination index -> { duration_minutes, distance_meters } for cache hits.
+        Empty if the cache is unavailable (no app context, DB error).
+    """
+    okey = origin_key(origin)
+    keys = [destination_key(address, place_id) for address, place_id in destinations]
+    if not okey or not keys:
+        return {}
+    try:
+        with _session() as session:
+            rows = session.query(RouteCache).filter(
+                RouteCache.origin_key == okey,
+                RouteCache.travel_mode == travel_mode,
+                RouteCache.destination_key.in_(set(keys)),
+                RouteCache.expires_at > datetime.now(timezone.utc),
+            ).all()
+    except (SQLAlchemyError, RuntimeError) as e:
+        print(f"Route cache lookup failed: {type(e).__name__}: {e}")
+        return {}
+    by_key = {row.destination_key: row for row in rows}
+    hits = {
+        index: {'duration_minutes': by_key[key].duration_minutes, 'distance_meters': by_key[key].distance_meters}
+        for index, key in enumerate(keys)
+        if key in by_key
+    }
+    incr("route_cache.lookups", len(hits), outcome="hit")
+    incr("route_cache.lookups", len(keys) - len(hits), outcome="miss")
+    return hits
+
+
+def store_routes(origin: str, routes: list, travel_mode: str = TRAVEL_MODE_DRIVE) -> None:
+    """
+    Cache routed drives from origin.
+
+    Args:
+        origin: Origin address
+        routes: List of ((address, place_id or None), { duration_minutes, distance_meters })
+    Routes without a duration are skipped: the matrix helpers report lookup
+    failures the same way as "no route", so misses are never cached.
+    """
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(days=ROUTE_CACHE_TTL_DAYS)
+    okey = origin_key(origin)
+    try:
+        with _session() as session:
+            for (address, place_id), route in routes:
+                if route.get('duration_minutes') is None:
+                    continue
+                session.merge(RouteCache(
+                    origin_key=okey,
+                    destination_key=destination_key(address, place_id),
+                    travel_mode=travel_mode,
+                    duration_minutes=route['duration_minutes'],
+                    distance_meters=route.get('distance_meters'),
+                    fetched_at=now,
+                    expires_at=expires_at,
+                ))
+            if random.random() < 0.01:
+                session.query(RouteCache).filter(RouteCache.expires_at < now).delete(synchronize_session=False)
+            session.commit()
+    except (SQLAlchemyError, RuntimeError) as e:
+        # Typically a concurrent insert of the same key; the other writer's row is as good
+        print(f"Route cache store failed: {type(e).__name__}: {e}")
+
+
+def route_matrix(origin: str, destinations: list) -> list:
+    """
+    Driving routes from origin, read through the route cache.
+
+    Cached destinations are answered from the table; the rest go out in one
+    batched matrix request (google_distance_matrix_batch) and are stored.
+
+    Args:
+        origin: Origin address
+        destinations: List of (address, place_id or None)
+
+    Returns:
+        List aligned with destinations of { duration_minutes: int | None, distance_meters: int | None }
+    """
+    cached = get_cached_routes(origin, destinations)
+    results = [cached.get(i) for i in range(len(destinations))]
+    missing = [i for i, route in enumerate(results) if route is None]
+    if missing:
+        fetched = google_distance_matrix_batch(origin, [destinations[i][0] for i in missing])
+        for i, route in zip(missing, fetched):
+            results[i] = route
+        store_routes(origin, [(destinations[i], results[i]) for i in missing])
+    return results
@@ -73,6 +73,15 @@ type GuidebookDetail = {
   safety_info?: { emergency_contact?: string | null; fire_extinguisher_location?: string | null } | null;
 };
 
+// Editing an item's address invalidates its place, coordinates and driving time
+// (the backend re-routes it after the next save).
+function withItemField(item: DynamicItem, field: keyof DynamicItem, value: string): DynamicItem {
+  if (field === "address" && value !== item.address) {
+    return { ...item, address: value, place_id: null, lat: null, lng: null, driving_minutes: null, driving_minutes_estimated: false };
+  }
+  return { ...item, [field]: value };
+}
+
 export default function EditGuidebookPage() {
   const router = useRouter();
   const params = useParams<{ id: string }>();
@@ -253,12 +262,22 @@ export default function EditGuidebookPage() {
           address: i.address || "",
           description: i.description || "",
           image_url: i.image_url || "",
+          place_id: i.place_id || null,
+          lat: i.lat ?? null,
+          lng: i.lng ?? null,
+          driving_minutes: i.driving_minutes ?? null,
+          driving_minutes_estimated: Boolean(i.driving_minutes_estimated),
         })));
         setActivityItems((data.things_to_do || []).map((i: Partial<DynamicItem>) => ({
           name: i.name || "",
           address: i.address || "",
           description: i.description || "",
           image_url: i.image_url || "",
+          place_id: i.place_id || null,
+          lat: i.lat ?? null,
+          lng: i.lng ?? null,
+          driving_minutes: i.driving_minutes ?? null,
+          driving_minutes_estimated: Boolean(i.driving_minutes_estimated),
         })));
         setCheckoutItems((data.checkout_info || []).map(i => ({ ...i, checked: true })));
         setHouseManualItems((data.house_manual || []).map(i => ({
@@ -555,7 +574,7 @@ export default function EditGuidebookPage() {
                 items={foodItems}
                 label="Nearby Food"
                 onChange={(idx, field, value) => {
-                  setFoodItems(items => items.map((item, i) => i === idx ? { ...item, [field]: value } : item));
+                  setFoodItems(items => items.map((item, i) => i === idx ? withItemField(item, field, value) : item));
                 }}
                 onAdd={() => setFoodAddChoiceOpen(true)}
                 onDelete={idx => setFoodItems(items => items.filter((_, i) => i !== idx))}
@@ -581,7 +600,7 @@ export default function EditGuidebookPage() {
                   setFoodItems(items =>
                     items.length >= LIMITS.maxFoodActivityItems
                       ? items
-                      : [...items, { name: item.name, address: item.address, description: item.description || '', image_url: item.image_url || '' }]
+                      : [...items, { ...item, description: item.description || '', image_url: item.image_url || '' }]
                   );
                 }}
               />
@@ -608,7 +627,7 @@ export default function EditGuidebookPage() {
                 items={activityItems}
                 label="Nearby Activities"
                 onChange={(idx, field, value) => {
-                  setActivityItems(items => items.map((item, i) => i === idx ? { ...item, [field]: value } : item));
+                  setActivityItems(items => items.map((item, i) => i === idx ? withItemField(item, field, value) : item));
                 }}
                 onAdd={() => setActivityAddChoiceOpen(true)}
                 onDelete={idx => setActivityItems(items => items.filter((_, i) => i !== idx))}
@@ -634,7 +653,7 @@ export default function EditGuidebookPage() {
                   setActivityItems(items =>
                     items.length >= LIMITS.maxFoodActivityItems
                       ? items
-                      : [...items, { name: item.name, address: item.address, description: item.description || '', image_url: item.image_url || '' }]
+                      : [...items, { ...item, description: item.description || '', image_url: item.image_url || '' }]
                   );
                 }}
               />
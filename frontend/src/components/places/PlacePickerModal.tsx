@@ -15,7 +15,12 @@ export type DynamicItem = {
   address: string;
   description: string;
   image_url?: string;
+  place_id?: string | null;
+  lat?: number | null;
+  lng?: number | null;
   driving_minutes?: number | null;
+  // true while driving_minutes is a local estimate (refined in the background after saving)
+  driving_minutes_estimated?: boolean;
 };
 
 type Props = {
@@ -13,7 +13,12 @@ export interface DynamicItem {
   address: string;
   description: string;
   image_url?: string;
+  place_id?: string | null;
+  lat?: number | null;
+  lng?: number | null;
   driving_minutes?: number | null;
+  // true while driving_minutes is a local estimate (refined in the background after saving)
+  driving_minutes_estimated?: boolean;
 }
 
 interface DynamicItemListProps {
@@ -156,7 +161,7 @@ export default function DynamicItemList({ items, onChange, onAdd, onDelete, labe
                     </div>
                     {item.driving_minutes != null && (
                       <div className="flex items-center text-xs text-gray-500 mt-1 ml-5">
-                        🚗 {item.driving_minutes} min drive
+                        🚗 {item.driving_minutes_estimated ? "~" : ""}{item.driving_minutes} min drive
                       </div>
                     )}
                   </div>
@@ -64,7 +64,11 @@ export function useAIRecommendations(options: UseAIRecommendationsOptions) {
             address: item.address || "",
             description: item.description || "",
             image_url: photoRef,
-            driving_minutes: item.driving_minutes || null
+            place_id: item.place_id || null,
+            lat: item.lat ?? null,
+            lng: item.lng ?? null,
+            driving_minutes: item.driving_minutes || null,
+            driving_minutes_estimated: Boolean(item.driving_minutes_estimated)
           };
         });
 
@@ -134,7 +138,11 @@ export function useAIRecommendations(options: UseAIRecommendationsOptions) {
             address: item.address || "",
             description: item.description || "",
             image_url: photoRef,
-            driving_minutes: item.driving_minutes || null
+            place_id: item.place_id || null,
+            lat: item.lat ?? null,
+            lng: item.lng ?? null,
+            driving_minutes: item.driving_minutes || null,
+            driving_minutes_estimated: Boolean(item.driving_minutes_estimated)
           };
         });
 
@@ -39,7 +39,11 @@ export function mapDynamicItems(items: DynamicItem[]) {
     description: i.description,
     image_url: i.image_url || "",
     address: i.address || "",
-    driving_minutes: i.driving_minutes || null
+    place_id: i.place_id || null,
+    lat: i.lat ?? null,
+    lng: i.lng ?? null,
+    driving_minutes: i.driving_minutes || null,
+    driving_minutes_estimated: Boolean(i.driving_minutes_estimated)
   }));
 }
 
@@ -0,0 +1,6 @@
+-- Property geocode, used as the origin for local driving-time estimates
+alter table "public"."property" add column "latitude" double precision;
+
+alter table "public"."property" add column "longitude" double precision;
+
+alter table "public"."property" add column "geocoded_address" text;
@@ -0,0 +1,20 @@
+-- Drive times between property origins and destinations, shared by every guidebook.
+-- Backend-only: RLS is enabled with no policies so the table isn't exposed through the API.
+  create table "public"."route_cache" (
+    "origin_key" text not null,
+    "destination_key" text not null,
+    "travel_mode" character varying(20) not null,
+    "duration_minutes" integer not null,
+    "distance_meters" integer,
+    "fetched_at" timestamp with time zone not null,
+    "expires_at" timestamp with time zone not null
+      );
+
+
+alter table "public"."route_cache" enable row level security;
+
+CREATE UNIQUE INDEX route_cache_pkey ON public.route_cache USING btree (origin_key, destination_key, travel_mode);
+
+CREATE INDEX ix_route_cache_expires_at ON public.route_cache USING btree (expires_at);
+
+alter table "public"."route_cache" add constraint "route_cache_pkey" PRIMARY KEY using index "route_cache_pkey";
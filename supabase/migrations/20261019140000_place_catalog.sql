@@ -0,0 +1,26 @@
+-- Google places shared by every guidebook (details cache and "nearby" index).
+-- Backend-only: RLS is enabled with no policies so the table isn't exposed through the API.
+  create table "public"."place" (
+    "place_id" character varying(255) not null,
+    "name" text not null,
+    "name_key" text not null,
+    "formatted_address" text,
+    "latitude" double precision,
+    "longitude" double precision,
+    "rating" double precision,
+    "types" json,
+    "photo_reference" text,
+    "website" text,
+    "fetched_at" timestamp with time zone not null
+      );
+
+
+alter table "public"."place" enable row level security;
+
+CREATE UNIQUE INDEX place_pkey ON public.place USING btree (place_id);
+
+CREATE INDEX ix_place_name_key ON public.place USING btree (name_key);
+
+CREATE INDEX ix_place_lat_lng ON public.place USING btree (latitude, longitude);
+
+alter table "public"."place" add constraint "place_pkey" PRIMARY KEY using index "place_pkey";